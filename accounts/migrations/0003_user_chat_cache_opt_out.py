@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='chat_cache_opt_out',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -9,3 +9,5 @@ class User(AbstractUser):
         ('DOCTOR', 'Doctor'),
     ]
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    # Always ask the chat model instead of answering repeated prompts from the reply cache.
+    chat_cache_opt_out = models.BooleanField(default=False)
@@ -5,12 +5,15 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from rest_framework import generics, status, permissions
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
 from .serializers import UserSerializer, LoginSerializer, RegisterUserSerializer
 from django.contrib.auth import get_user_model
 from admin_panel.models import Clinic
+from admin_panel.notifications import enqueue_email
 
 User = get_user_model()
 
@@ -20,6 +23,7 @@ class RegisterUserAPIView(generics.CreateAPIView):
     serializer_class = RegisterUserSerializer
     permission_classes = [permissions.AllowAny]
 
+    @transaction.atomic
     def perform_create(self, serializer):
         user = serializer.save()
 
@@ -36,7 +40,7 @@ class RegisterUserAPIView(generics.CreateAPIView):
         token = default_token_generator.make_token(user)
         reset_link = f"http://3.110.189.17/reset-password/{uid}/{token}/"
 
-        # Send welcome + reset email
+        # Queue welcome + reset email (sent by run_notification_worker)
         subject = "Welcome to Our Platform 🎉"
         message = (
             f"Hi {user.first_name or user.username},\n\n"
@@ -47,13 +51,7 @@ class RegisterUserAPIView(generics.CreateAPIView):
             f"Best regards,\nThe Team"
         )
 
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
+        enqueue_email(subject, message, [user.email], from_email=settings.DEFAULT_FROM_EMAIL)
 
         return user
 
@@ -121,16 +119,16 @@ class LogoutAPIView(TokenObtainPairView):
 # -------------------------------
 # Forgot Password API
 # -------------------------------
-class ForgotPasswordAPIView(generics.GenericAPIView):
+class ForgotPasswordAPIView(AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
-    def post(self, request):
+    async def post(self, request):
         email = request.data.get("email")
         if not email:
             return Response({"error": "Email is required"}, status=400)
 
         try:
-            user = User.objects.get(email=email)
+            user = await User.objects.aget(email=email)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=404)
 
@@ -142,13 +140,12 @@ class ForgotPasswordAPIView(generics.GenericAPIView):
         frontend_domain = "http://3.110.189.17"  # replace with production domain in deployment
         reset_link = f"{frontend_domain}/reset-password/{uid}/{token}/"
 
-        # Send email
-        send_mail(
+        # Queue email
+        await sync_to_async(enqueue_email)(
             "Reset your password",
             f"Hello {user.username},\n\nClick the link below to reset your password:\n{reset_link}\n\nIf you did not request this, please ignore this email.",
-            settings.EMAIL_HOST_USER,
             [user.email],
-            fail_silently=False,
+            from_email=settings.EMAIL_HOST_USER,
         )
 
         return Response({"message": "Password reset link sent to your email."}, status=200)
@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Clinic
+from .models import Clinic, NotificationOutbox
 
 
 @admin.register(Clinic)
 class ClinicAdmin(admin.ModelAdmin):
     list_display = ("name", "address", "phone_number")
     search_fields = ("name", "address", "phone_number")
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("channel", "recipient", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("channel", "status")
+    search_fields = ("recipient", "subject")
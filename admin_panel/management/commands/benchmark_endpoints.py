@@ -0,0 +1,62 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from admin_panel.models import Clinic
+from clinic_project.benchmark import EndpointBenchmark, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "GET every API route with the Django test client and report p50/p95 latency and query "
+        "counts per endpoint as JSON. Run against a seeded local database (see seed_clinics)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10, help="Timed requests per endpoint (default 10).")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed requests per endpoint first (default 1).")
+        parser.add_argument("--clinic", type=int, help="Clinic id to benchmark as. Defaults to the largest clinic.")
+        parser.add_argument("--include", help="Only routes matching this regular expression.")
+        parser.add_argument(
+            "--query",
+            help=(
+                "Query string added to every URL, e.g. view=compact or format=normalized "
+                "(compare against a run without it for payload sizes)."
+            ),
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="Earlier JSON report to print per-endpoint changes against.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        clinic = None
+        if options["clinic"]:
+            clinic = Clinic.objects.filter(pk=options["clinic"]).first()
+            if clinic is None:
+                raise CommandError(f"Clinic {options['clinic']} does not exist.")
+
+        benchmark = EndpointBenchmark(
+            iterations=options["iterations"], warmup=options["warmup"], clinic=clinic, query=options["query"],
+        )
+        progress = self.progress if options["verbosity"] > 1 else None
+        report = benchmark.run(include=options["include"], progress=progress)
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline:
+                report["comparison"] = compare(json.load(baseline), report)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as target:
+                target.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(
+                f"Benchmarked {len(report['endpoints'])} endpoint(s) into {options['output']} "
+                f"({len(report['skipped'])} skipped)."
+            ))
+        else:
+            self.stdout.write(output)
+
+    def progress(self, result):
+        self.stderr.write(
+            f"{result['status']} {result['route']}: p50 {result['p50_ms']}ms, "
+            f"p95 {result['p95_ms']}ms, {result['queries']} queries, {result['bytes']} bytes"
+        )
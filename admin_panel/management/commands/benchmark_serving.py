@@ -0,0 +1,52 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from clinic_project.serving_benchmark import SERVERS, ServingBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the sync (gunicorn) and async (gunicorn + uvicorn workers) deployments in turn "
+        "against a local fake chat upstream and compare concurrent throughput on /api/chat/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes per deployment (default 2).")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once (default 20).")
+        parser.add_argument("--requests", type=int, default=100, help="Requests per deployment (default 100).")
+        parser.add_argument(
+            "--upstream-delay", type=float, default=0.25,
+            help="Seconds the fake upstream takes per completion (default 0.25).",
+        )
+        parser.add_argument("--modes", default="wsgi,asgi", help="Comma-separated deployments to run (default wsgi,asgi).")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}. Choose from {', '.join(SERVERS)}.")
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+
+        benchmark = ServingBenchmark(
+            workers=options["workers"],
+            concurrency=options["concurrency"],
+            requests=options["requests"],
+            upstream_delay=options["upstream_delay"],
+        )
+        progress = self.progress if options["verbosity"] > 1 else None
+        report = benchmark.run(modes=modes, progress=progress)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as target:
+                target.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Serving benchmark written to {options['output']}."))
+        else:
+            self.stdout.write(output)
+
+    def progress(self, mode, result):
+        self.stderr.write(
+            f"{mode}: {result['requests_per_second']} req/s, p50 {result['p50_ms']}ms, "
+            f"p95 {result['p95_ms']}ms, {result['errors']} errors"
+        )
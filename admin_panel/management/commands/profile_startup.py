@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from clinic_project.startup_profile import compare, profile_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the project in fresh interpreters under `python -X importtime` and report worker "
+        "boot time, peak RSS, which vendor SDKs were imported and the slowest imports as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Boots to take the median of (default 5).")
+        parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list (default 15).")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="Earlier JSON report to show before/after figures against.")
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be at least 1.")
+
+        report = profile_startup(runs=options["runs"], top=options["top"])
+
+        if options["compare"]:
+            with open(options["compare"]) as baseline:
+                report["comparison"] = compare(json.load(baseline), report)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as target:
+                target.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(
+                f"Boot {report['boot_ms']}ms, {report['max_rss_mb']}MB RSS; report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from admin_panel.notifications import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued WhatsApp and email notifications from the NotificationOutbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Notifications claimed per batch (default 100).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait when the outbox is empty (default 5).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the currently due notifications and exit.",
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = process_outbox(options["batch_size"])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} notification(s), {total_failed} failed."))
@@ -47,3 +47,46 @@ class Clinic(BaseModel):
 
     def __str__(self):
         return self.name
+
+
+class NotificationOutbox(BaseModel):
+    """
+    Transactional outbox for WhatsApp and email notifications. Rows are
+    written in the same transaction as the change that caused them and
+    delivered later by `manage.py run_notification_worker`.
+    """
+    WHATSAPP = "WHATSAPP"
+    EMAIL = "EMAIL"
+    CHANNEL_CHOICES = [
+        (WHATSAPP, "WhatsApp"),
+        (EMAIL, "Email"),
+    ]
+
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
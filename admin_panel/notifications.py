@@ -0,0 +1,218 @@
+import logging
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from clinic_project.twilio_utils import get_twilio_client, whatsapp_address
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+# A SENDING row older than this belongs to a worker that died mid-batch.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+# -------------------- Enqueue --------------------
+def enqueue_whatsapp(phone_number, message, media_urls=None):
+    """
+    Queue a WhatsApp message. The row commits (or rolls back) with the
+    caller's transaction; nothing is sent on the request path.
+    """
+    if not phone_number:
+        logger.warning("WhatsApp message not queued: no phone number.")
+        return None
+    return NotificationOutbox.objects.create(
+        channel=NotificationOutbox.WHATSAPP,
+        recipient=phone_number,
+        body=message,
+        payload={"media_urls": media_urls} if media_urls else {},
+    )
+
+
+def enqueue_email(subject, message, recipients, from_email=None):
+    """Queue one email per recipient, like `send_mail` but delivered by the worker."""
+    payload = {"from_email": from_email} if from_email else {}
+    return NotificationOutbox.objects.bulk_create([
+        NotificationOutbox(
+            channel=NotificationOutbox.EMAIL,
+            recipient=recipient,
+            subject=subject,
+            body=message,
+            payload=payload,
+        )
+        for recipient in recipients if recipient
+    ])
+
+
+# -------------------- Providers --------------------
+class NotificationProvider:
+    """
+    Delivers one channel's messages. The worker opens a provider once per
+    batch, calls `send` for every message in it, then closes it; `send`
+    raises on failure.
+    """
+
+    def open(self):
+        pass
+
+    def send(self, notification):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TwilioWhatsAppProvider(NotificationProvider):
+    def open(self):
+        if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_WHATSAPP_NUMBER]):
+            raise RuntimeError("Twilio credentials missing in settings.")
+        self.client = get_twilio_client()
+
+    def send(self, notification):
+        kwargs = {
+            "from_": settings.TWILIO_WHATSAPP_NUMBER,
+            "body": notification.body,
+            "to": whatsapp_address(notification.recipient),
+        }
+        if notification.payload.get("media_urls"):
+            kwargs["media_url"] = notification.payload["media_urls"]
+        self.client.messages.create(**kwargs)
+
+
+class EmailProvider(NotificationProvider):
+    """Sends the whole batch over one SMTP connection."""
+
+    def open(self):
+        self.connection = get_connection(fail_silently=False)
+        self.connection.open()
+
+    def send(self, notification):
+        EmailMessage(
+            notification.subject,
+            notification.body,
+            notification.payload.get("from_email") or settings.DEFAULT_FROM_EMAIL,
+            [notification.recipient],
+            connection=self.connection,
+        ).send()
+
+    def close(self):
+        self.connection.close()
+
+
+class FakeProvider(NotificationProvider):
+    """
+    In-memory provider for tests and local development. Delivered
+    notifications land in `FakeProvider.sent`; recipients listed in
+    `FakeProvider.failing` raise instead.
+    """
+    sent = []
+    failing = set()
+    batches = 0
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.failing = set()
+        cls.batches = 0
+
+    def open(self):
+        type(self).batches += 1
+
+    def send(self, notification):
+        if notification.recipient in self.failing:
+            raise RuntimeError(f"Fake delivery failure for {notification.recipient}")
+        self.sent.append(notification)
+
+
+def get_provider(channel):
+    return import_string(settings.NOTIFICATION_PROVIDERS[channel])()
+
+
+# -------------------- Worker --------------------
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, 4m ... capped at an hour."""
+    return min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+
+
+def claim_batch(batch_size=100):
+    """
+    Mark up to `batch_size` due notifications as SENDING and return them
+    grouped by channel. Rows locked by another worker are skipped.
+    """
+    now = timezone.now()
+    due = Q(status=NotificationOutbox.PENDING, next_attempt_at__lte=now) | Q(
+        status=NotificationOutbox.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT
+    )
+    with transaction.atomic():
+        ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("next_attempt_at", "id")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        NotificationOutbox.objects.filter(pk__in=ids).update(
+            status=NotificationOutbox.SENDING, claimed_at=now, attempts=F("attempts") + 1,
+        )
+    return list(NotificationOutbox.objects.filter(pk__in=ids).order_by("channel", "id"))
+
+
+def _record_failure(notification, error):
+    final = notification.attempts >= MAX_ATTEMPTS
+    NotificationOutbox.objects.filter(pk=notification.pk).update(
+        status=NotificationOutbox.FAILED if final else NotificationOutbox.PENDING,
+        next_attempt_at=timezone.now() + retry_delay(notification.attempts),
+        last_error=str(error),
+        updated_at=timezone.now(),
+    )
+    logger.error(
+        "Failed to send %s notification %s (attempt %s): %s",
+        notification.channel, notification.pk, notification.attempts, error,
+    )
+
+
+def process_outbox(batch_size=100):
+    """
+    Deliver one batch from the outbox. Each channel's messages go through a
+    single provider instance (one Twilio session / SMTP connection); failures
+    are retried with exponential backoff until MAX_ATTEMPTS.
+    Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    for channel, notifications in groupby(claim_batch(batch_size), key=attrgetter("channel")):
+        notifications = list(notifications)
+        provider = get_provider(channel)
+        try:
+            provider.open()
+        except Exception as exc:
+            for notification in notifications:
+                _record_failure(notification, exc)
+            failed += len(notifications)
+            continue
+
+        delivered = []
+        try:
+            for notification in notifications:
+                try:
+                    provider.send(notification)
+                except Exception as exc:
+                    _record_failure(notification, exc)
+                    failed += 1
+                else:
+                    delivered.append(notification.pk)
+        finally:
+            provider.close()
+            now = timezone.now()
+            NotificationOutbox.objects.filter(pk__in=delivered).update(
+                status=NotificationOutbox.SENT, sent_at=now, last_error="", updated_at=now,
+            )
+        sent += len(delivered)
+    return sent, failed
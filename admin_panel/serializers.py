@@ -1,14 +1,18 @@
 from rest_framework import serializers
 import json
 from django.http import QueryDict
+from django.db import transaction
 from django.db.models import Max
 from datetime import date
 from .models import Clinic
-from clinic_panel.models import Doctor, Patient, Appointment, Education, Certification, PatientAttachment
+from clinic_panel.models import Doctor, Patient, Appointment, Education, Certification, PatientAttachment, ClinicStats
 from accounts.models import User
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from clinic_project.twilio_utils import send_patient_whatsapp
+from clinic_project.serialization import (
+    EagerLoadingMixin, IdentityMapMixin, SideLoaded, SparseFieldsetMixin, nested_loading,
+)
+from .notifications import enqueue_whatsapp
 
 User = get_user_model()
 
@@ -26,8 +30,27 @@ class CertificationSerializer(serializers.ModelSerializer):
         extra_kwargs = {field: {"required": False} for field in fields}
 
 
-class DoctorSerializer(serializers.ModelSerializer):
-    clinic = serializers.PrimaryKeyRelatedField(queryset=Clinic.objects.all())
+class ClinicRefField(serializers.PrimaryKeyRelatedField):
+    """A clinic id on input, {"id", "name"} of the clinic on output."""
+
+    def use_pk_only_optimization(self):
+        return False
+
+    def to_representation(self, value):
+        return {"id": value.id, "name": value.name}
+
+    def get_choices(self, cutoff=None):
+        # Browsable API form options are keyed by id, not by the output dict.
+        queryset = self.get_queryset()
+        if cutoff is not None:
+            queryset = queryset[:cutoff]
+        return {item.pk: self.display_value(item) for item in queryset}
+
+
+class DoctorSerializer(IdentityMapMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    # Everything is rendered by declared fields, with no to_representation
+    # override, so IdentityMapMixin memoizes the doctor's full output.
+    clinic = ClinicRefField(queryset=Clinic.objects.all())
     user = serializers.SerializerMethodField()
 
     username = serializers.CharField(write_only=True, required=False)  # optional on update
@@ -48,6 +71,10 @@ class DoctorSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user"]
 
+    select_related = ("user", "clinic")
+    prefetch_related = ("educations", "certifications")
+    field_requires = {"user": ("user",)}
+
     def get_user(self, obj):
         if obj.user:
             return {
@@ -58,14 +85,6 @@ class DoctorSerializer(serializers.ModelSerializer):
             }
         return None
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        if instance.clinic:
-            rep["clinic"] = {"id": instance.clinic.id, "name": instance.clinic.name}
-        rep["educations"] = EducationSerializer(instance.educations.all(), many=True).data
-        rep["certifications"] = CertificationSerializer(instance.certifications.all(), many=True).data
-        return rep
-
     def validate_email(self, value):
         """Ensure email is unique across users."""
         qs = User.objects.filter(email=value)
@@ -139,7 +158,7 @@ class DoctorSerializer(serializers.ModelSerializer):
 
 
 # -------------------- Clinic --------------------
-class ClinicSerializer(serializers.ModelSerializer):
+class ClinicSerializer(IdentityMapMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     username = serializers.CharField(write_only=True, required=False)
     password = serializers.CharField(write_only=True, required=False)
     doctors = DoctorSerializer(many=True, read_only=True)
@@ -153,6 +172,8 @@ class ClinicSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user"]
 
+    prefetch_related = tuple(f"doctors__{name}" for name in ("user", "educations", "certifications"))
+
     def validate_email(self, value):
         """Ensure email is unique across Users."""
         if value and User.objects.filter(email=value).exists():
@@ -192,6 +213,32 @@ class ClinicSerializer(serializers.ModelSerializer):
 
         return super().update(instance, validated_data)
 
+# -------------------- Dashboard --------------------
+class ClinicStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClinicStats
+        fields = [
+            "doctors_count",
+            "patients_count",
+            "appointments_count",
+            "scheduled_appointments",
+            "completed_appointments",
+            "cancelled_appointments",
+            "consultations_count",
+            "updated_at",
+        ]
+
+
+class DashboardClinicSerializer(serializers.ModelSerializer):
+    stats = ClinicStatsSerializer(read_only=True)
+
+    class Meta:
+        model = Clinic
+        fields = [
+            "id", "name", "address", "phone_number", "email",
+            "type", "status", "user", "stats",
+        ]
+
 # -------------------- Patient --------------------
 
 class PatientAttachmentSerializer(serializers.ModelSerializer):
@@ -200,7 +247,7 @@ class PatientAttachmentSerializer(serializers.ModelSerializer):
         fields = ["id", "file", "uploaded_at"]
 
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(IdentityMapMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     age = serializers.SerializerMethodField(read_only=True)
     clinic = serializers.SerializerMethodField(read_only=True)
 
@@ -263,6 +310,10 @@ class PatientSerializer(serializers.ModelSerializer):
             "files_processed",
         ]
 
+    select_related = ("clinic",)
+    prefetch_related = ("attachments",)
+    field_requires = {"age": ("dob",), "clinic": ("clinic",)}
+
     def to_internal_value(self, data):
         """
         Safely handle multipart PATCH/PUT with files.
@@ -304,6 +355,7 @@ class PatientSerializer(serializers.ModelSerializer):
     # -------------------------
     # Create with files
     # -------------------------
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get("request")
         files = validated_data.pop("files", [])
@@ -352,19 +404,20 @@ class PatientSerializer(serializers.ModelSerializer):
                 file=file
             )
 
-        # Send WhatsApp notification
+        # Queue WhatsApp notification (sent by run_notification_worker)
         welcome_msg = (
             f"Hello {patient.first_name}, welcome to {patient.clinic.name}. "
             f"Your patient file has been created successfully. "
             f"File Number: {patient.file_number}"
         )
-        send_patient_whatsapp(patient.phone_number, welcome_msg)
+        enqueue_whatsapp(patient.phone_number, welcome_msg)
 
         return patient
 
     # -------------------------
     # Update with files
     # -------------------------
+    @transaction.atomic
     def update(self, instance, validated_data):
         """
         Handle PUT / PATCH updates including file uploads
@@ -385,14 +438,14 @@ class PatientSerializer(serializers.ModelSerializer):
                 file=file
             )
     
-        # Send WhatsApp text notification for new attachments
+        # Queue WhatsApp text notification for new attachments
         if files:
             update_msg = (
                 f"Hello {instance.first_name}, welcome to {instance.clinic.name}. "
                 f"A new document has been added to your record. "
                 f"File Number: {instance.file_number}"
             )
-            send_patient_whatsapp(instance.phone_number, update_msg)
+            enqueue_whatsapp(instance.phone_number, update_msg)
 
         return instance
 
@@ -406,8 +459,47 @@ class PatientSerializer(serializers.ModelSerializer):
 
     def get_clinic(self, obj):
         return obj.clinic.id if obj.clinic else None  
+class PatientVitalSignsSerializer(serializers.BaseSerializer):
+    """
+    Read-only row for the vital signs list. Expects patients annotated with
+    `latest_<field>` values from their most recent consultation and
+    `last_visited` (see AdminPatientVitalSignsAPIView.get_queryset).
+    """
+    # Response key -> Consultation field
+    VITAL_SIGN_FIELDS = {
+        "bloodPressure": "blood_pressure",
+        "heartRate": "pulse",
+        "spo2": "spo2",
+        "temperature": "temperature",
+        "respiratoryRate": "respiratory_rate",
+        "weight": "weight",
+    }
+
+    def to_representation(self, patient):
+        return {
+            "id": patient.id,
+            "name": f"{patient.first_name} {patient.last_name}".strip(),
+            "dob": patient.dob.isoformat() if patient.dob else None,
+            "bloodGroup": patient.blood_group,
+            "gender": patient.gender,
+            "email": patient.email,
+            "phone": patient.phone_number,
+            "address": patient.address,
+            "lastVisited": patient.last_visited.isoformat() if patient.last_visited else "N/A",
+            "vitalSigns": {
+                key: getattr(patient, f"latest_{field}") or "N/A"
+                for key, field in self.VITAL_SIGN_FIELDS.items()
+            },
+        }
+
+
 # -------------------- Appointment --------------------
-class AppointmentSerializer(serializers.ModelSerializer):
+_clinic_select, _clinic_prefetch = nested_loading("clinic", ClinicSerializer)
+_doctor_select, _doctor_prefetch = nested_loading("doctor", DoctorSerializer)
+_patient_select, _patient_prefetch = nested_loading("patient", PatientSerializer)
+
+
+class AppointmentSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic = ClinicSerializer(read_only=True)  # already good
     doctor = DoctorSerializer(read_only=True)  # change to nested serializer
     patient = PatientSerializer(read_only=True)  # change to nested serializer
@@ -429,8 +521,16 @@ class AppointmentSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["created_by", "appointment_id"]
 
+    select_related = ("clinic", "doctor", "patient", "created_by") + _clinic_select + _doctor_select + _patient_select
+    prefetch_related = _clinic_prefetch + _doctor_prefetch + _patient_prefetch
+    side_loaded = {
+        "clinic": SideLoaded("clinics", ClinicSerializer),
+        "doctor": SideLoaded("doctors", DoctorSerializer),
+        "patient": SideLoaded("patients", PatientSerializer),
+    }
 
-class ClinicAppointmentSerializer(serializers.ModelSerializer):
+
+class ClinicAppointmentSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     # Nested serializers for GET
     clinic = ClinicSerializer(read_only=True)
     doctor = DoctorSerializer(read_only=True)
@@ -450,9 +550,72 @@ class ClinicAppointmentSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["created_by", "appointment_id", "clinic"]
 
+    select_related = AppointmentSerializer.select_related
+    prefetch_related = AppointmentSerializer.prefetch_related
+    side_loaded = AppointmentSerializer.side_loaded
+
     def create(self, validated_data):
         clinic = self.context.get("clinic")
         if not clinic:
             raise serializers.ValidationError("Clinic context is required.")
         validated_data["clinic"] = clinic
         return super().create(validated_data)
+
+
+# -------------------- Compact list views (?view=compact) --------------------
+# References to related rows carry only what a list needs to show and link
+# them; clients fetch the detail endpoint for the rest.
+class ClinicRefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Clinic
+        fields = ["id", "name"]
+
+
+class DoctorRefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Doctor
+        fields = ["id", "name", "specialization"]
+
+
+class PatientRefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Patient
+        fields = ["id", "first_name", "last_name", "file_number"]
+
+
+class CompactClinicSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Clinic
+        fields = ["id", "name", "type", "status", "phone_number", "email", "user"]
+
+
+class CompactDoctorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    clinic = ClinicRefSerializer(read_only=True)
+
+    class Meta:
+        model = Doctor
+        fields = ["id", "name", "specialization", "phone_number", "email", "profile_image", "clinic"]
+
+    select_related = ("clinic",)
+
+
+class CompactPatientSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Patient
+        fields = ["id", "first_name", "last_name", "phone_number", "file_number", "gender", "dob", "clinic"]
+
+
+class CompactAppointmentSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    clinic = ClinicRefSerializer(read_only=True)
+    doctor = DoctorRefSerializer(read_only=True)
+    patient = PatientRefSerializer(read_only=True)
+    created_by = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = [
+            "id", "appointment_id", "appointment_date", "appointment_time",
+            "status", "reason", "clinic", "doctor", "patient", "created_by", "created_at",
+        ]
+
+    select_related = ("clinic", "doctor", "patient", "created_by")
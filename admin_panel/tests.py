@@ -1,3 +1,514 @@
-from django.test import TestCase
+import json
+from datetime import time
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from accounts.models import User
+from clinic_panel.models import Doctor, Education, Patient, Appointment
+from clinic_project.benchmark import EndpointBenchmark, compare, percentile
+from clinic_project.perf import PerformanceMiddleware, fingerprint, stats as perf_stats
+from clinic_project.seed import ClinicSeeder
+from clinic_project.startup_profile import boot_once, parse_importtime
+from doctor_panel.models import Consultation
+from doctor_panel.serializers import ConsultationSerializer
+from .models import Clinic, NotificationOutbox
+from .serializers import AppointmentSerializer, ClinicSerializer, DoctorSerializer, EducationSerializer, PatientSerializer
+from .notifications import FakeProvider, MAX_ATTEMPTS, enqueue_email, enqueue_whatsapp, process_outbox
 
-# Create your tests here.
+
+def make_clinic(name):
+    user = User.objects.create_user(username=name.lower().replace(" ", "_"), password="x", role="CLINIC")
+    return Clinic.objects.create(user=user, name=name)
+
+
+class PatientVitalSignsTests(TestCase):
+    url = reverse("admin_panel:admin-patient-vital-signs")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="root", password="x", role="SUPERADMIN")
+        cls.clinic = make_clinic("Alpha Clinic")
+        cls.other = make_clinic("Beta Clinic")
+
+        for clinic in (cls.clinic, cls.other):
+            doctor_user = User.objects.create_user(username=f"doc_{clinic.pk}", password="x", role="DOCTOR")
+            doctor = Doctor.objects.create(clinic=clinic, user=doctor_user, name="Dr Doc")
+            for i in range(4):
+                patient = Patient.objects.create(
+                    clinic=clinic, first_name=f"p{i}", last_name="Test",
+                    phone_number="+910000000000", address="Street",
+                )
+                if i == 0:
+                    continue  # no consultations -> N/A
+                appointment = Appointment.objects.create(
+                    clinic=clinic, doctor=doctor, patient=patient, appointment_time=time(10),
+                )
+                Consultation.objects.create(doctor=doctor, patient=patient, pulse="60", weight="70")
+                Consultation.objects.create(
+                    doctor=doctor, patient=patient, appointment=appointment, pulse=f"8{i}",
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def rows_by_name(self, rows):
+        return {row["name"]: row for row in rows}
+
+    def test_latest_vitals_query_count(self):
+        # one query for the page (a superadmin has no clinic profile to look up)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"clinic_id": self.clinic.pk, "page_size": 10})
+
+        rows = self.rows_by_name(response.data["results"])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows["p2 Test"]["vitalSigns"]["heartRate"], "82")
+        self.assertEqual(rows["p2 Test"]["vitalSigns"]["weight"], "N/A")
+        self.assertNotEqual(rows["p2 Test"]["lastVisited"], "N/A")
+        self.assertEqual(rows["p0 Test"]["vitalSigns"]["heartRate"], "N/A")
+        self.assertEqual(rows["p0 Test"]["lastVisited"], "N/A")
+
+    def test_clinic_user_is_scoped_to_own_clinic(self):
+        self.client.force_authenticate(User.objects.get(pk=self.other.user.pk))
+        response = self.client.get(self.url, {"clinic_id": self.clinic.pk, "paginate": "false"})
+
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(
+            {row["id"] for row in response.data},
+            set(Patient.objects.filter(clinic=self.other).values_list("id", flat=True)),
+        )
+
+    def test_stream_returns_every_patient(self):
+        response = self.client.get(self.url, {"stream": "true"})
+
+        self.assertTrue(response.streaming)
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(self.rows_by_name(rows)["p3 Test"]["vitalSigns"]["heartRate"], "83")
+
+
+FAKE_PROVIDERS = {
+    "WHATSAPP": "admin_panel.notifications.FakeProvider",
+    "EMAIL": "admin_panel.notifications.FakeProvider",
+}
+
+
+@override_settings(NOTIFICATION_PROVIDERS=FAKE_PROVIDERS)
+class NotificationOutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="root", password="x", role="SUPERADMIN", email="root@x.com")
+        cls.clinic = make_clinic("Alpha Clinic")
+
+    def setUp(self):
+        FakeProvider.reset()
+        self.client = APIClient()
+
+    def test_patient_create_queues_whatsapp_instead_of_sending(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse("admin_panel:patient-list-create"), {
+            "clinic": self.clinic.pk, "first_name": "Pat", "last_name": "Test",
+            "phone_number": "+910000000000", "address": "Street",
+        }, format="multipart")
+
+        self.assertEqual(response.status_code, 201, response.data)
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual(notification.channel, NotificationOutbox.WHATSAPP)
+        self.assertEqual(notification.status, NotificationOutbox.PENDING)
+        self.assertIn("Alpha Clinic", notification.body)
+        self.assertEqual(FakeProvider.sent, [])
+
+    def test_password_reset_queues_email(self):
+        response = self.client.post(reverse("accounts:forgot-password"), {"email": "root@x.com"})
+
+        self.assertEqual(response.status_code, 200)
+        notification = NotificationOutbox.objects.get()
+        self.assertEqual((notification.channel, notification.recipient), (NotificationOutbox.EMAIL, "root@x.com"))
+
+    def test_worker_batches_per_provider(self):
+        for i in range(3):
+            enqueue_whatsapp(f"+91000000000{i}", "hello")
+        enqueue_email("Subject", "Body", ["a@x.com", "b@x.com"])
+
+        self.assertEqual(process_outbox(), (5, 0))
+        self.assertEqual(FakeProvider.batches, 2)  # one provider session per channel
+        self.assertEqual(len(FakeProvider.sent), 5)
+        self.assertFalse(NotificationOutbox.objects.exclude(status=NotificationOutbox.SENT).exists())
+        self.assertEqual(process_outbox(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        enqueue_whatsapp("+910000000001", "ok")
+        failing = enqueue_whatsapp("+910000000002", "nope")
+        FakeProvider.failing = {"+910000000002"}
+
+        self.assertEqual(process_outbox(), (1, 1))
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (NotificationOutbox.PENDING, 1))
+        self.assertGreater(failing.next_attempt_at, timezone.now())
+        self.assertIn("Fake delivery failure", failing.last_error)
+
+        # Not due yet
+        self.assertEqual(process_outbox(), (0, 0))
+
+        for attempt in range(2, MAX_ATTEMPTS + 1):
+            NotificationOutbox.objects.filter(pk=failing.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(process_outbox(), (0, 1))
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (NotificationOutbox.FAILED, MAX_ATTEMPTS))
+
+    def test_worker_reclaims_stale_sending_rows(self):
+        notification = enqueue_email("Subject", "Body", ["a@x.com"])[0]
+        NotificationOutbox.objects.filter(pk=notification.pk).update(
+            status=NotificationOutbox.SENDING, claimed_at=timezone.now() - timezone.timedelta(hours=1),
+        )
+
+        out = StringIO()
+        call_command("run_notification_worker", "--once", stdout=out)
+
+        self.assertIn("Sent 1 notification(s), 0 failed.", out.getvalue())
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, NotificationOutbox.SENT)
+
+
+class EndpointBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ClinicSeeder(patients_per_clinic=3, years=1, doctors_per_clinic=2, seed=1).seed(1)
+
+    def test_percentile_is_nearest_rank(self):
+        samples = list(range(1, 21))
+        self.assertEqual(percentile(samples, 0.5), 10)
+        self.assertEqual(percentile(samples, 0.95), 19)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_reports_latency_and_queries_per_route(self):
+        report = EndpointBenchmark(iterations=2, warmup=0).run(include=r"^/api/(clinic|accounts)/")
+        endpoints = {endpoint["route"]: endpoint for endpoint in report["endpoints"]}
+
+        detail = endpoints["/api/clinic/patients/<int:pk>/"]
+        self.assertEqual(detail["status"], 200)
+        self.assertEqual(detail["role"], "CLINIC")
+        self.assertLessEqual(detail["p50_ms"], detail["p95_ms"])
+        self.assertGreater(detail["queries"], 0)
+        self.assertIn("/api/clinic/patients/", endpoints)
+
+        skipped = [row["route"] for row in report["skipped"]]
+        self.assertIn("/api/accounts/reset-password/<uidb64>/<token>/", skipped)
+        json.dumps(report)
+
+    def test_compact_view_payload_is_smaller(self):
+        include = r"^/api/clinic/appointments/$"
+        full = EndpointBenchmark(iterations=1, warmup=0).run(include=include)["endpoints"][0]
+        compact = EndpointBenchmark(iterations=1, warmup=0, query="view=compact").run(include=include)["endpoints"][0]
+
+        self.assertTrue(compact["url"].endswith("?view=compact"))
+        self.assertLess(compact["bytes"], full["bytes"])
+        self.assertIsNotNone(full["serializer_ms"])
+
+    def test_normalized_payload_is_smaller(self):
+        include = r"^/api/clinic/appointments/$"
+        full = EndpointBenchmark(iterations=1, warmup=0).run(include=include)
+        normalized = EndpointBenchmark(iterations=1, warmup=0, query="format=normalized").run(include=include)
+
+        [row] = compare(full, normalized)
+        self.assertLess(row["bytes_ratio"], 1)
+
+
+class CompactListViewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="compactadmin", password="pass", role="SUPERADMIN")
+        clinic_user = User.objects.create_user(username="compactclinic", password="pass", role="CLINIC")
+        self.clinic = Clinic.objects.create(user=clinic_user, name="Compact Clinic")
+        self.doctors = [
+            Doctor.objects.create(clinic=self.clinic, user=User.objects.create_user(username=f"cdoc{i}", role="DOCTOR"), name=f"Dr {i}")
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def book(self, count):
+        for i in range(count):
+            patient = Patient.objects.create(clinic=self.clinic, first_name=f"P{i}", last_name="Test", dob="1990-01-01")
+            Appointment.objects.create(
+                clinic=self.clinic, doctor=self.doctors[i % 3], patient=patient, appointment_time=time(9 + i % 8),
+            )
+
+    def test_compact_appointments_reference_related_rows(self):
+        self.book(2)
+        url = reverse("admin_panel:appointment-list-create")
+
+        full = self.client.get(url).data[0]
+        self.assertEqual(len(full["clinic"]["doctors"]), 3)
+
+        compact = self.client.get(url, {"view": "compact"}).data[0]
+        self.assertEqual(compact["clinic"], {"id": self.clinic.id, "name": "Compact Clinic"})
+        self.assertEqual(set(compact["doctor"]), {"id", "name", "specialization"})
+        self.assertEqual(set(compact["patient"]), {"id", "first_name", "last_name", "file_number"})
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        url = reverse("admin_panel:appointment-list-create")
+        self.book(2)
+        counts = {}
+        for view in ("full", "compact"):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {"view": view})
+            counts[view] = len(queries)
+
+        self.book(6)
+        for view in ("full", "compact"):
+            with self.assertNumQueries(counts[view]):
+                response = self.client.get(url, {"view": view})
+            self.assertEqual(len(response.data), 8)
+        self.assertEqual(counts["compact"], 1)
+
+
+class NormalizedListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="normadmin", password="pass", role="SUPERADMIN")
+        self.clinic_user = User.objects.create_user(username="normclinic", password="pass", role="CLINIC")
+        self.clinic = Clinic.objects.create(user=self.clinic_user, name="Normalized Clinic")
+        self.doctors = [
+            Doctor.objects.create(clinic=self.clinic, user=User.objects.create_user(username=f"ndoc{i}", role="DOCTOR"), name=f"Dr {i}")
+            for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def book(self, count):
+        for i in range(count):
+            patient = Patient.objects.create(clinic=self.clinic, first_name=f"P{i}", last_name="Test", dob="1990-01-01")
+            Appointment.objects.create(
+                clinic=self.clinic, doctor=self.doctors[i % 2], patient=patient, appointment_time=time(9 + i % 8),
+            )
+            Consultation.objects.create(doctor=self.doctors[i % 2], patient=patient)
+
+    def test_rows_reference_included_entities(self):
+        self.book(4)
+        url = reverse("admin_panel:appointment-list-create")
+        full = self.client.get(url).json()
+        normalized = self.client.get(url, {"format": "normalized"}).json()
+
+        row = normalized["results"][0]
+        self.assertEqual(row["clinic"], self.clinic.id)
+        included = normalized["included"]
+        self.assertEqual(set(included), {"clinics", "doctors", "patients"})
+        self.assertEqual(len(included["doctors"]), 2)
+        self.assertEqual(len(included["patients"]), 4)
+        self.assertEqual(included["doctors"][str(row["doctor"])], full[0]["doctor"])
+        self.assertEqual(included["patients"][str(row["patient"])], full[0]["patient"])
+        self.assertEqual({k: v for k, v in row.items() if k not in ("clinic", "doctor", "patient")},
+                         {k: v for k, v in full[0].items() if k not in ("clinic", "doctor", "patient")})
+
+    def test_entities_are_loaded_once_per_type(self):
+        url = reverse("admin_panel:appointment-list-create")
+        self.book(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"format": "normalized"})
+        self.book(6)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url, {"format": "normalized"})
+        self.assertEqual(len(response.data["results"]), 8)
+
+    def test_consultation_entities_are_loaded_once_per_type(self):
+        # The clinic id is read through each consultation's doctor.
+        url = reverse("clinic_panel:clinic-consultations")
+        self.client.force_authenticate(self.clinic_user)
+        self.book(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"format": "normalized"})
+        self.book(6)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url, {"format": "normalized"})
+        self.assertEqual(len(response.data["results"]), 8)
+        self.assertEqual(set(response.data["included"]["clinics"]), {str(self.clinic.id)})
+
+    def test_paginated_lists_keep_links_next_to_included(self):
+        self.book(3)
+        self.client.force_authenticate(self.clinic_user)
+        response = self.client.get(reverse("clinic_panel:clinic-consultations"), {"format": "normalized", "page_size": 2})
+        data = response.json()
+        self.assertEqual(set(data), {"next", "previous", "results", "included"})
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIn("format=normalized", data["next"])
+        self.assertEqual(data["included"]["clinics"], {str(self.clinic.id): {"id": self.clinic.id, "name": "Normalized Clinic"}})
+        self.assertEqual(set(data["included"]["doctors"]), {str(row["doctor"]) for row in data["results"]})
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="sparseadmin", password="pass", role="SUPERADMIN")
+        clinic_user = User.objects.create_user(username="sparseclinic", password="pass", role="CLINIC")
+        self.clinic = Clinic.objects.create(user=clinic_user, name="Sparse Clinic")
+        Doctor.objects.create(clinic=self.clinic, user=User.objects.create_user(username="sdoc", role="DOCTOR"), name="Dr S")
+        for i in range(3):
+            Patient.objects.create(clinic=self.clinic, first_name=f"P{i}", last_name="Test", address="Street", dob="1990-01-01")
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def get(self, name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), params)
+        return response.json(), [query["sql"] for query in queries.captured_queries]
+
+    def test_fields_keeps_only_the_named_fields_and_prunes_the_query(self):
+        rows, sql = self.get("admin_panel:patient-list-create", fields="id,first_name,age")
+        self.assertEqual(set(rows[0]), {"id", "first_name", "age"})
+        self.assertIsNotNone(rows[0]["age"])
+        patient_query = next(query for query in sql if 'FROM "clinic_panel_patient"' in query)
+        self.assertNotIn('"address"', patient_query)
+        self.assertIn('"dob"', patient_query)  # read by age
+        self.assertFalse(any("patientattachment" in query for query in sql))
+
+    def test_omit_skips_nested_relations(self):
+        full, full_sql = self.get("admin_panel:doctor-list-create")
+        rows, sql = self.get("admin_panel:doctor-list-create", omit="educations,certifications,clinic")
+        self.assertEqual(set(full[0]) - set(rows[0]), {"educations", "certifications", "clinic"})
+        self.assertEqual(rows[0]["user"]["username"], "sdoc")
+        self.assertTrue(any("clinic_panel_education" in query for query in full_sql))
+        self.assertFalse(any("clinic_panel_education" in query or "clinic_panel_certification" in query for query in sql))
+        self.assertLess(len(sql), len(full_sql))
+
+    def test_writes_ignore_the_fieldset(self):
+        patient = Patient.objects.first()
+        for method, expected in (("get", {"id"}), ("post", None)):
+            request = Request(getattr(APIRequestFactory(), method)("/?fields=id"))
+            data = PatientSerializer(patient, context={"request": request}).data
+            if expected:
+                self.assertEqual(set(data), expected)
+            else:
+                self.assertIn("first_name", data)
+
+
+class IdentityMapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        clinic_user = User.objects.create_user(username="mapclinic", password="pass", role="CLINIC")
+        cls.clinic = Clinic.objects.create(user=clinic_user, name="Map Clinic")
+        cls.doctors = [
+            Doctor.objects.create(clinic=cls.clinic, user=User.objects.create_user(username=f"mapdoc{i}", role="DOCTOR"), name=f"Dr {i}")
+            for i in range(2)
+        ]
+        for doctor in cls.doctors:
+            Education.objects.create(doctor=doctor, degree="MBBS", university="AIIMS", from_year=2000, to_year=2005)
+        cls.patient = Patient.objects.create(clinic=cls.clinic, first_name="Map", last_name="Patient")
+        for i in range(30):
+            Appointment.objects.create(
+                clinic=cls.clinic, doctor=cls.doctors[i % 2], patient=cls.patient, appointment_time=time(9 + i % 8),
+            )
+            Consultation.objects.create(doctor=cls.doctors[i % 2], patient=cls.patient)
+
+    def appointments(self):
+        return AppointmentSerializer.setup_queryset(Appointment.objects.all())
+
+    def test_shared_rows_are_rendered_once_per_response(self):
+        with mock.patch.object(DoctorSerializer, "get_user", autospec=True, side_effect=DoctorSerializer.get_user) as get_user:
+            data = AppointmentSerializer(self.appointments(), many=True).data
+        # Each doctor once, although every row reaches both of them through
+        # its clinic and one of them directly.
+        self.assertEqual(get_user.call_count, 2)
+        self.assertIs(data[0]["clinic"], data[1]["clinic"])
+        self.assertIs(data[0]["doctor"], data[2]["doctor"])
+        self.assertEqual(data[0]["clinic"], ClinicSerializer(self.clinic).data)
+
+    def test_doctor_output_is_memoized_whole(self):
+        render = EducationSerializer.to_representation
+        with mock.patch.object(EducationSerializer, "to_representation", autospec=True, side_effect=render) as educations:
+            data = AppointmentSerializer(self.appointments(), many=True).data
+        self.assertEqual(educations.call_count, 2)
+        self.assertEqual(data[0]["doctor"]["clinic"], {"id": self.clinic.id, "name": "Map Clinic"})
+        self.assertEqual(data[0]["doctor"]["educations"][0]["degree"], "MBBS")
+
+    def test_memo_does_not_outlive_the_response(self):
+        AppointmentSerializer(self.appointments(), many=True).data
+        Clinic.objects.filter(pk=self.clinic.pk).update(name="Renamed")
+        data = AppointmentSerializer(self.appointments(), many=True).data
+        self.assertEqual({row["clinic"]["name"] for row in data}, {"Renamed"})
+
+    def test_consultation_clinic_references_are_shared(self):
+        consultations = Consultation.objects.select_related("doctor__clinic", "patient", "appointment")
+        data = ConsultationSerializer(consultations, many=True).data
+        self.assertEqual(data[0]["clinic"], {"id": self.clinic.id, "name": "Map Clinic"})
+        self.assertIs(data[0]["clinic"], data[1]["clinic"])
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        perf_stats.clear()
+        self.admin = User.objects.create_user(username="perfadmin", password="pass", role="SUPERADMIN")
+        clinic_user = User.objects.create_user(username="perfclinic", password="pass", role="CLINIC")
+        self.clinic = Clinic.objects.create(user=clinic_user, name="Perf Clinic")
+        for i in range(3):
+            Patient.objects.create(clinic=self.clinic, first_name=f"P{i}", last_name="Test", dob="1990-01-01")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_fingerprint_collapses_literals(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) AND "name" = \'x\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND "name" = ? LIMIT ?',
+        )
+
+    def test_sets_server_timing_and_records_by_url_name(self):
+        response = self.client.get(reverse("admin_panel:patient-list-create"))
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        summary = self.client.get(reverse("admin_panel:perf")).json()
+        row = summary["endpoints"]["admin_panel:patient-list-create"]
+        self.assertEqual(row["count"], 1)
+        self.assertGreater(row["queries"]["p50"], 0)
+        self.assertLessEqual(row["total_ms"]["p50"], row["total_ms"]["p99"])
+
+        self.client.delete(reverse("admin_panel:perf"))
+        # Only the DELETE itself has been recorded since the reset.
+        endpoints = self.client.get(reverse("admin_panel:perf")).json()["endpoints"]
+        self.assertEqual(list(endpoints), ["admin_panel:perf"])
+
+    def test_stats_are_superadmin_only(self):
+        self.client.force_authenticate(self.clinic.user)
+        self.assertEqual(self.client.get(reverse("admin_panel:perf")).status_code, 403)
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_log_repeated_sql(self):
+        def n_plus_one(request):
+            for patient in Patient.objects.all():
+                Clinic.objects.get(pk=patient.clinic_id)
+            return HttpResponse()
+
+        with self.assertLogs("clinic_project.perf", level="WARNING") as logs:
+            PerformanceMiddleware(n_plus_one)(RequestFactory().get("/slow/"))
+        self.assertIn("Slow request GET /slow/ (unresolved)", logs.output[0])
+        self.assertIn('3x SELECT "admin_panel_clinic"', logs.output[0])
+        self.assertIn("unresolved", perf_stats.summary()["endpoints"])
+
+
+class StartupProfileTests(TestCase):
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(parse_importtime(stderr), [("json.decoder", 120, 120, 1), ("json", 300, 420, 0)])
+
+    def test_boot_does_not_import_vendor_sdks(self):
+        boot = boot_once()
+        self.assertEqual(boot["vendor_loaded"], [])
+        self.assertGreater(boot["boot_ms"], 0)
+        self.assertTrue(any(module == "django" for module, *_ in boot["imports"]))
+
+    def test_api_docs_load_on_first_request(self):
+        response = self.client.get(reverse("schema-json", kwargs={"format": ".json"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["info"]["title"], "Clinic API")
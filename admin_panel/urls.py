@@ -34,4 +34,6 @@ urlpatterns = [
         AdminPatientVitalSignsAPIView.as_view(),
         name="admin-patient-vital-signs",
     ),
+
+    path("perf/", PerformanceStatsAPIView.as_view(), name="perf"),
 ]
@@ -2,20 +2,28 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Count
+import json
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .models import Clinic
 from clinic_panel.models import Doctor, Patient, Appointment, PatientAttachment
 from doctor_panel.models import Consultation
-from .serializers import ClinicSerializer, DoctorSerializer, PatientSerializer, AppointmentSerializer
+from .serializers import ClinicSerializer, DoctorSerializer, PatientSerializer, AppointmentSerializer, DashboardClinicSerializer
+from .serializers import CompactAppointmentSerializer, CompactClinicSerializer, CompactDoctorSerializer, CompactPatientSerializer
+from clinic_project.serialization import list_data, list_serializer
+from .serializers import PatientVitalSignsSerializer
+from clinic_panel.stats import count_subquery, get_clinics_with_stats
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from clinic_project.permissions import RoleBasedPanelAccess
+from clinic_project.permissions import IsSuperAdmin, RoleBasedPanelAccess
+from clinic_project.perf import stats as perf_stats
+from clinic_project.pagination import CreatedAtCursorPagination, paginated_response
 
 
 User = get_user_model()
@@ -143,6 +151,9 @@ def switch_panel(request):
     })
 
 # -------------------- Dashboard --------------------
+DASHBOARD_LIST_SIZE = 10
+
+
 class DashboardAPIView(APIView):
     permission_classes = [IsAuthenticated]
     panel_role = 'Superadmin'
@@ -153,16 +164,21 @@ class DashboardAPIView(APIView):
             login_url = reverse("accounts:login")
             return redirect(login_url)
         
-        clinics = Clinic.objects.all()
-        doctors_count = Doctor.objects.count()
-        patients_count = Patient.objects.count()
-        consultations_count = Consultation.objects.count()
-        appointments_count = Appointment.objects.count()
-
-        clinics_serializer = ClinicSerializer(clinics, many=True)
-
-        # Annotate each patient with their appointment count
-        patients = Patient.objects.annotate(appointments_count=Count('appointments'))
+        # Totals come from the per-clinic rollup: O(clinics), not O(rows)
+        clinics = get_clinics_with_stats()
+        doctors_count = sum(clinic.stats.doctors_count for clinic in clinics)
+        patients_count = sum(clinic.stats.patients_count for clinic in clinics)
+        consultations_count = sum(clinic.stats.consultations_count for clinic in clinics)
+        appointments_count = sum(clinic.stats.appointments_count for clinic in clinics)
+
+        clinics_serializer = DashboardClinicSerializer(clinics, many=True)
+
+        # Latest patients / doctors with their appointment counts
+        patients = (
+            Patient.objects.order_by("-created_at")
+            .annotate(appointments_count=count_subquery(Appointment.objects.all(), field="patient"))
+            [:DASHBOARD_LIST_SIZE]
+        )
         patients_data = [
             {
                 "id": patient.id,
@@ -173,8 +189,11 @@ class DashboardAPIView(APIView):
             for patient in patients
         ]
 
-        # Annotate each doctor with their appointment count
-        doctors = Doctor.objects.annotate(bookings=Count('appointments'))
+        doctors = (
+            Doctor.objects.order_by("-created_at")
+            .annotate(bookings=count_subquery(Appointment.objects.all(), field="doctor"))
+            [:DASHBOARD_LIST_SIZE]
+        )
         doctors_data = [
             {
                 "id": doctor.id,
@@ -209,9 +228,10 @@ class ClinicListCreateAPIView(APIView):
     def get(self, request):
         if not request.user.is_authenticated:
             return redirect(reverse("accounts:login"))
-        clinics = Clinic.objects.order_by("-created_at")
-        serializer = ClinicSerializer(clinics, many=True)
-        return Response(serializer.data)
+        clinics, serializer_class = list_serializer(
+            request, Clinic.objects.order_by("-created_at"), ClinicSerializer, CompactClinicSerializer
+        )
+        return Response(list_data(request, clinics, serializer_class))
 
     def post(self, request):
         if not request.user.is_authenticated:
@@ -271,9 +291,10 @@ class DoctorListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        doctors = Doctor.objects.order_by("-created_at")
-        serializer = DoctorSerializer(doctors, many=True)
-        return Response(serializer.data)
+        doctors, serializer_class = list_serializer(
+            request, Doctor.objects.order_by("-created_at"), DoctorSerializer, CompactDoctorSerializer
+        )
+        return Response(list_data(request, doctors, serializer_class))
 
     def post(self, request):
         serializer = DoctorSerializer(data=request.data)
@@ -322,9 +343,10 @@ class PatientListCreateAPIView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def get(self, request):
-        patients = Patient.objects.order_by("-created_at")
-        serializer = PatientSerializer(patients, many=True, context={"request": request})
-        return Response(serializer.data)
+        patients, serializer_class = list_serializer(
+            request, Patient.objects.order_by("-created_at"), PatientSerializer, CompactPatientSerializer
+        )
+        return Response(list_data(request, patients, serializer_class))
 
     def post(self, request):
         serializer = PatientSerializer(data=request.data, context={"request": request})
@@ -390,11 +412,11 @@ class PatientAttachmentDeleteAPIView(APIView):
         attachment = get_object_or_404(PatientAttachment, pk=pk)
 
         # Optional: permission check
-        user = request.user
+        clinic = request.tenant.clinic
         patient = attachment.patient
 
-        if hasattr(user, "clinic_profile"):
-            if patient.clinic != user.clinic_profile:
+        if clinic:
+            if patient.clinic_id != clinic.id:
                 return Response(
                     {"detail": "Not authorized"},
                     status=status.HTTP_403_FORBIDDEN
@@ -422,8 +444,10 @@ class AppointmentListCreateAPIView(APIView):
         if patient_id:
             appointments = appointments.filter(patient_id=patient_id)
 
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        appointments, serializer_class = list_serializer(
+            request, appointments, AppointmentSerializer, CompactAppointmentSerializer
+        )
+        return Response(list_data(request, appointments, serializer_class))
 
     def post(self, request):
         data = request.data.copy()
@@ -479,45 +503,66 @@ class AppointmentRetrieveUpdateDeleteAPIView(APIView):
 
 
 class AdminPatientVitalSignsAPIView(APIView):
+    """
+    Patients with the vitals from their latest consultation.
+    One query per page (or for the whole stream with ?stream=true);
+    ?clinic_id= scopes to a clinic, clinic users only ever see their own.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    stream_chunk_size = 500
 
-    def get(self, request):
-        patient_id = request.query_params.get("patient_id")
+    def get_queryset(self, request):
         patients = Patient.objects.all()
+
+        clinic_id = request.query_params.get("clinic_id")
+        if request.tenant.clinic:
+            patients = patients.filter(clinic=request.tenant.clinic)
+        elif clinic_id:
+            patients = patients.filter(clinic_id=clinic_id)
+
+        patient_id = request.query_params.get("patient_id")
         if patient_id:
             patients = patients.filter(id=patient_id)
 
-        response_data = []
+        latest = Consultation.objects.filter(patient=OuterRef("pk")).order_by("-created_at", "-id")
+        vitals = {
+            f"latest_{field}": Subquery(latest.values(field)[:1])
+            for field in PatientVitalSignsSerializer.VITAL_SIGN_FIELDS.values()
+        }
+        return patients.only(
+            "id", "created_at", "first_name", "last_name", "dob", "blood_group",
+            "gender", "email", "phone_number", "address",
+        ).annotate(
+            last_visited=Subquery(latest.values("appointment__appointment_date")[:1]),
+            **vitals,
+        )
 
-        for patient in patients:
-            # Get latest consultation for this patient
-            latest_consultation = (
-                Consultation.objects.filter(patient=patient)
-                .order_by("-created_at")
-                .first()
-            )
+    def stream(self, patients):
+        serializer = PatientVitalSignsSerializer()
+        yield "["
+        for i, patient in enumerate(patients.order_by("-created_at", "-id").iterator(chunk_size=self.stream_chunk_size)):
+            yield ("," if i else "") + json.dumps(serializer.to_representation(patient))
+        yield "]"
 
-            vital_signs = {
-                "bloodPressure": latest_consultation.blood_pressure if latest_consultation and latest_consultation.blood_pressure else "N/A",
-                "heartRate": latest_consultation.pulse if latest_consultation and latest_consultation.pulse else "N/A",
-                "spo2": latest_consultation.spo2 if latest_consultation and latest_consultation.spo2 else "N/A",
-                "temperature": latest_consultation.temperature if latest_consultation and latest_consultation.temperature else "N/A",
-                "respiratoryRate": latest_consultation.respiratory_rate if latest_consultation and latest_consultation.respiratory_rate else "N/A",
-                "weight": latest_consultation.weight if latest_consultation and latest_consultation.weight else "N/A",
-            }
+    def get(self, request):
+        patients = self.get_queryset(request)
+        if request.query_params.get("stream", "").lower() in ("true", "1"):
+            return StreamingHttpResponse(self.stream(patients), content_type="application/json")
+        return paginated_response(self, request, patients, PatientVitalSignsSerializer)
 
-            response_data.append({
-                "id": patient.id,
-                "name": f"{patient.first_name} {patient.last_name}".strip(),
-                "dob": patient.dob,
-                "bloodGroup": patient.blood_group,
-                "gender": patient.gender,
-                "email": patient.email,
-                "phone": patient.phone_number,
-                "address": patient.address,
-                "lastVisited": latest_consultation.appointment.appointment_date if latest_consultation and latest_consultation.appointment else "N/A",
-                "vitalSigns": vital_signs,
-            })
-
-        return Response(response_data)
 
+# -------------------- Performance --------------------
+class PerformanceStatsAPIView(APIView):
+    """
+    Rolling latency / query percentiles per URL name, as recorded by
+    PerformanceMiddleware in the worker process that answers. DELETE resets them.
+    """
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        return Response(perf_stats.summary())
+
+    def delete(self, request):
+        perf_stats.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
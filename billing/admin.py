@@ -4,7 +4,8 @@ from .models import (
     ClinicBill, ClinicBillItem,
     LabBill,
     Medicine, Procedure,
-    PharmacyBill, PharmacyBillItem, ProcedurePayment
+    PharmacyBill, PharmacyBillItem, ProcedurePayment,
+    StockMovement,
 )
 
 # -------------------------
@@ -95,3 +96,11 @@ class ProcedurePaymentAdmin(admin.ModelAdmin):
     list_display = ("bill_item", "amount_paid", "payment_date", "notes")
     search_fields = ("bill_item__procedure__name", "bill_item__bill__bill_number")
     list_filter = ("payment_date",)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("medicine", "quantity", "reason", "reference", "created_at")
+    search_fields = ("medicine__name", "reference")
+    list_filter = ("reason", "created_at")
+    readonly_fields = ("medicine", "bill_item", "quantity", "reason", "reference", "created_at")
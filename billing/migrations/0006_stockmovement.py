@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_labbill_clinic_cost_labbill_date_labbill_doctor_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('SALE', 'Sale'), ('RETURN', 'Item removed'), ('CANCELLATION', 'Bill cancelled')], max_length=20)),
+                ('reference', models.CharField(blank=True, help_text='Bill number at the time of the movement', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bill_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='billing.pharmacybillitem')),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='billing.medicine')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
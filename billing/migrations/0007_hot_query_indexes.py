@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_notificationoutbox'),
+        ('billing', '0006_stockmovement'),
+        ('clinic_panel', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clinicbill',
+            index=models.Index(fields=['clinic', '-created_at'], name='clinicbill_clinic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labbill',
+            index=models.Index(fields=['clinic', '-created_at'], name='labbill_clinic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialpurchasebill',
+            index=models.Index(fields=['clinic', '-created_at'], name='mpbill_clinic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pharmacybill',
+            index=models.Index(fields=['clinic', '-created_at'], name='pharmbill_clinic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pharmacybill',
+            index=models.Index(fields=['patient', '-created_at'], name='pharmbill_patient_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_notificationoutbox'),
+        ('billing', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['clinic', 'updated_at'], name='medicine_clinic_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='procedure',
+            index=models.Index(fields=['clinic', 'updated_at'], name='procedure_clinic_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def record_sales(apps, schema_editor):
+    """
+    Bills from before the stock ledger took their medicines without leaving
+    a SALE movement, so there was nothing outstanding to return when they
+    are cancelled, edited or deleted. Record what the items still hold.
+    """
+    PharmacyBillItem = apps.get_model("billing", "PharmacyBillItem")
+    StockMovement = apps.get_model("billing", "StockMovement")
+
+    items = (
+        PharmacyBillItem.objects.filter(item_type="MEDICINE", medicine__isnull=False, stock_movements__isnull=True)
+        .exclude(bill__status="CANCELLED")
+        .values_list("pk", "medicine_id", "quantity", "bill__bill_number")
+    )
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(medicine_id=medicine_id, bill_item_id=item_id, quantity=-quantity,
+                          reason="SALE", reference=bill_number)
+            for item_id, medicine_id, quantity, bill_number in items.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0008_delta_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(record_sales, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from clinic_panel.models import Clinic, Patient, Doctor
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.db.models.functions import Coalesce
+from collections import defaultdict
+from decimal import Decimal
+from clinic_panel.models import Clinic, Patient, Doctor, DocumentSequence
 import datetime
 
 # -----------------------
@@ -30,6 +37,41 @@ class BaseBill(models.Model):
         return f"{self.bill_number} ({self.clinic.name})"
 
 
+def recalculate_bill_total(bill):
+    """
+    Set `bill.total_amount` to the sum of its item subtotals with a single
+    aggregate UPDATE, instead of reading every item back.
+    """
+    totals = (
+        bill.items.model.objects.filter(bill=OuterRef("pk"))
+        .order_by()
+        .values("bill")
+        .annotate(total=Sum("subtotal"))
+        .values("total")
+    )
+    type(bill).objects.filter(pk=bill.pk).update(
+        total_amount=Coalesce(Subquery(totals), Value(Decimal("0")), output_field=models.DecimalField()),
+        updated_at=timezone.now(),
+    )
+
+
+def bulk_create_bill_items(bill, items):
+    """
+    Insert unsaved `items` for `bill` in one INSERT and set the bill total
+    with one UPDATE. Item.save() is not called, so the per-item total
+    recalculation is skipped; callers handle any other side effects
+    (e.g. StockMovement.reserve).
+    """
+    items = list(items)
+    for item in items:
+        item.bill = bill
+        item.prepare()
+    created = bill.items.model.objects.bulk_create(items)
+    recalculate_bill_total(bill)
+    bill.total_amount = sum((item.subtotal for item in items), Decimal("0"))
+    return created
+
+
 # -----------------------
 # 1. Material Purchase Bill
 # -----------------------
@@ -37,17 +79,15 @@ class MaterialPurchaseBill(BaseBill):
     supplier_name = models.CharField(max_length=200)
     invoice_number = models.CharField(max_length=100, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["clinic", "-created_at"], name="mpbill_clinic_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         # Generate Bill Number if not exists
         if not self.bill_number:
-            last = MaterialPurchaseBill.objects.order_by('id').last()
-            if last and last.bill_number:
-                try:
-                    number = int(last.bill_number.split('-')[-1]) + 1
-                except ValueError:
-                    number = 1
-            else:
-                number = 1
+            number = DocumentSequence.next_value(DocumentSequence.MATERIAL_PURCHASE_BILL)
             self.bill_number = f"MPB-{number:05d}"
 
         super().save(*args, **kwargs)
@@ -60,14 +100,16 @@ class MaterialPurchaseItem(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
 
-    def save(self, *args, **kwargs):
+    def prepare(self):
         self.subtotal = self.quantity * self.unit_price
+
+    def save(self, *args, **kwargs):
+        self.prepare()
         super().save(*args, **kwargs)
 
         # Update bill total_amount automatically after saving item
-        bill = self.bill
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        recalculate_bill_total(self.bill)
+        self.bill.refresh_from_db(fields=["total_amount", "updated_at"])
 
 
 # -----------------------
@@ -76,17 +118,15 @@ class MaterialPurchaseItem(models.Model):
 class ClinicBill(BaseBill):
     vendor_name = models.CharField(max_length=200)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["clinic", "-created_at"], name="clinicbill_clinic_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         # Generate Bill Number if not exists
         if not self.bill_number:
-            last = ClinicBill.objects.order_by('id').last()
-            if last and last.bill_number:
-                try:
-                    number = int(last.bill_number.split('-')[-1]) + 1
-                except ValueError:
-                    number = 1
-            else:
-                number = 1
+            number = DocumentSequence.next_value(DocumentSequence.CLINIC_BILL)
             self.bill_number = f"CB-{number:05d}"
 
         super().save(*args, **kwargs)  
@@ -100,14 +140,16 @@ class ClinicBillItem(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
 
-    def save(self, *args, **kwargs):
+    def prepare(self):
         self.subtotal = self.quantity * self.unit_price
+
+    def save(self, *args, **kwargs):
+        self.prepare()
         super().save(*args, **kwargs)
 
         # Update bill total_amount automatically after saving item
-        bill = self.bill
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        recalculate_bill_total(self.bill)
+        self.bill.refresh_from_db(fields=["total_amount", "updated_at"])
 
 
 # -----------------------
@@ -172,17 +214,15 @@ class LabBill(BaseBill):
 
     date = models.DateField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["clinic", "-created_at"], name="labbill_clinic_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         # Auto-generate bill number
         if not self.bill_number:
-            last = LabBill.objects.order_by('id').last()
-            if last and last.bill_number:
-                try:
-                    number = int(last.bill_number.split('-')[-1]) + 1
-                except ValueError:
-                    number = 1
-            else:
-                number = 1
+            number = DocumentSequence.next_value(DocumentSequence.LAB_BILL)
             self.bill_number = f"LB-{number:05d}"
 
         # Total = clinic_cost (since this is a single-line bill)
@@ -207,6 +247,12 @@ class Medicine(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync (?updated_since=, see clinic_panel.sync)
+            models.Index(fields=["clinic", "updated_at"], name="medicine_clinic_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.dosage})" if self.dosage else self.name
 
@@ -219,6 +265,12 @@ class Procedure(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync (?updated_since=, see clinic_panel.sync)
+            models.Index(fields=["clinic", "updated_at"], name="procedure_clinic_updated_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -227,27 +279,48 @@ class PharmacyBill(BaseBill):
     patient = models.ForeignKey("clinic_panel.Patient", on_delete=models.CASCADE, related_name="pharmacy_bills")
     bill_number = models.CharField(max_length=20, unique=True, editable=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["clinic", "-created_at"], name="pharmbill_clinic_created_idx"),
+            models.Index(fields=["patient", "-created_at"], name="pharmbill_patient_created_idx"),
+        ]
+
     def __str__(self):
         return f"Pharmacy Bill #{self.bill_number} - {self.patient.first_name} {self.patient.last_name}"
 
     def save(self, *args, **kwargs):
         if not self.bill_number:
-            # Get the last valid bill number
-            last_bill = PharmacyBill.objects.exclude(bill_number='').order_by('id').last()
-            if last_bill and last_bill.bill_number.startswith('PB-'):
-                try:
-                    last_number = int(last_bill.bill_number.split('-')[-1])
-                except ValueError:
-                    last_number = 0
-            else:
-                last_number = 0
-            # Generate new bill number
-            self.bill_number = f"PB-{last_number + 1:05d}"
+            number = DocumentSequence.next_value(DocumentSequence.PHARMACY_BILL)
+            self.bill_number = f"PB-{number:05d}"
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # The stored status, locked: of two concurrent cancels only the
+            # first sees the bill still open.
+            previous_status = None
+            if self.pk:
+                previous_status = (
+                    PharmacyBill.objects.select_for_update().filter(pk=self.pk)
+                    .values_list("status", flat=True).first()
+                )
+            super().save(*args, **kwargs)
+
+            # Cancelling hands the medicines back; re-opening takes them again
+            if previous_status and previous_status != self.status:
+                if self.status == "CANCELLED":
+                    StockMovement.release(self.items.all(), StockMovement.CANCELLATION, reference=self.bill_number)
+                elif previous_status == "CANCELLED":
+                    StockMovement.reserve(self.items.all(), reference=self.bill_number)
 
 
 
+class PharmacyBillItemQuerySet(models.QuerySet):
+    def delete(self):
+        # Put outstanding medicine stock back before the rows go
+        with transaction.atomic():
+            StockMovement.release(self, StockMovement.RETURN)
+            return super().delete()
+
+
 class PharmacyBillItem(models.Model):
     ITEM_TYPE_CHOICES = [
         ('MEDICINE', 'Medicine'),
@@ -263,15 +336,15 @@ class PharmacyBillItem(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
 
+    objects = PharmacyBillItemQuerySet.as_manager()
+
     def clean(self):
         if self.item_type == "MEDICINE" and not self.medicine:
             raise ValidationError("Medicine must be selected for medicine items.")
         if self.item_type == "PROCEDURE" and not self.procedure:
             raise ValidationError("Procedure must be selected for procedure items.")
 
-    def save(self, *args, **kwargs):
-        is_new = self.pk is None
-
+    def prepare(self):
         # Auto-fill unit_price if not set
         if self.item_type == 'MEDICINE' and self.medicine:
             self.unit_price = self.medicine.unit_price
@@ -284,19 +357,25 @@ class PharmacyBillItem(models.Model):
         # calculate subtotal safely
         self.subtotal = self.quantity * self.unit_price
 
-        # Handle medicine stock only when creating a new item
-        if is_new and self.item_type == 'MEDICINE' and self.medicine:
-            if self.medicine.stock < self.quantity:
-                raise ValueError("Not enough stock available")
-            self.medicine.stock -= self.quantity
-            self.medicine.save()
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        self.prepare()
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        # Update bill total after saving
-        total = sum(item.subtotal for item in self.bill.items.all())
-        self.bill.total_amount = total
-        self.bill.save()
+            # Handle medicine stock only when creating a new item
+            if is_new and self.bill.status != "CANCELLED":
+                StockMovement.reserve([self], reference=self.bill.bill_number)
+
+            # Update bill total after saving
+            recalculate_bill_total(self.bill)
+        self.bill.refresh_from_db(fields=["total_amount", "updated_at"])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            StockMovement.release([self], StockMovement.RETURN, reference=self.bill.bill_number)
+            return super().delete(*args, **kwargs)
 
 
     def __str__(self):
@@ -334,3 +413,125 @@ class ProcedurePayment(models.Model):
         procedure_name = self.bill_item.procedure.name if self.bill_item.procedure else "Procedure"
         return f"{bill_number} - Payment of {self.amount_paid} for {procedure_name}"
 
+
+# -----------------------
+# 5. Medicine stock ledger
+# -----------------------
+class StockMovement(models.Model):
+    """
+    One row per change to a medicine's stock (negative = out). Reservations
+    and releases move `Medicine.stock` with a single conditional UPDATE per
+    batch and record what they did here, so the outstanding quantity for
+    any bill item is the negated sum of its movements.
+    """
+    SALE = "SALE"
+    RETURN = "RETURN"
+    CANCELLATION = "CANCELLATION"
+
+    REASON_CHOICES = [
+        (SALE, "Sale"),
+        (RETURN, "Item removed"),
+        (CANCELLATION, "Bill cancelled"),
+    ]
+
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name="stock_movements")
+    bill_item = models.ForeignKey(
+        PharmacyBillItem, on_delete=models.SET_NULL, null=True, blank=True, related_name="stock_movements"
+    )
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=50, blank=True, help_text="Bill number at the time of the movement")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.medicine} {self.quantity:+d} ({self.reason})"
+
+    @staticmethod
+    def _per_medicine(quantities):
+        return Case(
+            *[When(pk=medicine_id, then=Value(quantity)) for medicine_id, quantity in quantities.items()],
+            output_field=models.IntegerField(),
+        )
+
+    @classmethod
+    def reserve(cls, items, reference=""):
+        """
+        Take stock for saved medicine `items` in one statement:
+        UPDATE ... SET stock = stock - q WHERE id IN (...) AND stock >= q.
+        If any medicine is short nothing is taken and ValueError is raised.
+        """
+        items = [item for item in items if item.item_type == 'MEDICINE' and item.medicine_id]
+        quantities = defaultdict(int)
+        for item in items:
+            quantities[item.medicine_id] += item.quantity
+        if not quantities:
+            return
+
+        needed = cls._per_medicine(quantities)
+        with transaction.atomic():
+            reserved = Medicine.objects.filter(pk__in=quantities, stock__gte=needed).update(
+                stock=F("stock") - needed, updated_at=timezone.now()
+            )
+            if reserved != len(quantities):
+                raise ValueError("Not enough stock available")
+            cls.objects.bulk_create([
+                cls(medicine_id=item.medicine_id, bill_item=item, quantity=-item.quantity,
+                    reason=cls.SALE, reference=reference)
+                for item in items
+            ])
+
+        for item in items:
+            if PharmacyBillItem.medicine.is_cached(item):
+                item.medicine.stock -= item.quantity
+
+    @classmethod
+    def release(cls, items, reason, reference=""):
+        """
+        Return whatever stock `items` still hold according to the ledger.
+        Items that were already released (e.g. on a cancelled bill) hold
+        nothing, so releasing twice is a no-op.
+        """
+        if isinstance(items, models.QuerySet):
+            item_ids = items.values("pk")
+        else:
+            item_ids = [item.pk for item in items]
+
+        with transaction.atomic():
+            # Locked until the movements below are written, so a concurrent
+            # release of the same items waits and then finds them settled.
+            locked = PharmacyBillItem.objects.select_for_update().filter(pk__in=item_ids).order_by("pk")
+            outstanding = list(
+                cls.objects.filter(bill_item_id__in=list(locked.values_list("pk", flat=True)))
+                .values("bill_item_id", "medicine_id")
+                .annotate(net=Sum("quantity"))
+                .filter(net__lt=0)
+            )
+            if not outstanding:
+                return
+
+            quantities = defaultdict(int)
+            for row in outstanding:
+                quantities[row["medicine_id"]] -= row["net"]
+
+            returned = cls._per_medicine(quantities)
+            Medicine.objects.filter(pk__in=quantities).update(stock=F("stock") + returned, updated_at=timezone.now())
+
+            # Rows being deleted can't be referenced by new movements
+            keep_link = reason == cls.CANCELLATION
+            cls.objects.bulk_create([
+                cls(medicine_id=row["medicine_id"], bill_item_id=row["bill_item_id"] if keep_link else None,
+                    quantity=-row["net"], reason=reason, reference=reference)
+                for row in outstanding
+            ])
+
+
+@receiver(pre_delete, sender=PharmacyBill)
+def release_deleted_bill_stock(sender, instance, origin=None, **kwargs):
+    # Only when the bill itself is deleted: a clinic or patient delete may be
+    # removing the medicines in the same cascade.
+    if isinstance(origin, PharmacyBill) or getattr(origin, "model", None) is PharmacyBill:
+        StockMovement.release(instance.items.all(), StockMovement.RETURN, reference=instance.bill_number)
+
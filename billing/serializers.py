@@ -4,10 +4,46 @@ from .models import (
     ClinicBill, ClinicBillItem,
     LabBill,
     PharmacyBill, PharmacyBillItem, ProcedurePayment,
-    Medicine, Procedure, Clinic, Patient,
+    Medicine, Procedure, Clinic, Patient, StockMovement,
 )
 from doctor_panel.models import Consultation 
+from django.db import transaction
 from django.db.models import Sum
+from .models import bulk_create_bill_items
+from clinic_project.serialization import EagerLoadingMixin, SparseFieldsetMixin
+
+
+def write_pharmacy_items(bill, items_data):
+    """
+    Bulk-write pharmacy bill items plus their procedure payments: one INSERT
+    for items, one UPDATE for the bill total, one stock reservation for all
+    medicines (plus its ledger INSERT) and one INSERT for payments.
+    """
+    items, payments = [], []
+    for item_data in items_data:
+        procedure_payments_data = item_data.pop('procedure_payments', [])
+        item = PharmacyBillItem(
+            item_type=item_data.get('item_type'),
+            medicine=item_data.get('medicine'),
+            procedure=item_data.get('procedure'),
+            quantity=item_data.get('quantity', 1),
+            unit_price=item_data.get('unit_price', 0),
+        )
+        items.append(item)
+        if item.item_type == "PROCEDURE":
+            payments.extend((item, payment_data) for payment_data in procedure_payments_data)
+
+    bulk_create_bill_items(bill, items)
+    if bill.status != "CANCELLED":
+        StockMovement.reserve(items, reference=bill.bill_number)
+    ProcedurePayment.objects.bulk_create([
+        ProcedurePayment(
+            bill_item=item,
+            amount_paid=payment_data.get('amount_paid', 0),
+            notes=payment_data.get('notes', ''),
+        )
+        for item, payment_data in payments
+    ])
 
 # -------------------- Material Purchase --------------------
 class MaterialPurchaseItemSerializer(serializers.ModelSerializer):
@@ -17,7 +53,7 @@ class MaterialPurchaseItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['subtotal']  # subtotal is calculated automatically
 
 
-class MaterialPurchaseBillSerializer(serializers.ModelSerializer):
+class MaterialPurchaseBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_name = serializers.CharField(source="clinic.name", read_only=True)  # show name
     clinic = serializers.PrimaryKeyRelatedField(queryset=Clinic.objects.all())  # accept ID on write
     items = MaterialPurchaseItemSerializer(many=True)
@@ -28,21 +64,21 @@ class MaterialPurchaseBillSerializer(serializers.ModelSerializer):
                   'total_amount', 'supplier_name', 'invoice_number', 'items']
         read_only_fields = ['bill_number', 'total_amount']
 
+    select_related = ("clinic",)
+    prefetch_related = ("items",)
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
 
         # First, create the bill (so it gets a primary key)
         bill = MaterialPurchaseBill.objects.create(**validated_data)
 
-        # Now create items related to the saved bill
-        for item_data in items_data:
-            MaterialPurchaseItem.objects.create(bill=bill, **item_data)
-
-        # Update total_amount
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        # Now create items related to the saved bill and set total_amount
+        bulk_create_bill_items(bill, [MaterialPurchaseItem(**item_data) for item_data in items_data])
         return bill
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
@@ -52,15 +88,9 @@ class MaterialPurchaseBillSerializer(serializers.ModelSerializer):
         instance.save()
 
         if items_data is not None:
-            # Remove old items
+            # Replace items and update total_amount
             instance.items.all().delete()
-            # Add new items
-            for item_data in items_data:
-                MaterialPurchaseItem.objects.create(bill=instance, **item_data)
-
-            # Update total_amount
-            instance.total_amount = sum(item.subtotal for item in instance.items.all())
-            instance.save()
+            bulk_create_bill_items(instance, [MaterialPurchaseItem(**item_data) for item_data in items_data])
 
         return instance
 
@@ -72,7 +102,7 @@ class ClinicBillItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'item_name', 'quantity', 'unit_price', 'subtotal']
         read_only_fields = ['subtotal']  # subtotal calculated automatically
 
-class ClinicBillSerializer(serializers.ModelSerializer):
+class ClinicBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_name = serializers.CharField(source="clinic.name", read_only=True)  # show name
     clinic = serializers.PrimaryKeyRelatedField(queryset=Clinic.objects.all())  # accept ID on write
     items = ClinicBillItemSerializer(many=True)
@@ -82,18 +112,19 @@ class ClinicBillSerializer(serializers.ModelSerializer):
         fields = ['id', 'bill_number', 'clinic', 'clinic_name', 'bill_date', 'status', 'total_amount', 'vendor_name', 'items']
         read_only_fields = ['bill_number', 'total_amount', 'clinic']
 
+    select_related = ("clinic",)
+    prefetch_related = ("items",)
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         bill = ClinicBill.objects.create(**validated_data)
 
-        for item_data in items_data:
-            ClinicBillItem.objects.create(bill=bill, **item_data)
-
-        # Now calculate total_amount after items are created
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        # Create items and set total_amount
+        bulk_create_bill_items(bill, [ClinicBillItem(**item_data) for item_data in items_data])
         return bill
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
@@ -102,19 +133,14 @@ class ClinicBillSerializer(serializers.ModelSerializer):
         instance.save()
 
         if items_data is not None:
-            # Delete old items
+            # Replace items and update total_amount
             instance.items.all().delete()
-            # Create new items
-            for item_data in items_data:
-                ClinicBillItem.objects.create(bill=instance, **item_data)
-            # Update total_amount
-            instance.total_amount = sum(item.subtotal for item in instance.items.all())
-            instance.save()
+            bulk_create_bill_items(instance, [ClinicBillItem(**item_data) for item_data in items_data])
 
         return instance
 
 
-class ClinicPanelBillSerializer(serializers.ModelSerializer):
+class ClinicPanelBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_name = serializers.CharField(source="clinic.name", read_only=True)
     items = ClinicBillItemSerializer(many=True)
 
@@ -127,17 +153,17 @@ class ClinicPanelBillSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['bill_number', 'total_amount', 'clinic']
 
+    select_related = ("clinic",)
+    prefetch_related = ("items",)
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         bill = ClinicBill.objects.create(**validated_data)
-
-        for item_data in items_data:
-            ClinicBillItem.objects.create(bill=bill, **item_data)
-
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        bulk_create_bill_items(bill, [ClinicBillItem(**item_data) for item_data in items_data])
         return bill
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
@@ -147,16 +173,13 @@ class ClinicPanelBillSerializer(serializers.ModelSerializer):
 
         if items_data is not None:
             instance.items.all().delete()
-            for item_data in items_data:
-                ClinicBillItem.objects.create(bill=instance, **item_data)
-            instance.total_amount = sum(item.subtotal for item in instance.items.all())
-            instance.save()
+            bulk_create_bill_items(instance, [ClinicBillItem(**item_data) for item_data in items_data])
 
         return instance
 
 
 # -------------------- Lab Bill --------------------
-class LabBillSerializer(serializers.ModelSerializer):
+class LabBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_name = serializers.CharField(
         source="clinic.name",
         read_only=True
@@ -205,6 +228,8 @@ class LabBillSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
+    select_related = ("clinic",)
+
     # -----------------------------------
     # CREATE
     # -----------------------------------
@@ -268,7 +293,7 @@ class LabBillSerializer(serializers.ModelSerializer):
 
         return super().update(instance, validated_data)
 
-class LabPanelBillSerializer(serializers.ModelSerializer):
+class LabPanelBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_name = serializers.CharField(
         source="clinic.name",
         read_only=True
@@ -312,6 +337,8 @@ class LabPanelBillSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
+    select_related = ("clinic",)
+
     def create(self, validated_data):
         request = self.context.get("request")
         user = request.user if request else None
@@ -367,13 +394,13 @@ class LabPanelBillSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 # -------------------- Pharmacy --------------------
-class MedicineSerializer(serializers.ModelSerializer):
+class MedicineSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Medicine
         fields = ['id', 'name', 'dosage', 'stock', 'unit_price', 'expiry_date', 'clinic']
         read_only_fields = ['clinic']
 
-class ProcedureSerializer(serializers.ModelSerializer):
+class ProcedureSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Procedure
         fields = ['id', 'name', 'description', 'price', 'clinic']
@@ -389,7 +416,7 @@ class ProcedureSerializer(serializers.ModelSerializer):
 # ------------------------------------------------------------------------------------------------
 
 
-class ProcedurePaymentSerializer(serializers.ModelSerializer):
+class ProcedurePaymentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     bill_number = serializers.CharField(source="bill_item.bill.bill_number", read_only=True)
     procedure_name = serializers.CharField(source="bill_item.procedure.name", read_only=True)
     balance_due = serializers.SerializerMethodField()
@@ -470,7 +497,7 @@ class PharmacyBillItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class PharmacyBillSerializer(serializers.ModelSerializer):
+class PharmacyBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic_id = serializers.PrimaryKeyRelatedField(
         source="clinic", queryset=Clinic.objects.all(), write_only=True
     )
@@ -496,6 +523,14 @@ class PharmacyBillSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['bill_number', 'total_amount']
 
+    select_related = ("clinic", "patient")
+    prefetch_related = ("items__medicine", "items__procedure", "items__payments")
+    field_requires = {
+        "patient": ("patient",),
+        "doctor_name": ("patient", "clinic"),
+        "paid_amount": ("items", "total_amount"),
+    }
+
     def get_patient(self, obj):
         if obj.patient:
             return {
@@ -528,33 +563,14 @@ class PharmacyBillSerializer(serializers.ModelSerializer):
         total_balance_due = sum(item.balance_due for item in obj.items.all())
         return obj.total_amount - total_balance_due
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         bill = PharmacyBill.objects.create(**validated_data)
-
-        for item_data in items_data:
-            procedure_payments_data = item_data.pop('procedure_payments', [])
-            bill_item = PharmacyBillItem.objects.create(
-                bill=bill,
-                item_type=item_data.get('item_type'),
-                medicine=item_data.get('medicine'),
-                procedure=item_data.get('procedure'),
-                quantity=item_data.get('quantity', 1),
-                unit_price=item_data.get('unit_price', 0),
-            )
-
-            if bill_item.item_type == "PROCEDURE":
-                for payment_data in procedure_payments_data:
-                    ProcedurePayment.objects.create(
-                        bill_item=bill_item,
-                        amount_paid=payment_data.get('amount_paid', 0),
-                        notes=payment_data.get('notes', '')
-                    )
-
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        write_pharmacy_items(bill, items_data)
         return bill
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
@@ -563,33 +579,10 @@ class PharmacyBillSerializer(serializers.ModelSerializer):
         instance.save()
 
         if items_data is not None:
-            # Delete old items & payments
-            for item in instance.items.all():
-                if item.item_type == "PROCEDURE":
-                    item.payments.all().delete()
+            # Delete old items (their payments cascade) and recreate
             instance.items.all().delete()
+            write_pharmacy_items(instance, items_data)
 
-            # Recreate items & payments
-            for item_data in items_data:
-                procedure_payments_data = item_data.pop('procedure_payments', [])
-                bill_item = PharmacyBillItem.objects.create(
-                    bill=instance,
-                    item_type=item_data.get('item_type'),
-                    medicine=item_data.get('medicine'),
-                    procedure=item_data.get('procedure'),
-                    quantity=item_data.get('quantity', 1),
-                    unit_price=item_data.get('unit_price', 0),
-                )
-                if bill_item.item_type == "PROCEDURE":
-                    for payment_data in procedure_payments_data:
-                        ProcedurePayment.objects.create(
-                            bill_item=bill_item,
-                            amount_paid=payment_data.get('amount_paid', 0),
-                            notes=payment_data.get('notes', '')
-                        )
-
-        instance.total_amount = sum(item.subtotal for item in instance.items.all())
-        instance.save()
         return instance
 
 
@@ -631,7 +624,7 @@ class ClinicPharmacyBillItemSerializer(serializers.ModelSerializer):
             "procedure_payments",
         ]
 
-class ClinicPharmacyBillSerializer(serializers.ModelSerializer):
+class ClinicPharmacyBillSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     clinic = serializers.StringRelatedField(read_only=True)
     patient_id = serializers.PrimaryKeyRelatedField(
         source="patient",
@@ -654,6 +647,14 @@ class ClinicPharmacyBillSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['bill_number', 'total_amount', 'clinic']
 
+    select_related = ("clinic", "patient")
+    prefetch_related = ("items__medicine", "items__procedure", "items__payments")
+    field_requires = {
+        "patient": ("patient",),
+        "doctor_name": ("patient", "clinic"),
+        "paid_amount": ("items", "total_amount"),
+    }
+
     def get_patient(self, obj):
         if obj.patient:
             return {
@@ -683,36 +684,17 @@ class ClinicPharmacyBillSerializer(serializers.ModelSerializer):
         total_balance_due = sum(item.balance_due for item in obj.items.all())
         return obj.total_amount - total_balance_due
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         clinic = self.context['clinic']
         bill = PharmacyBill.objects.create(clinic=clinic, **validated_data)
 
-        for item_data in items_data:
-            procedure_payments_data = item_data.pop('procedure_payments', [])
-            bill_item = PharmacyBillItem.objects.create(
-                bill=bill,
-                item_type=item_data.get('item_type'),
-                medicine=item_data.get('medicine'),
-                procedure=item_data.get('procedure'),
-                quantity=item_data.get('quantity', 1),
-                unit_price=item_data.get('unit_price', 0)
-            )
-
-            # Create procedure payments if this is a PROCEDURE item
-            if bill_item.item_type == "PROCEDURE":
-                for payment in procedure_payments_data:
-                    ProcedurePayment.objects.create(
-                        bill_item=bill_item,
-                        amount_paid=payment.get('amount_paid', 0),
-                        notes=payment.get('notes', '')
-                    )
-
-        # Update total amount
-        bill.total_amount = sum(item.subtotal for item in bill.items.all())
-        bill.save()
+        # Create items, procedure payments and total amount
+        write_pharmacy_items(bill, items_data)
         return bill
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
 
@@ -721,34 +703,10 @@ class ClinicPharmacyBillSerializer(serializers.ModelSerializer):
         instance.save()
 
         if items_data is not None:
-            # Delete existing items and their procedure payments
-            for item in instance.items.all():
-                if item.item_type == "PROCEDURE":
-                    item.payments.all().delete()
+            # Delete existing items (their procedure payments cascade) and recreate
             instance.items.all().delete()
+            write_pharmacy_items(instance, items_data)
 
-            # Create new items and payments
-            for item_data in items_data:
-                procedure_payments_data = item_data.pop('procedure_payments', [])
-                bill_item = PharmacyBillItem.objects.create(
-                    bill=instance,
-                    item_type=item_data.get('item_type'),
-                    medicine=item_data.get('medicine'),
-                    procedure=item_data.get('procedure'),
-                    quantity=item_data.get('quantity', 1),
-                    unit_price=item_data.get('unit_price', 0)
-                )
-
-                if bill_item.item_type == "PROCEDURE":
-                    for payment in procedure_payments_data:
-                        ProcedurePayment.objects.create(
-                            bill_item=bill_item,
-                            amount_paid=payment.get('amount_paid', 0),
-                            notes=payment.get('notes', '')
-                        )
-
-        instance.total_amount = sum(item.subtotal for item in instance.items.all())
-        instance.save()
         return instance
 
 
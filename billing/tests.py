@@ -1,3 +1,346 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from importlib import import_module
+from unittest import skipUnless
+from django.apps import apps
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User
+from admin_panel.models import Clinic
+from clinic_panel.models import Patient
+from .models import (
+    ClinicBill, ClinicBillItem, Medicine, PharmacyBill, PharmacyBillItem, Procedure, ProcedurePayment, StockMovement,
+)
+from .serializers import ClinicBillSerializer, MaterialPurchaseBillSerializer, PharmacyBillSerializer
 
-# Create your tests here.
+
+class BulkBillItemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        cls.clinic = Clinic.objects.create(user=user, name="Alpha Clinic")
+        cls.patient = Patient.objects.create(
+            clinic=cls.clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+
+    def material_bill(self, items):
+        serializer = MaterialPurchaseBillSerializer(data={
+            "clinic": self.clinic.pk,
+            "supplier_name": "Supplier",
+            "items": [{"item_name": f"Item {i}", "quantity": 2, "unit_price": "1.50"} for i in range(items)],
+        })
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as ctx:
+            bill = serializer.save()
+        return bill, len(ctx.captured_queries)
+
+    def test_create_cost_does_not_grow_with_items(self):
+        self.material_bill(1)  # creates the bill number counter
+        small, small_queries = self.material_bill(2)
+        large, large_queries = self.material_bill(20)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large.items.count(), 20)
+        large.refresh_from_db()
+        self.assertEqual(large.total_amount, Decimal("60.00"))
+
+    def test_update_replaces_items_and_total(self):
+        bill = ClinicBill.objects.create(clinic=self.clinic, vendor_name="Vendor")
+        ClinicBillItem.objects.create(bill=bill, item_name="Old", quantity=1, unit_price=Decimal("9"))
+        bill.refresh_from_db()
+        self.assertEqual(bill.total_amount, Decimal("9"))
+
+        serializer = ClinicBillSerializer(bill, data={
+            "vendor_name": "Vendor",
+            "items": [{"item_name": "New", "quantity": 3, "unit_price": "2.00"}],
+        }, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        bill.refresh_from_db()
+        self.assertEqual(list(bill.items.values_list("item_name", flat=True)), ["New"])
+        self.assertEqual(bill.total_amount, Decimal("6.00"))
+        self.assertEqual(serializer.data["total_amount"], "6.00")
+
+    def pharmacy_data(self, medicine, procedure, quantity):
+        return {
+            "clinic_id": self.clinic.pk,
+            "patient_id": self.patient.pk,
+            "items": [
+                {"item_type": "MEDICINE", "medicine_id": medicine.pk, "quantity": quantity},
+                {
+                    "item_type": "PROCEDURE", "procedure_id": procedure.pk, "quantity": 1,
+                    "procedure_payments": [{"amount_paid": "20.00"}, {"amount_paid": "5.00"}],
+                },
+            ],
+        }
+
+    def test_pharmacy_items_stock_and_payments(self):
+        medicine = Medicine.objects.create(clinic=self.clinic, name="Para", stock=10, unit_price=Decimal("2"))
+        procedure = Procedure.objects.create(clinic=self.clinic, name="Dressing", price=Decimal("50"))
+
+        serializer = PharmacyBillSerializer(data=self.pharmacy_data(medicine, procedure, 4))
+        serializer.is_valid(raise_exception=True)
+        bill = serializer.save()
+
+        bill.refresh_from_db()
+        medicine.refresh_from_db()
+        self.assertEqual(bill.total_amount, Decimal("58"))
+        self.assertEqual(medicine.stock, 6)
+        self.assertEqual(ProcedurePayment.objects.filter(bill_item__bill=bill).count(), 2)
+
+    def test_pharmacy_stock_shortage_rolls_back(self):
+        medicine = Medicine.objects.create(clinic=self.clinic, name="Para", stock=3, unit_price=Decimal("2"))
+        procedure = Procedure.objects.create(clinic=self.clinic, name="Dressing", price=Decimal("50"))
+
+        serializer = PharmacyBillSerializer(data=self.pharmacy_data(medicine, procedure, 4))
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(ValueError):
+            serializer.save()
+
+        medicine.refresh_from_db()
+        self.assertEqual(medicine.stock, 3)
+        self.assertFalse(PharmacyBill.objects.exists())
+
+
+def make_pharmacy_bill(clinic, patient, medicine, quantity):
+    serializer = PharmacyBillSerializer(data={
+        "clinic_id": clinic.pk,
+        "patient_id": patient.pk,
+        "items": [{"item_type": "MEDICINE", "medicine_id": medicine.pk, "quantity": quantity}],
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        cls.clinic = Clinic.objects.create(user=user, name="Alpha Clinic")
+        cls.patient = Patient.objects.create(
+            clinic=cls.clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+
+    def setUp(self):
+        self.para = Medicine.objects.create(clinic=self.clinic, name="Para", stock=10, unit_price=Decimal("2"))
+        self.ibu = Medicine.objects.create(clinic=self.clinic, name="Ibu", stock=5, unit_price=Decimal("3"))
+
+    def stock(self):
+        return dict(Medicine.objects.values_list("name", "stock"))
+
+    def test_whole_bill_is_reserved_in_one_statement(self):
+        bill = PharmacyBill.objects.create(clinic=self.clinic, patient=self.patient)
+        items = PharmacyBillItem.objects.bulk_create([
+            PharmacyBillItem(bill=bill, item_type="MEDICINE", medicine=self.para, quantity=2, subtotal=0),
+            PharmacyBillItem(bill=bill, item_type="MEDICINE", medicine=self.para, quantity=1, subtotal=0),
+            PharmacyBillItem(bill=bill, item_type="MEDICINE", medicine=self.ibu, quantity=4, subtotal=0),
+        ])
+
+        # stock UPDATE + ledger INSERT, inside a savepoint
+        with self.assertNumQueries(4):
+            StockMovement.reserve(items, reference=bill.bill_number)
+
+        self.assertEqual(self.stock(), {"Para": 7, "Ibu": 1})
+        self.assertEqual(StockMovement.objects.filter(reason=StockMovement.SALE).count(), 3)
+
+    def test_short_medicine_takes_nothing(self):
+        with self.assertRaises(ValueError):
+            make_pharmacy_bill(self.clinic, self.patient, self.ibu, 6)
+
+        self.assertEqual(self.stock(), {"Para": 10, "Ibu": 5})
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_update_returns_replaced_items(self):
+        bill = make_pharmacy_bill(self.clinic, self.patient, self.para, 4)
+
+        serializer = PharmacyBillSerializer(bill, data={
+            "items": [{"item_type": "MEDICINE", "medicine_id": self.ibu.pk, "quantity": 2}],
+        }, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(self.stock(), {"Para": 10, "Ibu": 3})
+
+    def test_cancel_then_delete_returns_stock_once(self):
+        bill = make_pharmacy_bill(self.clinic, self.patient, self.para, 4)
+        self.assertEqual(self.stock()["Para"], 6)
+
+        bill = PharmacyBill.objects.get(pk=bill.pk)
+        bill.status = "CANCELLED"
+        bill.save()
+        self.assertEqual(self.stock()["Para"], 10)
+
+        bill.items.all().delete()
+        bill.delete()
+        self.assertEqual(self.stock()["Para"], 10)
+
+    def test_reopening_a_cancelled_bill_takes_stock_again(self):
+        bill = make_pharmacy_bill(self.clinic, self.patient, self.para, 4)
+        bill = PharmacyBill.objects.get(pk=bill.pk)
+        bill.status = "CANCELLED"
+        bill.save()
+        bill.status = "PENDING"
+        bill.save()
+
+        self.assertEqual(self.stock()["Para"], 6)
+
+    def test_deleting_bill_or_item_returns_stock(self):
+        first = make_pharmacy_bill(self.clinic, self.patient, self.para, 3)
+        second = make_pharmacy_bill(self.clinic, self.patient, self.para, 2)
+        self.assertEqual(self.stock()["Para"], 5)
+
+        PharmacyBill.objects.get(pk=first.pk).delete()
+        self.assertEqual(self.stock()["Para"], 8)
+
+        second.items.get().delete()
+        self.assertEqual(self.stock()["Para"], 10)
+        self.assertEqual(
+            list(StockMovement.objects.order_by("id").values_list("reason", "quantity")),
+            [("SALE", -3), ("SALE", -2), ("RETURN", 3), ("RETURN", 2)],
+        )
+
+    def test_backfilled_bills_return_their_stock(self):
+        kept = make_pharmacy_bill(self.clinic, self.patient, self.para, 3)
+        cancelled = make_pharmacy_bill(self.clinic, self.patient, self.ibu, 2)
+        PharmacyBill.objects.filter(pk=cancelled.pk).update(status="CANCELLED")
+        StockMovement.objects.all().delete()  # as bills were before the ledger
+
+        record_sales = import_module("billing.migrations.0009_backfill_sale_movements").record_sales
+        record_sales(apps, None)
+        self.assertEqual(
+            list(StockMovement.objects.values_list("reason", "quantity", "reference")),
+            [("SALE", -3, kept.bill_number)],
+        )
+
+        bill = PharmacyBill.objects.get(pk=kept.pk)
+        bill.status = "CANCELLED"
+        bill.save()
+        self.assertEqual(self.stock(), {"Para": 10, "Ibu": 3})
+
+    def test_clinic_delete_cascades_cleanly(self):
+        make_pharmacy_bill(self.clinic, self.patient, self.para, 3)
+        Clinic.objects.get(pk=self.clinic.pk).delete()
+        self.assertFalse(Medicine.objects.exists())
+
+
+class SparseBillListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="sparsebills", password="x", role="CLINIC")
+        cls.clinic = Clinic.objects.create(user=cls.user, name="Alpha Clinic")
+        cls.patient = Patient.objects.create(
+            clinic=cls.clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+        medicine = Medicine.objects.create(clinic=cls.clinic, name="Para", stock=100, unit_price=Decimal("2"))
+        for _ in range(3):
+            make_pharmacy_bill(cls.clinic, cls.patient, medicine, 1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unrequested_items_and_doctor_lookup_are_skipped(self):
+        url = reverse("clinic-pharmacy-bill-list-create")
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(url, {"fields": "id,bill_number,total_amount,patient"})
+
+        self.assertEqual(set(response.json()[0]), {"id", "bill_number", "total_amount", "patient"})
+        self.assertEqual(response.json()[0]["patient"]["name"], "Pat Test")
+        sql = [query["sql"] for query in sparse.captured_queries]
+        self.assertFalse(any("billing_pharmacybillitem" in query or "doctor_panel_consultation" in query for query in sql))
+        self.assertLess(len(sparse), len(full))
+
+
+@skipUnless(connection.vendor == "postgresql", "needs a database that allows concurrent writers")
+class StockOversellTests(TransactionTestCase):
+    threads = 10
+    stock = 25
+
+    def test_concurrent_bills_never_oversell(self):
+        user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        clinic = Clinic.objects.create(user=user, name="Alpha Clinic")
+        patient = Patient.objects.create(
+            clinic=clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+        medicine = Medicine.objects.create(clinic=clinic, name="Para", stock=self.stock, unit_price=Decimal("2"))
+        sold, refused, errors = [], [], []
+        barrier = threading.Barrier(self.threads)
+
+        def buy():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    try:
+                        make_pharmacy_bill(clinic, patient, medicine, 1)
+                        sold.append(1)
+                    except ValueError:
+                        refused.append(1)
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=buy) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        medicine.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(sold), self.stock)
+        self.assertEqual(len(refused), self.threads * 5 - self.stock)
+        self.assertEqual(medicine.stock, 0)
+        self.assertEqual(PharmacyBill.objects.count(), self.stock)
+
+
+@skipUnless(connection.vendor == "postgresql", "needs a database that allows concurrent writers")
+class StockCancelRaceTests(TransactionTestCase):
+    threads = 2
+
+    def test_concurrent_cancels_return_stock_once(self):
+        user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        clinic = Clinic.objects.create(user=user, name="Alpha Clinic")
+        patient = Patient.objects.create(
+            clinic=clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+        medicine = Medicine.objects.create(clinic=clinic, name="Para", stock=10, unit_price=Decimal("2"))
+        bill = make_pharmacy_bill(clinic, patient, medicine, 4)
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def cancel():
+            try:
+                # Each loaded while the bill was still open
+                copy = PharmacyBill.objects.get(pk=bill.pk)
+                barrier.wait()
+                copy.status = "CANCELLED"
+                copy.save()
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=cancel) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        medicine.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(medicine.stock, 10)
+        self.assertEqual(StockMovement.objects.filter(reason=StockMovement.CANCELLATION).count(), 1)
@@ -5,6 +5,7 @@ from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from admin_panel.models import Clinic
+from clinic_project.serialization import list_data, list_serializer
 from .models import (
     MaterialPurchaseBill, ClinicBill, LabBill, PharmacyBill, Medicine, Procedure, ProcedurePayment
 )
@@ -21,9 +22,8 @@ class BaseBillListCreateAPIView(APIView):
     serializer_class = None
 
     def get(self, request):
-        bills = self.model_class.objects.all()
-        serializer = self.serializer_class(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, self.model_class.objects.all(), self.serializer_class)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -75,8 +75,8 @@ class MaterialPurchaseBillListCreateAPIView(APIView):
 
     def get(self, request):
         bills = MaterialPurchaseBill.objects.all().order_by("-created_at")
-        serializer = MaterialPurchaseBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, MaterialPurchaseBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = MaterialPurchaseBillSerializer(data=request.data)
@@ -125,8 +125,8 @@ class ClinicBillListCreateAPIView(APIView):
 
     def get(self, request):
         bills = ClinicBill.objects.all().order_by("-created_at")
-        serializer = ClinicBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, ClinicBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = ClinicBillSerializer(data=request.data)
@@ -174,22 +174,16 @@ class LabBillListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
+        tenant = request.tenant
 
         # SUPERADMIN / ADMIN → no clinic restriction
-        if getattr(user, "role", "").upper() in ["SUPERADMIN", "ADMIN"]:
+        if tenant.role in ["superadmin", "admin"]:
             clinic_id = request.query_params.get("clinic_id")
             if clinic_id:
                 return get_object_or_404(Clinic, id=clinic_id)
             return None  # ← means ALL clinics
 
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile.clinic
-
-        return None
+        return tenant.get_clinic(doctors=True)
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -201,8 +195,8 @@ class LabBillListCreateAPIView(APIView):
             bills = LabBill.objects.all()
 
         bills = bills.order_by("-created_at")
-        serializer = LabBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, LabBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = LabBillSerializer(
@@ -228,21 +222,7 @@ class LabBillRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
-
-        if getattr(user, "role", "").lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile.clinic
-
-        return None
+        return request.tenant.get_clinic(doctors=True)
 
     def get_object(self, pk, clinic):
         if clinic:
@@ -314,8 +294,8 @@ class PharmacyBillListCreateAPIView(APIView):
 
     def get(self, request):
         bills = PharmacyBill.objects.all().order_by("-created_at")
-        serializer = PharmacyBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, PharmacyBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = PharmacyBillSerializer(data=request.data)
@@ -366,13 +346,7 @@ class ClinicMaterialPurchaseBillListCreateAPIView(APIView):
 
     def get_clinic(self, request):
         """ Determine clinic for this request (superadmin or clinic user)."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -380,8 +354,8 @@ class ClinicMaterialPurchaseBillListCreateAPIView(APIView):
             return Response({"error": "Clinic not found or not authorized"}, status=403)
 
         bills = MaterialPurchaseBill.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = MaterialPurchaseBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, MaterialPurchaseBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         clinic = self.get_clinic(request)
@@ -402,13 +376,7 @@ class ClinicMaterialPurchaseBillRetrieveUpdateDeleteAPIView(APIView):
 
     def get_clinic(self, request):
         """ Same logic for superadmin + clinic user."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get_object(self, pk, clinic):
         return get_object_or_404(MaterialPurchaseBill, pk=pk, clinic=clinic)
@@ -466,13 +434,7 @@ class ClinicClinicBillListCreateAPIView(APIView):
 
     def get_clinic(self, request):
         """ Determine the clinic for this request (superadmin or clinic user)."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -480,8 +442,8 @@ class ClinicClinicBillListCreateAPIView(APIView):
             return Response({"error": "Clinic not found or not authorized"}, status=403)
 
         bills = ClinicBill.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = ClinicPanelBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, ClinicPanelBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         clinic = self.get_clinic(request)
@@ -502,13 +464,7 @@ class ClinicClinicBillRetrieveUpdateDeleteAPIView(APIView):
 
     def get_clinic(self, request):
         """ Same logic for superadmin + clinic user."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get_object(self, pk, clinic):
         return get_object_or_404(ClinicBill, pk=pk, clinic=clinic)
@@ -565,21 +521,7 @@ class ClinicLabBillListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
-
-        if getattr(user, "role", "").lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile.clinic
-
-        return None
+        return request.tenant.get_clinic(doctors=True)
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -595,8 +537,8 @@ class ClinicLabBillListCreateAPIView(APIView):
             .order_by("-created_at")
         )
 
-        serializer = LabPanelBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, LabPanelBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         serializer = LabPanelBillSerializer(
@@ -621,21 +563,7 @@ class ClinicLabBillRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
-
-        if getattr(user, "role", "").lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile.clinic
-
-        return None
+        return request.tenant.get_clinic(doctors=True)
 
     def get_object(self, pk, clinic):
         return get_object_or_404(LabBill, pk=pk, clinic=clinic)
@@ -726,13 +654,7 @@ class ClinicPharmacyBillListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if clinic_id:
-                return get_object_or_404(Clinic, id=clinic_id)
-            return None
-        return user.clinic_profile
+        return request.tenant.get_clinic()
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -740,8 +662,8 @@ class ClinicPharmacyBillListCreateAPIView(APIView):
             return Response({"error": "clinic_id required for superadmin"}, status=400)
 
         bills = PharmacyBill.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = ClinicPharmacyBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, ClinicPharmacyBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
     def post(self, request):
         clinic = self.get_clinic(request)
@@ -765,13 +687,7 @@ class ClinicPharmacyBillRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_clinic(self, request):
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if clinic_id:
-                return get_object_or_404(Clinic, id=clinic_id)
-            return None
-        return user.clinic_profile
+        return request.tenant.get_clinic()
 
     def get_object(self, pk, clinic):
         return get_object_or_404(PharmacyBill, pk=pk, clinic=clinic)
@@ -825,25 +741,8 @@ class ClinicPharmacyBillRetrieveUpdateDeleteAPIView(APIView):
 
 # ----------------- Medicine CRUD -----------------    
 def get_user_clinic(request):
-
-    user = request.user
-
-    # 🔹 Superadmin - check for clinic_id in query params
-    if getattr(user, "role", "").lower() == "superadmin":
-        clinic_id = request.query_params.get("clinic_id")
-        if clinic_id:
-            return get_object_or_404(Clinic, id=clinic_id)
-        return None  # Must specify clinic_id
-
-    # 🔹 Clinic user
-    if hasattr(user, "clinic_profile") and user.clinic_profile:
-        return user.clinic_profile
-
-    # 🔹 Doctor user
-    if hasattr(user, "doctor_profile") and user.doctor_profile and user.doctor_profile.clinic:
-        return user.doctor_profile.clinic
-
-    return None
+    # Superadmin: ?clinic_id (or the clinic switched to); clinic user: own; doctor: their clinic
+    return request.tenant.get_clinic(doctors=True)
 
 
 # ----------------- Medicine List & Create -----------------
@@ -860,8 +759,8 @@ class MedicineListCreateAPIView(APIView):
             )
 
         medicines = Medicine.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = MedicineSerializer(medicines, many=True)
-        return Response(serializer.data)
+        medicines, serializer_class = list_serializer(request, medicines, MedicineSerializer)
+        return Response(list_data(request, medicines, serializer_class))
 
     def post(self, request):
         clinic = get_user_clinic(request)
@@ -953,8 +852,8 @@ class ProcedureListCreateAPIView(APIView):
             )
 
         procedures = Procedure.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = ProcedureSerializer(procedures, many=True)
-        return Response(serializer.data)
+        procedures, serializer_class = list_serializer(request, procedures, ProcedureSerializer)
+        return Response(list_data(request, procedures, serializer_class))
 
     def post(self, request):
         clinic = get_user_clinic(request)
@@ -1061,8 +960,8 @@ class PatientPharmacyBillListAPIView(APIView):
     def get(self, request, patient_id):
         # Fetch only bills for the specific patient
         bills = PharmacyBill.objects.filter(patient_id=patient_id).order_by("-created_at")
-        serializer = PharmacyBillSerializer(bills, many=True)
-        return Response(serializer.data)
+        bills, serializer_class = list_serializer(request, bills, PharmacyBillSerializer)
+        return Response(list_data(request, bills, serializer_class))
 
 # Clinic: Restricted to their own clinic
 class ClinicProcedurePaymentListCreateAPIView(generics.ListCreateAPIView):
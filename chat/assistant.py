@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+import weakref
+from collections import namedtuple
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from clinic_project.secret_store import get_secret
+from .models import Conversation
+
+# One piece of an LLM reply: `text` is the (partial) content, `sources` the
+# citations when the upstream API reports them (usually on the last chunk).
+Chunk = namedtuple("Chunk", ["text", "sources"], defaults=[None])
+
+
+# -------------------- LLM clients --------------------
+class LLMClient:
+    """
+    Chat completion backend. `messages` are OpenAI-style role/content
+    dicts; `complete` returns one Chunk, `stream` yields Chunks as the
+    reply is generated. `acomplete` / `astream` are the same for async
+    views, waiting on the upstream without holding a thread.
+    """
+
+    def complete(self, messages):
+        raise NotImplementedError
+
+    def stream(self, messages):
+        raise NotImplementedError
+
+    async def acomplete(self, messages):
+        raise NotImplementedError
+
+    async def astream(self, messages):
+        raise NotImplementedError
+        yield
+
+
+@lru_cache(maxsize=1)
+def _perplexity_for(api_key):
+    # The SDK takes most of a second to import; only chat requests pay for it.
+    from perplexity import Perplexity
+
+    return Perplexity(api_key=api_key, base_url=settings.CHAT_API_BASE_URL)
+
+
+# An async client's connection pool belongs to the event loop it was used on,
+# so there is one per loop (a uvicorn worker has just the one).
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _async_perplexity_for(api_key):
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.api_key != api_key:
+        from perplexity import AsyncPerplexity
+
+        client = _async_clients[loop] = AsyncPerplexity(api_key=api_key, base_url=settings.CHAT_API_BASE_URL)
+    return client
+
+
+def _plain_sources(sources):
+    if not sources:
+        return None
+    return [source.model_dump() if hasattr(source, "model_dump") else source for source in sources]
+
+
+def _reply(response):
+    return Chunk(response.choices[0].message.content, _plain_sources(getattr(response, "search_results", None)))
+
+
+def _delta(chunk):
+    text = chunk.choices[0].delta.content if chunk.choices else None
+    return Chunk(text or "", _plain_sources(getattr(chunk, "search_results", None)))
+
+
+class PerplexityClient(LLMClient):
+    def __init__(self):
+        # Clients are keyed on the key itself so a rotated secret gets a fresh one.
+        self.api_key = get_secret("PERPLEXITY_API_KEY")
+
+    def complete(self, messages):
+        client = _perplexity_for(self.api_key)
+        return _reply(client.chat.completions.create(model=settings.CHAT_MODEL, messages=messages))
+
+    def stream(self, messages):
+        client = _perplexity_for(self.api_key)
+        for chunk in client.chat.completions.create(model=settings.CHAT_MODEL, messages=messages, stream=True):
+            yield _delta(chunk)
+
+    async def acomplete(self, messages):
+        client = _async_perplexity_for(self.api_key)
+        return _reply(await client.chat.completions.create(model=settings.CHAT_MODEL, messages=messages))
+
+    async def astream(self, messages):
+        client = _async_perplexity_for(self.api_key)
+        async for chunk in await client.chat.completions.create(model=settings.CHAT_MODEL, messages=messages, stream=True):
+            yield _delta(chunk)
+
+
+class StubLLMClient(LLMClient):
+    """
+    Local client for tests and offline development: replies with `reply`
+    (streamed word by word) after `delay` seconds and records every request
+    in `calls`.
+    """
+    reply = "This is a stub reply."
+    delay = 0
+    calls = []
+
+    @classmethod
+    def reset(cls):
+        cls.reply = "This is a stub reply."
+        cls.delay = 0
+        cls.calls = []
+
+    def words(self):
+        return [word if i == 0 else f" {word}" for i, word in enumerate(self.reply.split(" "))]
+
+    def complete(self, messages):
+        self.calls.append(messages)
+        time.sleep(self.delay)
+        return Chunk(self.reply)
+
+    def stream(self, messages):
+        self.calls.append(messages)
+        time.sleep(self.delay)
+        for word in self.words():
+            yield Chunk(word)
+
+    async def acomplete(self, messages):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        return Chunk(self.reply)
+
+    async def astream(self, messages):
+        self.calls.append(messages)
+        await asyncio.sleep(self.delay)
+        for word in self.words():
+            yield Chunk(word)
+
+
+def get_llm_client():
+    return import_string(settings.CHAT_LLM_CLIENT)()
+
+
+# -------------------- Context window --------------------
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def build_context(conversation, budget=None):
+    """
+    Messages to send upstream for the next reply: the rolling summary (if
+    any) as a system message, then the newest messages that fit in `budget`
+    tokens. Only messages after the summary are read, newest first, and
+    reading stops at the first one that does not fit.
+    Returns (messages, first_id), where `first_id` is the id of the oldest
+    message in the window; everything before it can be folded into the summary.
+    """
+    budget = budget or settings.CHAT_CONTEXT_TOKENS
+    summary_message = None
+    if conversation.summary:
+        summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{conversation.summary}"}
+        budget -= estimate_tokens(summary_message["content"])
+
+    window, used = [], 0
+    recent = (
+        conversation.messages.filter(id__gt=conversation.summarized_until)
+        .order_by("-id").values_list("id", "role", "content")
+    )
+    for message_id, role, content in recent.iterator(chunk_size=20):
+        cost = estimate_tokens(content)
+        if window and used + cost > budget:
+            break
+        window.append((message_id, role, content))
+        used += cost
+    window.reverse()
+
+    # The upstream API expects the turns to start with the user.
+    while len(window) > 1 and window[0][1] != "user":
+        window.pop(0)
+
+    messages = [{"role": role, "content": content} for _, role, content in window]
+    if summary_message:
+        messages.insert(0, summary_message)
+    return messages, window[0][0] if window else None
+
+
+def _evicted(conversation, first_id):
+    return (
+        conversation.messages.filter(id__gt=conversation.summarized_until, id__lt=first_id)
+        .order_by("id").values_list("id", "role", "content")
+    )
+
+
+def _summary_request(conversation, evicted):
+    transcript = "\n".join(f"{role}: {content}" for _, role, content in evicted)
+    if conversation.summary:
+        transcript = f"Summary so far:\n{conversation.summary}\n\nNew messages:\n{transcript}"
+    return [
+        {
+            "role": "system",
+            "content": (
+                "Summarize this conversation for your own future reference in at most "
+                f"{settings.CHAT_SUMMARY_TOKENS * 3 // 4} words. Keep names, numbers and open questions."
+            ),
+        },
+        {"role": "user", "content": transcript},
+    ]
+
+
+def update_summary(conversation, get_client, first_id):
+    """
+    Fold the messages that dropped out of the window (those before
+    `first_id` not yet summarized) into the conversation's rolling summary,
+    once they add up to CHAT_SUMMARY_BATCH_TOKENS; until then they are
+    left for a later turn. `get_client` is only called when a batch is
+    summarized.
+    """
+    if first_id is None:
+        return
+    evicted = list(_evicted(conversation, first_id))
+    if sum(estimate_tokens(content) for _, _, content in evicted) < settings.CHAT_SUMMARY_BATCH_TOKENS:
+        return
+
+    summary = get_client().complete(_summary_request(conversation, evicted)).text
+    Conversation.objects.filter(pk=conversation.pk).update(summary=summary, summarized_until=evicted[-1][0])
+    conversation.summary, conversation.summarized_until = summary, evicted[-1][0]
+
+
+# -------------------- Reply cache --------------------
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """Case, spacing and trailing punctuation don't make a different question."""
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!. ").lower()
+
+
+class ReplyCache:
+    """
+    Exact-match cache of model replies in the CHAT_CACHE_ALIAS cache, keyed
+    on the normalized prompt plus a hash of the few messages before it, so a
+    follow-up question in a different conversation is not answered from
+    someone else's context. Hit and miss counts are kept in the same cache,
+    so they are shared by every worker using it.
+    """
+    HITS = "chat-reply-cache:hits"
+    MISSES = "chat-reply-cache:misses"
+
+    def __init__(self):
+        self.cache = caches[settings.CHAT_CACHE_ALIAS]
+
+    def key(self, history):
+        *context, prompt = history
+        context = context[-settings.CHAT_CACHE_CONTEXT_MESSAGES:] if settings.CHAT_CACHE_CONTEXT_MESSAGES else []
+        material = json.dumps([settings.CHAT_MODEL, context, normalize_prompt(prompt["content"])])
+        return f"chat-reply:{hashlib.sha256(material.encode()).hexdigest()}"
+
+    def get(self, history):
+        value = self.cache.get(self.key(history))
+        self._count(self.HITS if value else self.MISSES)
+        return Chunk(**value) if value else None
+
+    def set(self, history, reply):
+        self.cache.set(self.key(history), reply._asdict(), settings.CHAT_CACHE_TTL)
+
+    def _count(self, key):
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:  # evicted between add() and incr()
+            self.cache.set(key, 1, None)
+
+    def stats(self):
+        counts = self.cache.get_many([self.HITS, self.MISSES])
+        hits, misses = counts.get(self.HITS, 0), counts.get(self.MISSES, 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self.HITS, self.MISSES])
+
+
+def get_reply_cache(user):
+    """The reply cache, or None for users who opted out of it."""
+    return None if user.chat_cache_opt_out else ReplyCache()
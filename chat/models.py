@@ -4,6 +4,10 @@ from django.db import models
 class Conversation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversations')
     title = models.CharField(max_length=255, blank=True, null=True)
+    # Rolling summary of the messages up to `summarized_until` (a Message id),
+    # sent upstream in place of those messages (see chat.assistant).
+    summary = models.TextField(blank=True, default="")
+    summarized_until = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
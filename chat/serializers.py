@@ -18,3 +18,8 @@ class ConversationSerializer(serializers.ModelSerializer):
 class ChatRequestSerializer(serializers.Serializer):
     conversation_id = serializers.IntegerField(required=False)
     message = serializers.CharField()
+    stream = serializers.BooleanField(required=False, default=False)
+
+
+class ChatPreferencesSerializer(serializers.Serializer):
+    cache_opt_out = serializers.BooleanField()
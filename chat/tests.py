@@ -1,3 +1,301 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
+import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from clinic_project import fake_upstream, secret_store
+from clinic_project.secret_store import clear_secret_cache, get_secret
+from .assistant import ReplyCache, StubLLMClient, build_context, normalize_prompt
+from .models import Conversation, Message
+from .views import ChatAPIView
 
-# Create your tests here.
+LOCAL_PROVIDERS = [
+    "clinic_project.secret_store.EnvSecretProvider",
+    "clinic_project.secret_store.FileSecretProvider",
+]
+
+
+@override_settings(SECRET_PROVIDERS=LOCAL_PROVIDERS)
+class SecretStoreTests(TestCase):
+    def setUp(self):
+        clear_secret_cache()
+        self.addCleanup(clear_secret_cache)
+
+    def test_environment_wins_over_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, "API_KEY").write_text("from-file\n")
+            with override_settings(SECRETS_DIR=directory):
+                clear_secret_cache()
+                self.assertEqual(get_secret("API_KEY"), "from-file")
+                clear_secret_cache()
+                with mock.patch.dict(os.environ, {"API_KEY": "from-env"}):
+                    self.assertEqual(get_secret("API_KEY"), "from-env")
+
+    def test_values_are_cached_until_the_ttl_expires(self):
+        with mock.patch.dict(os.environ, {"API_KEY": "first"}):
+            self.assertEqual(get_secret("API_KEY"), "first")
+        self.assertEqual(get_secret("API_KEY"), "first")
+
+        with mock.patch.object(secret_store.time, "monotonic", return_value=secret_store.time.monotonic() + 301):
+            with mock.patch.dict(os.environ, {"API_KEY": "rotated"}):
+                self.assertEqual(get_secret("API_KEY"), "rotated")
+
+    def test_missing_secret(self):
+        self.assertEqual(get_secret("NO_SUCH_SECRET", default=None), None)
+        with self.assertRaises(ImproperlyConfigured):
+            get_secret("NO_SUCH_SECRET")
+
+    @override_settings(SECRET_PROVIDERS=LOCAL_PROVIDERS + ["clinic_project.secret_store.SSMSecretProvider"])
+    def test_ssm_is_only_called_when_local_providers_miss(self):
+        ssm = mock.MagicMock()
+        ssm.get_parameter.return_value = {"Parameter": {"Value": "from-ssm"}}
+        with mock.patch.object(secret_store, "_ssm_client", return_value=ssm):
+            with mock.patch.dict(os.environ, {"API_KEY": "from-env"}):
+                self.assertEqual(get_secret("API_KEY"), "from-env")
+            ssm.get_parameter.assert_not_called()
+
+            self.assertEqual(get_secret("OTHER_KEY"), "from-ssm")
+            ssm.get_parameter.assert_called_once_with(Name="/clinic/OTHER_KEY", WithDecryption=True)
+
+
+def long_conversation(user, turns=10):
+    conversation = Conversation.objects.create(user=user)
+    for i in range(turns):
+        Message.objects.create(conversation=conversation, role="user", content=f"question {i} " + "x" * 60)
+        Message.objects.create(conversation=conversation, role="assistant", content=f"answer {i} " + "y" * 60)
+    return conversation
+
+
+@override_settings(CHAT_LLM_CLIENT="chat.assistant.StubLLMClient", CHAT_CONTEXT_TOKENS=3000)
+class ChatAssistantTests(TestCase):
+    def setUp(self):
+        StubLLMClient.reset()
+        caches["chat"].clear()
+        self.user = User.objects.create_user(username="chatter", password="pass", role="DOCTOR")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def events(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [
+            (frame.split("\n")[0][len("event: "):], json.loads(frame.split("\n")[1][len("data: "):]))
+            for frame in body.strip().split("\n\n")
+        ]
+
+    def test_reply_without_streaming(self):
+        response = self.client.post(reverse("chat"), {"message": "Hello"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["assistant"], StubLLMClient.reply)
+        conversation = Conversation.objects.get(pk=response.data["conversation_id"])
+        self.assertEqual(list(conversation.messages.values_list("role", flat=True)), ["user", "assistant"])
+
+    def test_streams_tokens_and_saves_reply_when_done(self):
+        response = self.client.post(reverse("chat"), {"message": "Hello", "stream": True}, format="json")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = self.events(response)
+
+        self.assertEqual(events[0][0], "meta")
+        tokens = [data["text"] for event, data in events if event == "token"]
+        self.assertEqual("".join(tokens), StubLLMClient.reply)
+        self.assertGreater(len(tokens), 1)
+        event, done = events[-1]
+        self.assertEqual(event, "done")
+        self.assertEqual(Message.objects.get(pk=done["message_id"]).content, StubLLMClient.reply)
+
+    def test_stream_error_saves_nothing(self):
+        with mock.patch.object(StubLLMClient, "stream", side_effect=RuntimeError("upstream down")):
+            response = self.client.post(reverse("chat"), {"message": "Hello", "stream": True}, format="json")
+            events = self.events(response)
+        self.assertEqual(events[-1], ("error", {"error": "upstream down"}))
+        self.assertFalse(Message.objects.filter(role="assistant").exists())
+
+    @override_settings(CHAT_CONTEXT_TOKENS=60, CHAT_SUMMARY_BATCH_TOKENS=100)
+    def test_history_is_windowed_and_older_turns_summarized(self):
+        conversation = long_conversation(self.user, )
+        StubLLMClient.reply = "Short summary."
+
+        self.client.post(reverse("chat"), {"message": "Latest?", "conversation_id": conversation.id}, format="json")
+        sent, summarize = StubLLMClient.calls
+        self.assertEqual(sent[-1], {"role": "user", "content": "Latest?"})
+        self.assertEqual(sent[0]["role"], "user")
+        self.assertLess(len(sent), 21)
+        self.assertIn("question 0", summarize[-1]["content"])
+
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.summary, "Short summary.")
+        self.assertGreater(conversation.summarized_until, 0)
+
+        StubLLMClient.calls = []
+        self.client.post(reverse("chat"), {"message": "And now?", "conversation_id": conversation.id}, format="json")
+        self.assertEqual(StubLLMClient.calls[0][0]["role"], "system")
+        self.assertIn("Short summary.", StubLLMClient.calls[0][0]["content"])
+
+    @override_settings(CHAT_CONTEXT_TOKENS=60)
+    def test_overflow_turn_below_the_batch_makes_one_call(self):
+        conversation = long_conversation(self.user, turns=2)
+        self.client.post(reverse("chat"), {"message": "Latest?", "conversation_id": conversation.id}, format="json")
+
+        self.assertEqual(len(StubLLMClient.calls), 1)
+        conversation.refresh_from_db()
+        self.assertEqual((conversation.summary, conversation.summarized_until), ("", 0))
+
+    @override_settings(CHAT_CONTEXT_TOKENS=60, CHAT_SUMMARY_BATCH_TOKENS=100)
+    def test_summary_is_made_after_the_reply_is_sent(self):
+        conversation = long_conversation(self.user, )
+        request = APIRequestFactory().post(
+            reverse("chat"), {"message": "Latest?", "conversation_id": conversation.id}, format="json",
+        )
+        force_authenticate(request, self.user)
+        response = async_to_sync(ChatAPIView.as_view())(request)
+        self.assertEqual(response.data["assistant"], StubLLMClient.reply)
+        self.assertEqual(len(StubLLMClient.calls), 1)
+
+        response.close()  # what the server does once the response is out
+        self.assertEqual(len(StubLLMClient.calls), 2)
+        conversation.refresh_from_db()
+        self.assertGreater(conversation.summarized_until, 0)
+
+    def test_build_context_reads_only_the_window(self):
+        conversation = Conversation.objects.create(user=self.user)
+        for i in range(50):
+            Message.objects.create(conversation=conversation, role="user", content="z" * 400)
+        with self.assertNumQueries(1):
+            messages, first_id = build_context(conversation, budget=250)
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(first_id, conversation.messages.order_by("-id")[1].id)
+
+
+@override_settings(CHAT_LLM_CLIENT="chat.assistant.StubLLMClient")
+class ChatReplyCacheTests(TestCase):
+    def setUp(self):
+        StubLLMClient.reset()
+        caches["chat"].clear()
+        self.user = User.objects.create_user(username="cached", password="pass", role="DOCTOR")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ask(self, message, **extra):
+        return self.client.post(reverse("chat"), {"message": message, **extra}, format="json")
+
+    def test_normalize_prompt(self):
+        self.assertEqual(normalize_prompt("  Max dose of  Paracetamol?\n"), "max dose of paracetamol")
+
+    def test_repeated_prompt_is_answered_from_cache(self):
+        self.assertFalse(self.ask("Max dose of paracetamol?").data["cached"])
+        response = self.ask("  max dose of PARACETAMOL ")
+        self.assertTrue(response.data["cached"])
+        self.assertEqual(response.data["assistant"], StubLLMClient.reply)
+        self.assertEqual(len(StubLLMClient.calls), 1)
+        # The cached reply is still recorded in the conversation.
+        self.assertEqual(Message.objects.filter(role="assistant").count(), 2)
+
+    def test_context_is_part_of_the_key(self):
+        first = self.ask("What about children?")
+        self.ask("Max dose of paracetamol?")
+        follow_up = self.ask("What about children?", conversation_id=first.data["conversation_id"])
+        self.assertFalse(follow_up.data["cached"])
+        self.assertEqual(len(StubLLMClient.calls), 3)
+
+    def test_streamed_reply_is_cached(self):
+        b"".join(self.ask("Ibuprofen interactions?", stream=True).streaming_content)
+        body = b"".join(self.ask("Ibuprofen interactions?", stream=True).streaming_content).decode()
+        self.assertIn('"cached": true', body)
+        self.assertIn(json.dumps({"text": StubLLMClient.reply}), body)
+        self.assertEqual(len(StubLLMClient.calls), 1)
+
+    def test_opted_out_users_always_reach_the_model(self):
+        response = self.client.patch(reverse("chat-preferences"), {"cache_opt_out": True}, format="json")
+        self.assertEqual(response.data, {"cache_opt_out": True})
+        self.ask("Max dose of paracetamol?")
+        self.assertFalse(self.ask("Max dose of paracetamol?").data["cached"])
+        self.assertEqual(len(StubLLMClient.calls), 2)
+
+    def test_hit_rate_is_reported_to_superadmins(self):
+        self.ask("Max dose of paracetamol?")
+        self.ask("Max dose of paracetamol?")
+        self.assertEqual(self.client.get(reverse("chat-cache-stats")).status_code, 403)
+
+        admin = User.objects.create_user(username="cache-admin", password="pass", role="SUPERADMIN")
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(reverse("chat-cache-stats")).data, {"hits": 1, "misses": 1, "hit_rate": 0.5})
+        self.client.delete(reverse("chat-cache-stats"))
+        self.assertEqual(self.client.get(reverse("chat-cache-stats")).data["hit_rate"], None)
+
+    @override_settings(CHAT_CACHE_ALIAS="default")  # stands in for the shared redis
+    def test_stats_are_kept_in_the_configured_cache(self):
+        caches["default"].clear()
+        self.ask("Max dose of paracetamol?")
+        self.ask("Max dose of paracetamol?")
+        # Counted where every worker reads them, not in this process' own cache.
+        self.assertEqual(caches["default"].get_many([ReplyCache.HITS, ReplyCache.MISSES]),
+                         {ReplyCache.HITS: 1, ReplyCache.MISSES: 1})
+        self.assertIsNone(caches["chat"].get(ReplyCache.HITS))
+
+        admin = User.objects.create_user(username="cache-admin", password="pass", role="SUPERADMIN")
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(reverse("chat-cache-stats")).data, {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+
+@override_settings(CHAT_LLM_CLIENT="chat.assistant.StubLLMClient")
+class ChatStreamingASGITests(TransactionTestCase):
+    def setUp(self):
+        StubLLMClient.reset()
+        caches["chat"].clear()
+        self.user = User.objects.create_user(username="asgi-chatter", password="pass", role="DOCTOR")
+
+    @override_settings(CHAT_CONTEXT_TOKENS=60, CHAT_SUMMARY_BATCH_TOKENS=100)
+    async def test_stream_is_async_under_asgi(self):
+        conversation = await sync_to_async(long_conversation)(self.user)
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        with self.assertNoLogs(level="ERROR"):
+            response = await self.async_client.post(
+                reverse("chat"), {"message": "Hello", "stream": True, "conversation_id": conversation.id},
+                content_type="application/json", headers={"Authorization": f"Bearer {token}"},
+            )
+            self.assertTrue(response.is_async)
+            frames = [frame async for frame in response.streaming_content]
+            # The stream is closed on the event loop; the summary is made off it.
+            await response.follow_up_done
+        self.assertTrue(frames[0].startswith(b"event: meta"))
+        self.assertTrue(frames[-1].startswith(b"event: done"))
+        self.assertEqual(await Message.objects.filter(role="assistant").acount(), 11)
+
+        await conversation.arefresh_from_db()
+        self.assertEqual(conversation.summary, StubLLMClient.reply)
+        self.assertGreater(conversation.summarized_until, 0)
+
+    async def test_reply_under_asgi_awaits_the_model(self):
+        StubLLMClient.delay = 0.01
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.post(
+            reverse("chat"), {"message": "Hello"},
+            content_type="application/json", headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["assistant"], StubLLMClient.reply)
+        # The instrumentation middleware runs natively async and still sees
+        # the queries async ORM calls make in worker threads.
+        queries = int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+        self.assertGreater(queries, 0)
+
+    async def test_perplexity_sdk_reads_the_fake_upstream(self):
+        from perplexity import AsyncPerplexity
+
+        transport = httpx.ASGITransport(app=fake_upstream.application)
+        with mock.patch.dict(os.environ, {"FAKE_UPSTREAM_DELAY": "0"}):
+            async with httpx.AsyncClient(transport=transport) as http_client:
+                client = AsyncPerplexity(api_key="test", base_url="http://upstream", http_client=http_client)
+                response = await client.chat.completions.create(
+                    model="sonar", messages=[{"role": "user", "content": "Hello"}],
+                )
+        self.assertEqual(response.choices[0].message.content, "This is a benchmark reply.")
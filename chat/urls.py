@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import ChatAPIView
+from .views import ChatAPIView, ChatCacheStatsAPIView, ChatPreferencesAPIView
 
 urlpatterns = [
     path('chat/', ChatAPIView.as_view(), name='chat'),
+    path('chat/preferences/', ChatPreferencesAPIView.as_view(), name='chat-preferences'),
+    path('chat/cache-stats/', ChatCacheStatsAPIView.as_view(), name='chat-cache-stats'),
 ]
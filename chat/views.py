@@ -1,21 +1,77 @@
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
+from adrf.views import APIView as AsyncAPIView
 from rest_framework.response import Response
 from rest_framework import status
-from perplexity import Perplexity
 from .models import Conversation, Message
-from .serializers import ChatRequestSerializer
-import os
-from django.conf import settings
-from perplexity import Perplexity
+from .serializers import ChatPreferencesSerializer, ChatRequestSerializer
+import asyncio
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import StreamingHttpResponse
+from clinic_project.permissions import IsSuperAdmin
+from .assistant import (
+    Chunk, ReplyCache, build_context, get_llm_client, get_reply_cache, update_summary,
+)
 
-# client = Perplexity()
-client = Perplexity(api_key=settings.PERPLEXITY_API_KEY)
+logger = logging.getLogger(__name__)
 
-class ChatAPIView(APIView):
+
+def sse(event, data):
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class FollowUpMixin:
+    """
+    Response that calls `follow_up()` once it has been sent: WSGI and ASGI
+    servers close a response after its last byte is out, so the work adds
+    nothing to what the client waits for. `follow_up()` is sync (ORM and
+    upstream calls); when the response is closed on an event loop, e.g. at
+    the end of an async stream, it runs in a worker thread instead and
+    `follow_up_done` is the future for it.
+    """
+    follow_up = None
+    follow_up_done = None
+
+    def close(self):
+        try:
+            if self.follow_up is not None:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    self.follow_up()
+                else:
+                    self.follow_up_done = loop.run_in_executor(None, self._follow_up_in_thread)
+        finally:
+            super().close()
+
+    def _follow_up_in_thread(self):
+        try:
+            self.follow_up()
+        finally:
+            connections.close_all()  # this thread's, the server never sees them
+
+
+class FollowUpResponse(FollowUpMixin, Response):
+    pass
+
+
+class FollowUpStreamingResponse(FollowUpMixin, StreamingHttpResponse):
+    pass
+
+
+class ChatAPIView(AsyncAPIView):
+    """
+    Async view: the model call is awaited, so under the ASGI deployment a
+    worker keeps serving other requests while replies are generated.
+    """
     permission_classes = [IsAuthenticated]  # ✅ ensures user must be logged in
 
-    def post(self, request):
+    async def post(self, request):
         serializer = ChatRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
@@ -26,38 +82,146 @@ class ChatAPIView(APIView):
         # ✅ Get or create conversation for this user
         if conversation_id:
             try:
-                conversation = Conversation.objects.get(id=conversation_id, user=user)
+                conversation = await Conversation.objects.aget(id=conversation_id, user=user)
             except Conversation.DoesNotExist:
                 return Response({"error": "Conversation not found or not yours"}, status=404)
         else:
-            conversation = Conversation.objects.create(user=user)
+            conversation = await Conversation.objects.acreate(user=user)
 
         # ✅ Save user's message
-        Message.objects.create(conversation=conversation, role='user', content=user_message, user=user)
+        await Message.objects.acreate(conversation=conversation, role='user', content=user_message, user=user)
 
-        # ✅ Build message history for Perplexity
-        history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in conversation.messages.all().order_by('created_at')
-        ]
+        # ✅ Recent messages that fit the token budget, after the rolling summary
+        history, first_id = await sync_to_async(build_context)(conversation)
+
+        # ✅ Same question in the same context answered before? (unless the user opted out)
+        cache = get_reply_cache(user)
+        cached = await sync_to_async(cache.get)(history) if cache else None
+
+        if serializer.validated_data['stream']:
+            # Tokens can only be relayed as they arrive by an async server;
+            # under WSGI the stream is produced synchronously instead.
+            if isinstance(request._request, ASGIRequest):
+                events = self.aevent_stream(conversation, history, first_id, user, cache, cached)
+            else:
+                events = self.event_stream(conversation, history, first_id, user, cache, cached)
+            response = FollowUpStreamingResponse(events, content_type="text/event-stream")
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"  # don't let nginx hold tokens back
+            response.follow_up = lambda: self.refresh_summary(conversation, first_id)
+            return response
 
         try:
-            response = client.chat.completions.create(
-                model="sonar",
-                messages=history
-            )
-            assistant_message = response.choices[0].message.content
-            sources = getattr(response, "sources", None)
+            reply = cached
+            if reply is None:
+                reply = await get_llm_client().acomplete(history)
+                if cache:
+                    await sync_to_async(cache.set)(history, reply)
 
             # ✅ Save assistant reply (no user)
-            Message.objects.create(conversation=conversation, role='assistant', content=assistant_message)
+            await Message.objects.acreate(conversation=conversation, role='assistant', content=reply.text)
 
-            return Response({
+            response = FollowUpResponse({
                 "conversation_id": conversation.id,
-                "assistant": assistant_message,
-                "sources": sources,
+                "assistant": reply.text,
+                "sources": reply.sources,
+                "cached": cached is not None,
                 "user_role": user.role
             }, status=status.HTTP_200_OK)
+            response.follow_up = lambda: self.refresh_summary(conversation, first_id)
+            return response
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def event_stream(self, conversation, history, first_id, user, cache=None, cached=None):
+        """
+        `meta` first, a `token` event per chunk as it arrives (one for the
+        whole reply when it comes from the cache), then `done` once the reply
+        has been saved (or `error` if the upstream call failed, in which case
+        nothing is saved). The summary is refreshed after the stream ends.
+        """
+        yield sse("meta", {"conversation_id": conversation.id, "user_role": user.role})
+        if cached is not None:
+            parts, sources = [cached.text], cached.sources
+            yield sse("token", {"text": cached.text})
+        else:
+            parts, sources = [], None
+            try:
+                for chunk in get_llm_client().stream(history):
+                    sources = chunk.sources or sources
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield sse("token", {"text": chunk.text})
+            except Exception as e:
+                yield sse("error", {"error": str(e)})
+                return
+            if cache:
+                cache.set(history, Chunk("".join(parts), sources))
+
+        message = Message.objects.create(conversation=conversation, role='assistant', content="".join(parts))
+        yield sse("done", {
+            "conversation_id": conversation.id, "message_id": message.id,
+            "sources": sources, "cached": cached is not None,
+        })
+
+    async def aevent_stream(self, conversation, history, first_id, user, cache=None, cached=None):
+        """`event_stream` for ASGI: the same events, awaiting the upstream."""
+        yield sse("meta", {"conversation_id": conversation.id, "user_role": user.role})
+        if cached is not None:
+            parts, sources = [cached.text], cached.sources
+            yield sse("token", {"text": cached.text})
+        else:
+            parts, sources = [], None
+            try:
+                async for chunk in get_llm_client().astream(history):
+                    sources = chunk.sources or sources
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield sse("token", {"text": chunk.text})
+            except Exception as e:
+                yield sse("error", {"error": str(e)})
+                return
+            if cache:
+                await sync_to_async(cache.set)(history, Chunk("".join(parts), sources))
+
+        message = await Message.objects.acreate(conversation=conversation, role='assistant', content="".join(parts))
+        yield sse("done", {
+            "conversation_id": conversation.id, "message_id": message.id,
+            "sources": sources, "cached": cached is not None,
+        })
+
+    def refresh_summary(self, conversation, first_id):
+        # Runs once the reply has been delivered (see FollowUpMixin); a failed
+        # summary just means the evicted messages are summarized on a later turn.
+        try:
+            update_summary(conversation, get_llm_client, first_id)
+        except Exception:
+            logger.exception("Could not update summary of conversation %s", conversation.id)
+
+
+class ChatCacheStatsAPIView(APIView):
+    """Hit rate of the chat reply cache; DELETE resets the counters."""
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        return Response(ReplyCache().stats())
+
+    def delete(self, request):
+        ReplyCache().reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChatPreferencesAPIView(APIView):
+    """The logged-in user's chat settings: currently only the reply cache opt-out."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"cache_opt_out": request.user.chat_cache_opt_out})
+
+    def patch(self, request):
+        serializer = ChatPreferencesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        request.user.chat_cache_opt_out = serializer.validated_data["cache_opt_out"]
+        request.user.save(update_fields=["chat_cache_opt_out"])
+        return Response({"cache_opt_out": request.user.chat_cache_opt_out})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Doctor, Patient, Appointment
+from .models import Doctor, Patient, Appointment, ClinicStats
 
 
 @admin.register(Doctor)
@@ -37,4 +37,10 @@ class AppointmentAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
-admin.site.register(Patient, PatientAdmin)
\ No newline at end of file
+admin.site.register(Patient, PatientAdmin)
+
+
+@admin.register(ClinicStats)
+class ClinicStatsAdmin(admin.ModelAdmin):
+    list_display = ("clinic", "doctors_count", "patients_count", "appointments_count", "consultations_count", "updated_at")
+    readonly_fields = ("updated_at",)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ClinicPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinic_panel'
+
+    def ready(self):
+        # Connect the ClinicStats maintenance receivers
+        from . import stats  # noqa: F401
+        # ...and the request.tenant profile cache invalidation
+        from clinic_project import tenant  # noqa: F401
+        # ...and the delta sync tombstones
+        from . import sync  # noqa: F401
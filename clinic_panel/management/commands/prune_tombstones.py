@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from clinic_panel.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete delta sync tombstones older than SYNC_TOMBSTONE_DAYS (clients whose watermark is "
+        "older than that get a full reset anyway). Run daily."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s)."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from clinic_panel.stats import rebuild_clinic_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the ClinicStats dashboard counters from source tables (backfill / drift repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clinic",
+            type=int,
+            action="append",
+            dest="clinic_ids",
+            help="Clinic id to rebuild (repeatable). Defaults to all clinics.",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_clinic_stats(options["clinic_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} clinic(s)."))
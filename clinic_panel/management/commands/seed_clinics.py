@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from clinic_project.seed import ClinicSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create synthetic clinics with doctors, patients, appointment history, consultations, "
+        "prescriptions and bills for local load testing. Do not run against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clinics", type=int, default=5, help="Number of clinics to create (default 5).")
+        parser.add_argument(
+            "--patients-per-clinic", type=int, default=200, help="Patients per clinic (default 200).",
+        )
+        parser.add_argument("--years", type=int, default=2, help="Years of visit history to generate (default 2).")
+        parser.add_argument("--doctors-per-clinic", type=int, default=5, help="Doctors per clinic (default 5).")
+        parser.add_argument("--seed", type=int, help="Random seed, for repeatable data sets.")
+        parser.add_argument(
+            "--password", default="password", help="Password for every generated clinic and doctor login.",
+        )
+
+    def handle(self, *args, **options):
+        seeder = ClinicSeeder(
+            patients_per_clinic=options["patients_per_clinic"],
+            years=options["years"],
+            doctors_per_clinic=options["doctors_per_clinic"],
+            seed=options["seed"],
+            password=options["password"],
+        )
+        counts = seeder.seed(options["clinics"])
+        for model_name, count in sorted(counts.items()):
+            self.stdout.write(f"{model_name}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['clinics']} clinic(s); logins start with seed_{seeder.tag}_."
+        ))
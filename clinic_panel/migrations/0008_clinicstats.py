@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0002_clinic_file_number_start'),
+        ('clinic_panel', '0007_patient_unique_file_number_per_clinic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('doctors_count', models.IntegerField(default=0)),
+                ('patients_count', models.IntegerField(default=0)),
+                ('appointments_count', models.IntegerField(default=0)),
+                ('scheduled_appointments', models.IntegerField(default=0)),
+                ('completed_appointments', models.IntegerField(default=0)),
+                ('cancelled_appointments', models.IntegerField(default=0)),
+                ('consultations_count', models.IntegerField(default=0)),
+                ('clinic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='admin_panel.clinic')),
+            ],
+            options={
+                'verbose_name_plural': 'Clinic stats',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0002_clinic_file_number_start'),
+        ('clinic_panel', '0008_clinicstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document_type', models.CharField(choices=[('PATIENT_FILE', 'Patient file number'), ('APPOINTMENT', 'Appointment ID'), ('MATERIAL_PURCHASE_BILL', 'Material purchase bill'), ('CLINIC_BILL', 'Clinic bill'), ('LAB_BILL', 'Lab bill'), ('PHARMACY_BILL', 'Pharmacy bill')], max_length=30)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='admin_panel.clinic')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('clinic', 'document_type'), name='unique_document_sequence_per_clinic'), models.UniqueConstraint(condition=models.Q(('clinic__isnull', True)), fields=('document_type',), name='unique_global_document_sequence')],
+            },
+        ),
+    ]
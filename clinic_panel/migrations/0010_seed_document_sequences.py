@@ -0,0 +1,63 @@
+from collections import defaultdict
+from django.db import migrations
+
+
+# (app, model, number field, prefix, document type) for the system-wide sequences
+GLOBAL_SEQUENCES = [
+    ("billing", "MaterialPurchaseBill", "bill_number", "MPB-", "MATERIAL_PURCHASE_BILL"),
+    ("billing", "ClinicBill", "bill_number", "CB-", "CLINIC_BILL"),
+    ("billing", "LabBill", "bill_number", "LB-", "LAB_BILL"),
+    ("billing", "PharmacyBill", "bill_number", "PB-", "PHARMACY_BILL"),
+    ("clinic_panel", "Appointment", "appointment_id", "APT-", "APPOINTMENT"),
+]
+
+
+def _number(value):
+    try:
+        return int(value.split("-")[-1])
+    except (AttributeError, ValueError):
+        return None
+
+
+def seed_sequences(apps, schema_editor):
+    """
+    Start every counter at the highest number already issued so new
+    documents continue where the old `last + 1` logic left off.
+    """
+    DocumentSequence = apps.get_model("clinic_panel", "DocumentSequence")
+    Patient = apps.get_model("clinic_panel", "Patient")
+
+    sequences = []
+    for app_label, model_name, field, prefix, document_type in GLOBAL_SEQUENCES:
+        model = apps.get_model(app_label, model_name)
+        values = model.objects.filter(**{f"{field}__startswith": prefix}).values_list(field, flat=True)
+        numbers = [n for n in map(_number, values.iterator()) if n is not None]
+        if numbers:
+            sequences.append(DocumentSequence(document_type=document_type, last_value=max(numbers)))
+
+    # Patient file numbers count per clinic; clinics without any keep
+    # starting from Clinic.file_number_start when the counter is first used.
+    highest = defaultdict(int)
+    rows = Patient.objects.exclude(file_number__isnull=True).exclude(file_number="")
+    for clinic_id, file_number in rows.values_list("clinic_id", "file_number").iterator():
+        number = _number(file_number)
+        if number is not None:
+            highest[clinic_id] = max(highest[clinic_id], number)
+    sequences.extend(
+        DocumentSequence(clinic_id=clinic_id, document_type="PATIENT_FILE", last_value=number)
+        for clinic_id, number in highest.items()
+    )
+
+    DocumentSequence.objects.bulk_create(sequences, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0005_labbill_clinic_cost_labbill_date_labbill_doctor_and_more"),
+        ("clinic_panel", "0009_documentsequence"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_notificationoutbox'),
+        ('clinic_panel', '0010_seed_document_sequences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['clinic', 'appointment_date', 'appointment_time'], name='appt_clinic_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'status', 'appointment_date'], name='appt_doctor_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-appointment_date', '-appointment_time'], name='appt_patient_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['clinic', '-created_at'], name='patient_clinic_created_idx'),
+        ),
+    ]
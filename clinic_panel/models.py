@@ -1,7 +1,6 @@
 from django.db import models
 from django.conf import settings 
-from django.utils.crypto import get_random_string
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Max
 from django.utils import timezone
 from accounts.models import User
@@ -213,26 +212,12 @@ class Patient(BaseModel):
     def save(self, *args, **kwargs):
         # ✔ Use provided file_number if present
         if not self.file_number and self.clinic_id:
-            with transaction.atomic():
-                last_patient = (
-                    Patient.objects
-                    .filter(clinic=self.clinic)
-                    .exclude(file_number__isnull=True)
-                    .exclude(file_number__exact="")
-                    .order_by("-id")
-                    .first()
-                )
-
-                if last_patient and last_patient.file_number:
-                    try:
-                        last_number = int(last_patient.file_number.split("-")[-1])
-                        next_number = last_number + 1
-                    except ValueError:
-                        next_number = self.clinic.file_number_start
-                else:
-                    next_number = self.clinic.file_number_start
-
-                self.file_number = f"CL{self.clinic.id}-P-{next_number:05d}"
+            next_number = DocumentSequence.next_value(
+                DocumentSequence.PATIENT_FILE,
+                clinic_id=self.clinic_id,
+                start=self.clinic.file_number_start,
+            )
+            self.file_number = f"CL{self.clinic_id}-P-{next_number:05d}"
 
         super().save(*args, **kwargs)
 
@@ -243,6 +228,12 @@ class Patient(BaseModel):
                 name="unique_file_number_per_clinic"
             )
         ]
+        indexes = [
+            # Clinic patient lists, newest first
+            models.Index(fields=["clinic", "-created_at"], name="patient_clinic_created_idx"),
+            # Delta sync (?updated_since=, see clinic_panel.sync)
+            models.Index(fields=["clinic", "updated_at"], name="patient_clinic_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -289,13 +280,135 @@ class Appointment(BaseModel):
 
     class Meta:
         ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            # Clinic schedules and dashboards (filter by clinic, range/order by date and time)
+            models.Index(fields=["clinic", "appointment_date", "appointment_time"], name="appt_clinic_date_time_idx"),
+            # Doctor views filter on status (SCHEDULED) before the date
+            models.Index(fields=["doctor", "status", "appointment_date"], name="appt_doctor_status_date_idx"),
+            # Patient history, in the default ordering
+            models.Index(fields=["patient", "-appointment_date", "-appointment_time"], name="appt_patient_date_time_idx"),
+            # Delta sync (?updated_since=, see clinic_panel.sync)
+            models.Index(fields=["clinic", "updated_at"], name="appt_clinic_updated_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.appointment_id:
-            # Generate unique ID like APT-0001
-            self.appointment_id = f"APT-{get_random_string(length=6).upper()}"
+            # Generate unique ID like APT-000001
+            next_number = DocumentSequence.next_value(DocumentSequence.APPOINTMENT)
+            self.appointment_id = f"APT-{next_number:06d}"
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.patient} with {self.doctor} on {self.appointment_date} at {self.appointment_time}"
-    
\ No newline at end of file
+    
+
+class ClinicStats(BaseModel):
+    """
+    Per-clinic rollup counters for the dashboards.
+    Kept in sync by the receivers in clinic_panel.stats; repair drift with
+    `manage.py rebuild_clinic_stats`.
+    """
+    clinic = models.OneToOneField(Clinic, on_delete=models.CASCADE, related_name="stats")
+    doctors_count = models.IntegerField(default=0)
+    patients_count = models.IntegerField(default=0)
+    appointments_count = models.IntegerField(default=0)
+    scheduled_appointments = models.IntegerField(default=0)
+    completed_appointments = models.IntegerField(default=0)
+    cancelled_appointments = models.IntegerField(default=0)
+    consultations_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Clinic stats"
+
+    def __str__(self):
+        return f"Stats for {self.clinic.name}"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row that clinics sync (see clinic_panel.sync), so
+    clients refreshing with ?updated_since= can drop it from their cache.
+    Written by the receivers in clinic_panel.sync and pruned after
+    SYNC_TOMBSTONE_DAYS with `manage.py prune_tombstones`.
+    """
+    # No database constraint: the tombstones of a clinic's rows are written
+    # while the clinic itself is being deleted.
+    clinic = models.ForeignKey(Clinic, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    model = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["clinic", "deleted_at"], name="tombstone_clinic_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
+class DocumentSequence(BaseModel):
+    """
+    Counter behind generated document numbers (bill numbers, patient file
+    numbers, appointment ids). `clinic` is null for sequences shared across
+    clinics, e.g. bill numbers, which are unique system-wide.
+    """
+    PATIENT_FILE = "PATIENT_FILE"
+    APPOINTMENT = "APPOINTMENT"
+    MATERIAL_PURCHASE_BILL = "MATERIAL_PURCHASE_BILL"
+    CLINIC_BILL = "CLINIC_BILL"
+    LAB_BILL = "LAB_BILL"
+    PHARMACY_BILL = "PHARMACY_BILL"
+
+    DOCUMENT_TYPES = [
+        (PATIENT_FILE, "Patient file number"),
+        (APPOINTMENT, "Appointment ID"),
+        (MATERIAL_PURCHASE_BILL, "Material purchase bill"),
+        (CLINIC_BILL, "Clinic bill"),
+        (LAB_BILL, "Lab bill"),
+        (PHARMACY_BILL, "Pharmacy bill"),
+    ]
+
+    clinic = models.ForeignKey(Clinic, on_delete=models.CASCADE, null=True, blank=True, related_name="document_sequences")
+    document_type = models.CharField(max_length=30, choices=DOCUMENT_TYPES)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["clinic", "document_type"],
+                name="unique_document_sequence_per_clinic",
+            ),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=["document_type"],
+                condition=models.Q(clinic__isnull=True),
+                name="unique_global_document_sequence",
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.clinic_id or "global"
+        return f"{self.document_type} ({scope}): {self.last_value}"
+
+    @classmethod
+    def next_value(cls, document_type, clinic_id=None, start=1, count=1):
+        """
+        Atomically claim the next number. The F() UPDATE row lock serialises
+        concurrent callers until their transaction commits, so numbers are
+        never handed out twice. A missing counter is created at `start`.
+
+        `count` claims a block of consecutive numbers (for bulk inserts) and
+        returns the last one.
+        """
+        counter = cls.objects.filter(clinic_id=clinic_id, document_type=document_type)
+        with transaction.atomic():
+            if not counter.update(last_value=models.F("last_value") + count, updated_at=timezone.now()):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(clinic_id=clinic_id, document_type=document_type, last_value=start + count - 1)
+                    return start + count - 1
+                except IntegrityError:
+                    # Another writer created it first; take the next value from theirs.
+                    counter.update(last_value=models.F("last_value") + count, updated_at=timezone.now())
+            return counter.values_list("last_value", flat=True).get()
@@ -3,9 +3,11 @@ from datetime import date
 from .models import Appointment, Patient, Doctor, Clinic
 from doctor_panel.models import Prescription, Consultation
 from doctor_panel.serializers import PatientSerializer, DoctorSerializer, ClinicSerializer, PatientAttachmentSerializer
+from admin_panel.serializers import DoctorRefSerializer
+from clinic_project.serialization import EagerLoadingMixin, SideLoaded, SparseFieldsetMixin, render_once
 
 
-class ClinicPrescriptionListSerializer(serializers.ModelSerializer):
+class ClinicPrescriptionListSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     patient = serializers.SerializerMethodField()
     doctor = serializers.SerializerMethodField()
     procedure = serializers.SerializerMethodField()  # ✅ add this
@@ -26,8 +28,22 @@ class ClinicPrescriptionListSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
+    select_related = ("consultation__patient", "consultation__doctor", "procedure")
+    field_requires = {
+        "procedure": ("procedure",),
+        "patient": ("consultation",),
+        "doctor": ("consultation",),
+    }
+    side_loaded = {
+        "patient": SideLoaded("patients", PatientSerializer, "consultation.patient_id"),
+        "doctor": SideLoaded("doctors", DoctorRefSerializer, "consultation.doctor_id"),
+    }
+
     def get_patient(self, obj):
         patient = obj.consultation.patient
+        return render_once(self.context, "prescription_patient", patient, lambda: self._patient(patient))
+
+    def _patient(self, patient):
         if patient.dob:
             today = date.today()
             age = today.year - patient.dob.year - (
@@ -48,7 +64,7 @@ class ClinicPrescriptionListSerializer(serializers.ModelSerializer):
 
     def get_doctor(self, obj):
         doctor = obj.consultation.doctor
-        return {"id": doctor.id, "name": doctor.name}
+        return render_once(self.context, "doctor_ref", doctor, lambda: {"id": doctor.id, "name": doctor.name})
 
     def get_procedure(self, obj):  # ✅ this returns readable name
         if obj.procedure:
@@ -77,12 +93,16 @@ class ClinicConsultationSerializer(serializers.ModelSerializer):
 
     def get_clinic(self, obj):
         if hasattr(obj.doctor, "clinic"):
-            return ClinicSerializer(obj.doctor.clinic).data
+            clinic = obj.doctor.clinic
+            return render_once(
+                self.context, ClinicSerializer, clinic,
+                lambda: ClinicSerializer(clinic, context=self.context).data,
+            )
         return None
 
     def get_prescriptions(self, obj):
         prescriptions = obj.prescriptions.all()
-        return ClinicPrescriptionListSerializer(prescriptions, many=True).data
+        return ClinicPrescriptionListSerializer(prescriptions, many=True, context=self.context).data
 
 
 
@@ -269,3 +289,69 @@ class PatientHistorySerializer(serializers.ModelSerializer):
             appointments,
             many=True
         ).data
+
+
+# -------------------- Dashboard (read-only, slim) --------------------
+class DashboardDoctorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Doctor
+        fields = [
+            "id",
+            "name",
+            "specialization",
+            "phone_number",
+            "email",
+            "profile_image",
+            "years_of_experience",
+            "created_at",
+        ]
+
+
+class DashboardPatientSerializer(serializers.ModelSerializer):
+    age = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Patient
+        fields = [
+            "id",
+            "first_name",
+            "last_name",
+            "phone_number",
+            "file_number",
+            "gender",
+            "dob",
+            "age",
+            "created_at",
+        ]
+
+    def get_age(self, obj):
+        if not obj.dob:
+            return None
+        today = date.today()
+        return today.year - obj.dob.year - (
+            (today.month, today.day) < (obj.dob.month, obj.dob.day)
+        )
+
+
+class PatientMiniSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Patient
+        fields = ["id", "first_name", "last_name", "file_number", "phone_number"]
+
+
+class DashboardAppointmentSerializer(serializers.ModelSerializer):
+    doctor = DoctorMiniSerializer(read_only=True)
+    patient = PatientMiniSerializer(read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = [
+            "id",
+            "appointment_id",
+            "appointment_date",
+            "appointment_time",
+            "status",
+            "reason",
+            "doctor",
+            "patient",
+        ]
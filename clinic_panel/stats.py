@@ -0,0 +1,234 @@
+from collections import Counter
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+from admin_panel.models import Clinic
+from doctor_panel.models import Consultation
+from .models import ClinicStats, Doctor, Patient, Appointment
+
+
+COUNTER_FIELDS = [
+    "doctors_count",
+    "patients_count",
+    "appointments_count",
+    "scheduled_appointments",
+    "completed_appointments",
+    "cancelled_appointments",
+    "consultations_count",
+]
+
+APPOINTMENT_STATUS_FIELDS = {
+    "SCHEDULED": "scheduled_appointments",
+    "COMPLETED": "completed_appointments",
+    "CANCELLED": "cancelled_appointments",
+}
+
+
+def count_subquery(queryset, field="clinic", outer="pk"):
+    """
+    Scalar COUNT(*) subquery correlated on `field` = outer `outer`.
+    Keeps related tables out of the outer join so counts don't fan out.
+    """
+    counted = (
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+# -------------------- Rebuild / read --------------------
+def rebuild_clinic_stats(clinic_ids=None):
+    """
+    Recompute ClinicStats from the source tables (backfill / drift repair).
+    One aggregate query for all requested clinics, then one upsert each.
+    Returns the number of clinics rebuilt.
+    """
+    clinics = Clinic.objects.all()
+    if clinic_ids is not None:
+        clinics = clinics.filter(pk__in=clinic_ids)
+
+    rows = clinics.annotate(
+        doctors_count=count_subquery(Doctor.objects.all()),
+        patients_count=count_subquery(Patient.objects.all()),
+        appointments_count=count_subquery(Appointment.objects.all()),
+        scheduled_appointments=count_subquery(Appointment.objects.filter(status="SCHEDULED")),
+        completed_appointments=count_subquery(Appointment.objects.filter(status="COMPLETED")),
+        cancelled_appointments=count_subquery(Appointment.objects.filter(status="CANCELLED")),
+        consultations_count=count_subquery(Consultation.objects.all(), field="doctor__clinic"),
+    ).values("pk", *COUNTER_FIELDS)
+
+    rebuilt = 0
+    for row in rows:
+        ClinicStats.objects.update_or_create(clinic_id=row.pop("pk"), defaults=row)
+        rebuilt += 1
+    return rebuilt
+
+
+def get_clinics_with_stats():
+    """
+    All clinics with their ClinicStats row joined in, creating any missing
+    rows on the way. O(clinics).
+    """
+    clinics = list(Clinic.objects.select_related("stats").order_by("name"))
+    missing = [clinic.pk for clinic in clinics if not hasattr(clinic, "stats")]
+    if missing:
+        rebuild_clinic_stats(missing)
+        clinics = list(Clinic.objects.select_related("stats").order_by("name"))
+    return clinics
+
+
+def get_clinic_dashboard_stats(clinic):
+    """
+    Dashboard counters for one clinic, read from the ClinicStats rollup in a
+    single query. `upcoming_appointments` depends on today's date so it is
+    counted alongside as a correlated subquery.
+    """
+    today = now().date()
+    upcoming = count_subquery(
+        Appointment.objects.filter(appointment_date__gte=today), outer="clinic_id"
+    )
+
+    for _ in range(2):
+        stats = (
+            ClinicStats.objects.filter(clinic=clinic)
+            .annotate(upcoming_appointments=upcoming)
+            .first()
+        )
+        if stats:
+            break
+        rebuild_clinic_stats([clinic.pk])
+
+    return {
+        "total_doctors": stats.doctors_count,
+        "total_patients": stats.patients_count,
+        "total_appointments": stats.appointments_count,
+        "upcoming_appointments": stats.upcoming_appointments,
+        "completed_appointments": stats.completed_appointments,
+        "cancelled_appointments": stats.cancelled_appointments,
+    }
+
+
+# -------------------- Incremental maintenance --------------------
+def bump_clinic_stats(clinic_id, **deltas):
+    """
+    Apply counter deltas to a clinic's rollup row with a single UPDATE.
+    Missing rows are left alone; they are built on first read.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not clinic_id or not deltas:
+        return
+    ClinicStats.objects.filter(clinic_id=clinic_id).update(
+        updated_at=now(),
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+
+
+def _appointment_deltas(status, sign):
+    deltas = Counter({"appointments_count": sign})
+    field = APPOINTMENT_STATUS_FIELDS.get(status)
+    if field:
+        deltas[field] += sign
+    return deltas
+
+
+def _apply_move(old_clinic_id, old_deltas, new_clinic_id, new_deltas):
+    """Apply -old/+new deltas, merging them when the clinic didn't change."""
+    if old_clinic_id == new_clinic_id:
+        merged = Counter(new_deltas)
+        merged.update(old_deltas)
+        bump_clinic_stats(new_clinic_id, **merged)
+    else:
+        bump_clinic_stats(old_clinic_id, **old_deltas)
+        bump_clinic_stats(new_clinic_id, **new_deltas)
+
+
+def _snapshot(instance, *fields):
+    # Read straight from __dict__ so deferred fields are never loaded here.
+    return tuple(instance.__dict__.get(field) for field in fields)
+
+
+@receiver(post_save, sender=Clinic)
+def create_clinic_stats(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        ClinicStats.objects.get_or_create(clinic=instance)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_state(sender, instance, **kwargs):
+    instance._stats_state = _snapshot(instance, "clinic_id", "status")
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    if kwargs.get("raw"):
+        return
+    if created:
+        bump_clinic_stats(instance.clinic_id, **_appointment_deltas(instance.status, 1))
+    else:
+        old_clinic_id, old_status = instance._stats_state
+        if (old_clinic_id, old_status) != (instance.clinic_id, instance.status):
+            _apply_move(
+                old_clinic_id, _appointment_deltas(old_status, -1),
+                instance.clinic_id, _appointment_deltas(instance.status, 1),
+            )
+    instance._stats_state = _snapshot(instance, "clinic_id", "status")
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    bump_clinic_stats(instance.clinic_id, **_appointment_deltas(instance.status, -1))
+
+
+def _track_clinic_member(model, counter):
+    """Keep `counter` in sync for a model with a plain `clinic` FK."""
+
+    def remember(sender, instance, **kwargs):
+        instance._stats_state = _snapshot(instance, "clinic_id")
+
+    def saved(sender, instance, created, **kwargs):
+        if kwargs.get("raw"):
+            return
+        if created:
+            bump_clinic_stats(instance.clinic_id, **{counter: 1})
+        else:
+            (old_clinic_id,) = instance._stats_state
+            if old_clinic_id != instance.clinic_id:
+                _apply_move(old_clinic_id, {counter: -1}, instance.clinic_id, {counter: 1})
+        instance._stats_state = _snapshot(instance, "clinic_id")
+
+    def deleted(sender, instance, **kwargs):
+        bump_clinic_stats(instance.clinic_id, **{counter: -1})
+
+    post_init.connect(remember, sender=model, weak=False)
+    post_save.connect(saved, sender=model, weak=False)
+    post_delete.connect(deleted, sender=model, weak=False)
+
+
+_track_clinic_member(Doctor, "doctors_count")
+_track_clinic_member(Patient, "patients_count")
+
+
+def _consultation_clinic_id(consultation):
+    if Consultation.doctor.is_cached(consultation):
+        return consultation.doctor.clinic_id
+    return (
+        Doctor.objects.filter(pk=consultation.doctor_id)
+        .values_list("clinic_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Consultation)
+def consultation_saved(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        bump_clinic_stats(_consultation_clinic_id(instance), consultations_count=1)
+
+
+@receiver(post_delete, sender=Consultation)
+def consultation_deleted(sender, instance, **kwargs):
+    bump_clinic_stats(_consultation_clinic_id(instance), consultations_count=-1)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from billing.models import Medicine, Procedure
+from .models import Appointment, Patient, PatientAttachment, Tombstone
+
+# What a clinic's clients can keep a local copy of, by the name used in
+# ?models=, the response and Tombstone.model.
+SYNCED = {
+    "patients": Patient,
+    "appointments": Appointment,
+    "medicines": Medicine,
+    "procedures": Procedure,
+}
+SYNCED_NAMES = {model: name for name, model in SYNCED.items()}
+
+
+def parse_since(value):
+    """The ?updated_since= watermark as an aware datetime (None if absent)."""
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def sync_watermark():
+    """
+    Watermark for the next sync, taken before anything is read. It trails
+    the clock by SYNC_WATERMARK_LAG and changes are read with >=, so a row
+    whose transaction was still open (or saved on a server with a slightly
+    different clock) is sent again rather than missed; clients upsert by id.
+    """
+    return timezone.now() - timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+
+
+def needs_reset(since):
+    """No watermark, or one older than the tombstones still kept."""
+    return since is None or since < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+def changed_since(clinic, name, since):
+    """`name` rows of `clinic` changed since `since` (all of them for None)."""
+    queryset = SYNCED[name].objects.filter(clinic=clinic)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    return queryset.order_by("updated_at", "id")
+
+
+def deleted_since(clinic, names, since):
+    """{name: ids of `clinic`'s rows deleted since `since`} for `names`."""
+    deleted = {name: [] for name in names}
+    tombstones = (
+        Tombstone.objects.filter(clinic=clinic, deleted_at__gte=since, model__in=names)
+        .order_by("deleted_at", "id").values_list("model", "object_id")
+    )
+    for name, object_id in tombstones:
+        deleted[name].append(object_id)
+    return deleted
+
+
+def prune_tombstones():
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; returns how many."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+# -------------------- Receivers --------------------
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_delete, sender=Procedure)
+def _record_deletion(sender, instance, **kwargs):
+    # Cascades send this per row too (the receiver keeps Django from
+    # fast-deleting them), e.g. the appointments of a deleted patient.
+    Tombstone.objects.create(clinic_id=instance.clinic_id, model=SYNCED_NAMES[sender], object_id=instance.pk)
+
+
+@receiver(post_save, sender=PatientAttachment)
+@receiver(post_delete, sender=PatientAttachment)
+def _attachment_changed(sender, instance, **kwargs):
+    # Attachments are part of the synced patient row.
+    Patient.objects.filter(pk=instance.patient_id).update(updated_at=timezone.now())
@@ -1,3 +1,630 @@
-from django.test import TestCase
+import threading
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+from django.apps import apps
+from django.db import close_old_connections, connection
+from datetime import time, timedelta
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from admin_panel.models import Clinic
+from django.core.management import call_command
+from billing.models import ClinicBill, LabBill, MaterialPurchaseBill, Medicine, PharmacyBill, Procedure
+from clinic_project.query_plans import explain, record_queries, sequential_scans
+from clinic_project.tenant import get_profiles
+from doctor_panel.models import Consultation
+from .models import ClinicStats, DocumentSequence, Doctor, Patient, Appointment, Tombstone
+from .stats import COUNTER_FIELDS, get_clinic_dashboard_stats
 
-# Create your tests here.
+
+def make_clinic(name="Alpha Clinic"):
+    user = User.objects.create_user(username=f"{name.lower().replace(' ', '_')}", password="x", role="CLINIC")
+    return Clinic.objects.create(user=user, name=name)
+
+
+def make_doctor(clinic, username):
+    user = User.objects.create_user(username=username, password="x", role="DOCTOR")
+    return Doctor.objects.create(clinic=clinic, user=user, name=f"Dr {username}")
+
+
+def make_patient(clinic, first_name):
+    return Patient.objects.create(
+        clinic=clinic,
+        first_name=first_name,
+        last_name="Test",
+        phone_number="+910000000000",
+        address="Street",
+    )
+
+
+class ClinicDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = make_clinic()
+        other = make_clinic("Beta Clinic")
+        today = timezone.now().date()
+
+        for clinic, prefix in ((cls.clinic, "a"), (other, "b")):
+            doctors = [make_doctor(clinic, f"{prefix}_doc{i}") for i in range(3)]
+            patients = [make_patient(clinic, f"{prefix}_pat{i}") for i in range(4)]
+            for i, patient in enumerate(patients):
+                for j, status in enumerate(("SCHEDULED", "COMPLETED", "CANCELLED")):
+                    Appointment.objects.create(
+                        clinic=clinic,
+                        doctor=doctors[j],
+                        patient=patient,
+                        appointment_date=today + timedelta(days=i - 1),
+                        appointment_time=time(9 + j),
+                        status=status,
+                    )
+
+    def test_stats_are_scoped_to_clinic(self):
+        with self.assertNumQueries(1):
+            stats = get_clinic_dashboard_stats(self.clinic)
+
+        self.assertEqual(stats, {
+            "total_doctors": 3,
+            "total_patients": 4,
+            "total_appointments": 12,
+            "upcoming_appointments": 9,
+            "completed_appointments": 4,
+            "cancelled_appointments": 4,
+        })
+
+    @override_settings(TENANT_CACHE_ALIAS="default")  # standing in for the shared redis
+    def test_dashboard_query_count(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.clinic.user.pk))
+
+        # clinic_profile, stats, latest doctors, latest patients, upcoming appointments
+        with self.assertNumQueries(5):
+            response = client.get(reverse("clinic_panel:clinic-dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stats"]["total_patients"], 4)
+        self.assertEqual(len(response.data["latest_doctors"]), 3)
+        self.assertEqual(len(response.data["upcoming_appointments"]), 5)
+        self.assertIn("name", response.data["upcoming_appointments"][0]["doctor"])
+
+        # The clinic profile now comes from the tenant cache.
+        with self.assertNumQueries(4):
+            client.get(reverse("clinic_panel:clinic-dashboard"))
+
+
+class TenantContextTests(TestCase):
+    def setUp(self):
+        self.clinic = make_clinic()
+        self.doctor = make_doctor(self.clinic, "doc")
+        self.other = make_clinic("Beta Clinic")
+        make_doctor(self.other, "other_doc")
+        self.client = APIClient()
+
+    @override_settings(TENANT_CACHE_ALIAS="default")  # standing in for the shared redis
+    def test_profiles_are_cached_until_a_profile_changes(self):
+        with self.assertNumQueries(1):
+            clinic, doctor = get_profiles(self.doctor.user_id)
+        self.assertEqual((clinic, doctor), (None, self.doctor))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profiles(self.doctor.user_id)[1].clinic.name, "Alpha Clinic")
+
+        self.clinic.name = "Renamed Clinic"
+        self.clinic.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_profiles(self.doctor.user_id)[1].clinic.name, "Renamed Clinic")
+
+    def test_profiles_are_not_kept_without_a_shared_cache(self):
+        # A per-process cache would keep serving profiles another worker changed.
+        with self.settings(TENANT_CACHE_ALIAS=None):
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    self.assertEqual(get_profiles(self.doctor.user_id), (None, self.doctor))
+
+    def test_doctor_works_on_their_clinic(self):
+        self.client.force_authenticate(self.doctor.user)
+        response = self.client.get(reverse("clinic_panel:clinic-doctor-list-create"))
+        self.assertEqual(response.status_code, 403)  # clinic users and superadmins only
+
+        make_patient(self.clinic, "mine")
+        make_patient(self.other, "theirs")
+        response = self.client.get(reverse("clinic_panel:clinic-patient-list-create"))
+        self.assertEqual([patient["first_name"] for patient in response.data["results"]], ["mine"])
+
+    def test_superadmin_works_on_the_clinic_switched_to(self):
+        admin = User.objects.create_user(username="root", password="x", role="SUPERADMIN")
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(reverse("clinic_panel:clinic-doctor-list-create")).status_code, 403)
+
+        token = self.client.post(reverse("admin_panel:switch_panel"), {"target_id": self.other.user_id}).data["access"]
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.assertEqual(self.client.get(reverse("clinic_panel:clinic-dashboard")).data["clinic"], "Beta Clinic")
+        response = self.client.get(reverse("clinic_panel:clinic-doctor-list-create"))
+        self.assertEqual([doctor["name"] for doctor in response.data["results"]], ["Dr other_doc"])
+        # ?clinic_id still picks any clinic explicitly.
+        response = self.client.get(reverse("clinic_panel:clinic-doctor-list-create"), {"clinic_id": self.clinic.id})
+        self.assertEqual([doctor["name"] for doctor in response.data["results"]], ["Dr doc"])
+
+
+class ClinicStatsTests(TestCase):
+    def setUp(self):
+        self.clinic = make_clinic()
+        self.doctor = make_doctor(self.clinic, "doc")
+        self.patient = make_patient(self.clinic, "pat")
+
+    def counters(self):
+        return ClinicStats.objects.values(*COUNTER_FIELDS).get(clinic=self.clinic)
+
+    def book(self, status="SCHEDULED"):
+        return Appointment.objects.create(
+            clinic=self.clinic, doctor=self.doctor, patient=self.patient,
+            appointment_time=time(10), status=status,
+        )
+
+    def test_signals_track_creates_updates_and_deletes(self):
+        first = self.book()
+        self.book(status="CANCELLED")
+
+        first.status = "COMPLETED"
+        first.save()
+        Appointment.objects.get(pk=first.pk).save()  # no-op save keeps counters
+
+        stats = self.counters()
+        self.assertEqual(stats["doctors_count"], 1)
+        self.assertEqual(stats["patients_count"], 1)
+        self.assertEqual(stats["appointments_count"], 2)
+        self.assertEqual(stats["scheduled_appointments"], 0)
+        self.assertEqual(stats["completed_appointments"], 1)
+        self.assertEqual(stats["cancelled_appointments"], 1)
+
+        self.patient.delete()  # cascades to both appointments
+        stats = self.counters()
+        self.assertEqual(stats["patients_count"], 0)
+        self.assertEqual(stats["appointments_count"], 0)
+        self.assertEqual(stats["completed_appointments"], 0)
+
+    def test_rebuild_repairs_drift(self):
+        self.book()
+        expected = self.counters()
+        ClinicStats.objects.filter(clinic=self.clinic).update(appointments_count=42, patients_count=-3)
+
+        call_command("rebuild_clinic_stats", stdout=StringIO())
+
+        self.assertEqual(self.counters(), expected)
+
+    def test_missing_row_is_built_on_read(self):
+        self.book()
+        ClinicStats.objects.filter(clinic=self.clinic).delete()
+
+        stats = get_clinic_dashboard_stats(self.clinic)
+
+        self.assertEqual(stats["total_appointments"], 1)
+        self.assertTrue(ClinicStats.objects.filter(clinic=self.clinic).exists())
+
+
+class ListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = make_clinic()
+        cls.doctor = make_doctor(cls.clinic, "doc")
+        cls.patients = [make_patient(cls.clinic, f"pat{i}") for i in range(7)]
+        # Identical timestamps force the id tie-breaker to do the work.
+        Patient.objects.update(created_at=timezone.now())
+
+        today = timezone.now().date()
+        for i, patient in enumerate(cls.patients):
+            Appointment.objects.create(
+                clinic=cls.clinic, doctor=cls.doctor, patient=patient,
+                appointment_date=today + timedelta(days=i % 2),
+                appointment_time=time(9 + i % 3),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.clinic.user.pk))
+
+    def walk(self, url):
+        ids, previous = [], None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            previous, url = response.data["previous"], response.data["next"]
+        return ids, previous
+
+    def test_patients_are_paged_by_created_at_then_id(self):
+        url = reverse("clinic_panel:clinic-patient-list-create") + "?page_size=3"
+        ids, last_previous = self.walk(url)
+
+        expected = list(Patient.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+        response = self.client.get(last_previous)
+        self.assertEqual([row["id"] for row in response.data["results"]], expected[3:6])
+
+    def test_appointments_are_paged_by_date_time_then_id(self):
+        url = reverse("clinic_panel:clinic-appointment-list-create") + "?page_size=2"
+        ids, _ = self.walk(url)
+
+        expected = list(
+            Appointment.objects.order_by("-appointment_date", "-appointment_time", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_legacy_mode_returns_the_full_list(self):
+        url = reverse("clinic_panel:clinic-patient-list-create")
+        response = self.client.get(url, {"paginate": "false"})
+
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_invalid_cursor_is_rejected(self):
+        url = reverse("clinic_panel:clinic-doctor-list-create")
+        response = self.client.get(url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class BatchRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = make_clinic()
+        cls.doctor = make_doctor(cls.clinic, "doc")
+        cls.patient = make_patient(cls.clinic, "pat")
+        Appointment.objects.create(
+            clinic=cls.clinic, doctor=cls.doctor, patient=cls.patient, appointment_time=time(10),
+        )
+        PharmacyBill.objects.create(clinic=cls.clinic, patient=cls.patient)
+
+    def setUp(self):
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.clinic.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def batch(self, *paths, **item):
+        return self.client.post(
+            reverse("batch"), {"requests": [{"path": path, **item} for path in paths]}, format="json",
+        )
+
+    def test_patient_screen_in_one_round_trip(self):
+        pk = self.patient.pk
+        paths = [
+            reverse("clinic_panel:clinic-patient-detail", args=[pk]),
+            reverse("clinic_panel:patient-history", args=[pk]),
+            reverse("patient-pharmacy-bills", args=[pk]),
+            reverse("clinic-procedure-payments") + f"?patient_id={pk}",
+            reverse("clinic_panel:clinic-appointment-list-create") + "?page_size=5",
+        ]
+        response = self.batch(*paths)
+        self.assertEqual(response.status_code, 200)
+
+        responses = response.json()["responses"]
+        self.assertEqual([item["path"] for item in responses], paths)
+        self.assertEqual({item["status"] for item in responses}, {200})
+        for path, item in zip(paths, responses):
+            alone = self.client.get(path)
+            self.assertEqual((item["status"], item["body"]), (alone.status_code, alone.json()), path)
+
+    def test_sub_requests_fail_on_their_own(self):
+        other = make_patient(make_clinic("Beta Clinic"), "theirs")
+        responses = self.batch(
+            reverse("clinic_panel:clinic-patient-detail", args=[other.pk]),
+            "/api/no-such-endpoint/",
+            reverse("clinic_panel:clinic-patient-detail", args=[self.patient.pk]),
+        ).json()["responses"]
+        self.assertEqual([item["status"] for item in responses], [404, 404, 200])
+
+    def test_only_reads_of_api_paths(self):
+        patients = reverse("clinic_panel:clinic-patient-list-create")
+        self.assertEqual(self.batch(patients, method="POST").status_code, 400)
+        self.assertEqual(self.batch("/admin/").status_code, 400)
+        self.assertEqual(self.batch(reverse("batch")).status_code, 400)
+        self.assertEqual(self.batch(*[patients] * 21).status_code, 400)
+        self.assertEqual(self.batch().status_code, 400)
+
+        self.client.credentials()
+        self.assertEqual(self.batch(patients).status_code, 401)
+
+    def test_superadmin_clinic_is_resolved_once(self):
+        admin = User.objects.create_user(username="root", password="x", role="SUPERADMIN")
+        self.client.credentials()
+        self.client.force_authenticate(admin)
+        patients = reverse("clinic_panel:clinic-patient-list-create") + f"?clinic_id={self.clinic.pk}"
+        self.client.get(patients)  # warm-up
+
+        with self.assertNumQueries(3) as alone:
+            self.client.get(patients)
+        # The batch looks the clinic up once for both sub-requests.
+        with self.assertNumQueries(2 * len(alone) - 1):
+            responses = self.batch(patients, patients).json()["responses"]
+        self.assertEqual(responses[0]["body"], responses[1]["body"])
+
+    def test_streaming_and_async_views(self):
+        responses = self.batch(
+            reverse("admin_panel:admin-patient-vital-signs") + "?stream=true",
+            reverse("chat"),  # async (adrf) view, POST only
+            reverse("chat-preferences"),
+            reverse("clinic_panel:clinic-patient-detail", args=[self.patient.pk]),
+        ).json()["responses"]
+        self.assertEqual([item["status"] for item in responses], [400, 405, 200, 200])
+        self.assertEqual(responses[2]["body"], {"cache_opt_out": False})
+
+    def test_unexpected_errors_only_fail_their_sub_request(self):
+        history = reverse("clinic_panel:patient-history", args=[self.patient.pk])
+        detail = reverse("clinic_panel:clinic-patient-detail", args=[self.patient.pk])
+        with mock.patch("clinic_panel.views.PatientHistoryView.retrieve", side_effect=RuntimeError("boom")):
+            with self.assertLogs("clinic_project.batch", "ERROR"):
+                response = self.batch(history, detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["status"] for item in response.json()["responses"]], [500, 200])
+
+
+class ClinicSyncTests(TestCase):
+    def setUp(self):
+        self.clinic = make_clinic()
+        self.doctor = make_doctor(self.clinic, "doc")
+        self.patients = [make_patient(self.clinic, f"pat{i}") for i in range(3)]
+        self.appointments = [
+            Appointment.objects.create(
+                clinic=self.clinic, doctor=self.doctor, patient=patient, appointment_time=time(10),
+            )
+            for patient in self.patients
+        ]
+        Medicine.objects.create(clinic=self.clinic, name="Paracetamol", unit_price=5)
+        Procedure.objects.create(clinic=self.clinic, name="Dressing", price=100)
+        other = make_clinic("Beta Clinic")
+        make_patient(other, "theirs").delete()
+        Medicine.objects.create(clinic=other, name="Ibuprofen", unit_price=8)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.clinic.user.pk))
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params["updated_since"] = since if isinstance(since, str) else since.isoformat()
+        return self.client.get(reverse("clinic_panel:clinic-sync"), params)
+
+    def ids(self, response, name):
+        return [row["id"] for row in response.data["changes"][name]]
+
+    def test_first_sync_returns_everything(self):
+        response = self.sync()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(sorted(self.ids(response, "patients")), [patient.id for patient in self.patients])
+        self.assertEqual(len(response.data["changes"]["appointments"]), 3)
+        self.assertEqual([row["name"] for row in response.data["changes"]["medicines"]], ["Paracetamol"])
+        self.assertEqual(response.data["deleted"], {})
+
+        # The watermark is accepted back as is.
+        watermark = response.json()["watermark"]
+        self.assertFalse(self.sync(watermark).data["reset"])
+
+    def test_only_changes_since_the_watermark(self):
+        since = timezone.now()
+        self.assertEqual(self.sync(since).data["changes"], {
+            "patients": [], "appointments": [], "medicines": [], "procedures": [],
+        })
+
+        edited = self.patients[0]
+        edited.address = "New Street"
+        edited.save()
+        removed = self.appointments[1].id
+        self.appointments[1].delete()
+        added = Medicine.objects.create(clinic=self.clinic, name="Cetirizine", unit_price=3)
+
+        response = self.sync(since)
+        self.assertFalse(response.data["reset"])
+        self.assertEqual(self.ids(response, "patients"), [edited.id])
+        self.assertEqual(response.data["changes"]["patients"][0]["address"], "New Street")
+        self.assertEqual(self.ids(response, "medicines"), [added.id])
+        self.assertEqual(self.ids(response, "appointments"), [])
+        self.assertEqual(response.data["deleted"], {
+            "patients": [], "appointments": [removed], "medicines": [], "procedures": [],
+        })
+
+    def test_cascaded_deletions_leave_tombstones(self):
+        since = timezone.now()
+        patient_id, appointment_id = self.patients[2].id, self.appointments[2].id
+        self.patients[2].delete()
+
+        deleted = self.sync(since, models="patients,appointments").data["deleted"]
+        self.assertEqual(deleted, {"patients": [patient_id], "appointments": [appointment_id]})
+
+    def test_old_watermark_resets_and_old_tombstones_are_pruned(self):
+        self.appointments[0].delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+
+        response = self.sync(timezone.now() - timedelta(days=31))
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(len(response.data["changes"]["appointments"]), 2)
+
+        call_command("prune_tombstones", stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.sync("yesterday").status_code, 400)
+        self.assertEqual(self.sync(models="patients,invoices").status_code, 400)
+
+        response = self.sync(models="procedures", fields="id")
+        self.assertEqual(list(response.data["changes"]), ["procedures"])
+        self.assertEqual(response.data["changes"]["procedures"][0], {"id": Procedure.objects.get(clinic=self.clinic).id})
+
+        self.client.force_authenticate(self.doctor.user)
+        self.assertEqual(self.sync().status_code, 403)
+
+
+class DocumentSequenceTests(TestCase):
+    def test_patient_file_numbers_are_per_clinic(self):
+        alpha, beta = make_clinic(), make_clinic("Beta Clinic")
+        beta.file_number_start = 100
+        beta.save()
+
+        numbers = [make_patient(alpha, "a").file_number, make_patient(alpha, "b").file_number]
+        self.assertEqual(numbers, [f"CL{alpha.pk}-P-06000", f"CL{alpha.pk}-P-06001"])
+        self.assertEqual(make_patient(beta, "c").file_number, f"CL{beta.pk}-P-00100")
+
+    def test_bill_and_appointment_numbers_are_global(self):
+        alpha, beta = make_clinic(), make_clinic("Beta Clinic")
+        bills = [ClinicBill.objects.create(clinic=clinic, vendor_name="V") for clinic in (alpha, beta)]
+        self.assertEqual([bill.bill_number for bill in bills], ["CB-00001", "CB-00002"])
+
+        patient = make_patient(alpha, "a")
+        self.assertEqual(PharmacyBill.objects.create(clinic=alpha, patient=patient).bill_number, "PB-00001")
+
+        doctor = make_doctor(alpha, "doc")
+        appointment = Appointment.objects.create(
+            clinic=alpha, doctor=doctor, patient=patient, appointment_time=time(10),
+        )
+        self.assertEqual(appointment.appointment_id, "APT-000001")
+
+    def test_seed_migration_continues_from_existing_numbers(self):
+        clinic = make_clinic()
+        make_patient(clinic, "a")
+        Patient.objects.update(file_number=f"CL{clinic.pk}-P-07010")
+        ClinicBill.objects.create(clinic=clinic, vendor_name="V", bill_number="CB-00041")
+        DocumentSequence.objects.all().delete()
+
+        seed = import_module("clinic_panel.migrations.0010_seed_document_sequences").seed_sequences
+        seed(apps, None)
+
+        self.assertEqual(make_patient(clinic, "b").file_number, f"CL{clinic.pk}-P-07011")
+        self.assertEqual(ClinicBill.objects.create(clinic=clinic, vendor_name="V").bill_number, "CB-00042")
+
+
+@skipUnless(connection.vendor == "postgresql", "needs a database that allows concurrent writers")
+class DocumentSequenceConcurrencyTests(TransactionTestCase):
+    threads = 8
+    per_thread = 25
+
+    def test_concurrent_inserts_get_unique_contiguous_numbers(self):
+        clinic = make_clinic()
+        errors = []
+
+        def insert(worker):
+            try:
+                for i in range(self.per_thread):
+                    make_patient(clinic, f"w{worker}-{i}")
+                    ClinicBill.objects.create(clinic=clinic, vendor_name="V")
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=insert, args=(n,)) for n in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        total = self.threads * self.per_thread
+        file_numbers = sorted(Patient.objects.values_list("file_number", flat=True))
+        self.assertEqual(file_numbers, [f"CL{clinic.pk}-P-{6000 + n:05d}" for n in range(total)])
+        bill_numbers = sorted(ClinicBill.objects.values_list("bill_number", flat=True))
+        self.assertEqual(bill_numbers, [f"CB-{n:05d}" for n in range(1, total + 1)])
+
+
+class HotQueryPlanTests(TestCase):
+    """
+    Runs the queries behind the busiest clinic and doctor endpoints through
+    EXPLAIN and fails if any of them falls back to a full scan of a large
+    table. Point DATABASES at a seeded PostgreSQL copy to check real plans.
+    """
+    large_models = [
+        Patient, Appointment, Consultation, ClinicBill, LabBill, MaterialPurchaseBill, PharmacyBill, Tombstone,
+    ]
+
+    clinic_endpoints = [
+        ("clinic_panel:clinic-patient-list-create", {}),
+        ("clinic_panel:clinic-appointment-list-create", {}),
+        ("clinic_panel:clinic-consultations", {}),
+        ("clinic-clinic-bill-list-create", {}),
+        ("clinic-lab-bill-list-create", {}),
+        ("clinic-material-purchase-list-create", {}),
+        ("clinic-pharmacy-bill-list-create", {}),
+        ("clinic_panel:clinic-sync", {"updated_since": timezone.now().isoformat()}),
+    ]
+    doctor_endpoints = [
+        ("doctor_panel:doctor-all-appointments", {}),
+        ("doctor_panel:doctor-scheduled-appointments", {}),
+        ("doctor_panel:doctor-consultation-list-create", {}),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        for name in ("Alpha Clinic", "Beta Clinic"):
+            clinic = make_clinic(name)
+            doctor = make_doctor(clinic, f"doc_{clinic.pk}")
+            for i in range(5):
+                patient = make_patient(clinic, f"p{i}")
+                appointment = Appointment.objects.create(
+                    clinic=clinic, doctor=doctor, patient=patient,
+                    appointment_date=today + timedelta(days=i), appointment_time=time(9 + i),
+                )
+                Consultation.objects.create(doctor=doctor, patient=patient, appointment=appointment)
+                ClinicBill.objects.create(clinic=clinic, vendor_name="Vendor")
+                PharmacyBill.objects.create(clinic=clinic, patient=patient)
+        cls.clinic = Clinic.objects.get(name="Alpha Clinic")
+        cls.doctor = Doctor.objects.get(clinic=cls.clinic)
+        cls.tables = [model._meta.db_table for model in cls.large_models]
+
+    def assert_no_full_scans(self, user, endpoints):
+        client = APIClient()
+        client.force_authenticate(user)
+        for name, params in endpoints:
+            with self.subTest(endpoint=name):
+                with record_queries() as queries:
+                    response = client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 200)
+
+                for sql, sql_params in queries:
+                    plan = explain(sql, sql_params)
+                    self.assertEqual(sequential_scans(plan, self.tables), set(), f"{sql}\n" + "\n".join(plan))
+
+    def test_clinic_endpoints_use_indexes(self):
+        self.assert_no_full_scans(self.clinic.user, self.clinic_endpoints)
+
+    def test_doctor_endpoints_use_indexes(self):
+        self.assert_no_full_scans(self.doctor.user, self.doctor_endpoints)
+
+
+class SeedClinicsTests(TestCase):
+    def test_seeded_data_is_consistent(self):
+        out = StringIO()
+        call_command(
+            "seed_clinics", "--clinics", "2", "--patients-per-clinic", "10", "--years", "1", "--seed", "3",
+            stdout=out,
+        )
+
+        self.assertIn("Seeded 2 clinic(s)", out.getvalue())
+        self.assertEqual(Clinic.objects.count(), 2)
+        self.assertEqual(Patient.objects.count(), 20)
+        for model in (Consultation, PharmacyBill, LabBill, MaterialPurchaseBill, ClinicBill):
+            self.assertTrue(model.objects.exists(), model.__name__)
+
+        # History is spread over the past, not stamped with the seeding time
+        oldest = Consultation.objects.order_by("created_at").first().created_at
+        self.assertLess(oldest, timezone.now() - timedelta(days=30))
+
+        # Rollups rebuilt, bill totals match their items
+        clinic = Clinic.objects.first()
+        self.assertEqual(ClinicStats.objects.get(clinic=clinic).patients_count, 10)
+        bill = PharmacyBill.objects.filter(clinic=clinic).first()
+        self.assertEqual(bill.total_amount, sum(item.subtotal for item in bill.items.all()))
+
+        # Document numbers carry on after the seeded ones
+        patient = make_patient(clinic, "New")
+        self.assertEqual(patient.file_number, f"CL{clinic.pk}-P-{clinic.file_number_start + 10:05d}")
+        appointment = Appointment.objects.create(
+            clinic=clinic, doctor=Doctor.objects.filter(clinic=clinic).first(), patient=patient,
+            appointment_time=time(10),
+        )
+        self.assertEqual(appointment.appointment_id, f"APT-{Appointment.objects.count():06d}")
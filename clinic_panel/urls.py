@@ -26,4 +26,7 @@ urlpatterns = [
     #Prescriptions
     path("prescriptions/", ClinicPrescriptionListAPIView.as_view(), name="clinic-prescription-list"),
     path("prescriptions/<int:pk>/", ClinicPrescriptionDetailAPIView.as_view(), name="clinic-prescription-detail"),
+
+    # Delta sync for offline-capable clients
+    path("sync/", ClinicSyncAPIView.as_view(), name="clinic-sync"),
 ]
@@ -6,15 +6,21 @@ from django.utils.timezone import now
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from clinic_project.permissions import RoleBasedPanelAccess
+from clinic_project.pagination import CreatedAtCursorPagination, AppointmentCursorPagination, paginated_response
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import Doctor, Patient, Appointment, PatientAttachment
 from admin_panel.models import Clinic
 from doctor_panel.models import Prescription, Consultation    
 from admin_panel.serializers import DoctorSerializer, PatientSerializer, AppointmentSerializer, ClinicAppointmentSerializer
+from admin_panel.serializers import CompactAppointmentSerializer, CompactDoctorSerializer, CompactPatientSerializer
+from clinic_project.serialization import list_data, list_serializer
+from billing.serializers import MedicineSerializer, ProcedureSerializer
 from doctor_panel.serializers import PrescriptionSerializer, ConsultationSerializer
 from .serializers import ClinicPrescriptionListSerializer, ClinicConsultationSerializer, PatientHistorySerializer
+from .serializers import DashboardDoctorSerializer, DashboardPatientSerializer, DashboardAppointmentSerializer
+from .stats import get_clinic_dashboard_stats
+from .sync import SYNCED, changed_since, deleted_since, needs_reset, parse_since, sync_watermark
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.backends import TokenBackend
 from rest_framework.permissions import IsAuthenticated
 
 
@@ -25,6 +31,7 @@ class ClinicDashboardAPIView(APIView):
 
     def get(self, request, clinic_id=None):
         user = request.user
+        tenant = request.tenant
         clinic = None
 
         # --- Case 1: Superadmin (switching between clinics) ---
@@ -36,18 +43,8 @@ class ClinicDashboardAPIView(APIView):
                 except (User.DoesNotExist, Clinic.DoesNotExist):
                     return Response({"error": "Clinic not found."}, status=404)
             else:
-                # fallback: use token acting_as info
-                auth_header = request.headers.get("Authorization", "")
-                token = auth_header.split(" ")[1] if " " in auth_header else None
-                if token:
-                    try:
-                        payload = TokenBackend(algorithm='HS256').decode(token, verify=False)
-                        acting_as_id = payload.get("target_id")
-                        if acting_as_id:
-                            acting_user = User.objects.get(id=acting_as_id)
-                            clinic = acting_user.clinic_profile
-                    except Exception:
-                        pass
+                # fallback: the clinic switched to (token acting_as info)
+                clinic = tenant.clinic
 
             if not clinic:
                 clinic = Clinic.objects.first()
@@ -56,21 +53,25 @@ class ClinicDashboardAPIView(APIView):
 
         # --- Case 2: Normal clinic user ---
         elif user.role == "CLINIC":
-            try:
-                clinic = user.clinic_profile
-                if clinic_id and clinic.user.id != clinic_id:
-                    return Response({"error": "Unauthorized access."}, status=403)
-            except Clinic.DoesNotExist:
+            clinic = tenant.clinic
+            if not clinic:
                 return Response({"error": "Clinic profile not found."}, status=404)
+            if clinic_id and clinic.user_id != clinic_id:
+                return Response({"error": "Unauthorized access."}, status=403)
 
         # --- Case 3: Others ---
         else:
             return Response({"error": "Only clinic users or superadmin can access this endpoint."}, status=403)
 
         # --- Fetch related data ---
-        doctors = Doctor.objects.filter(clinic=clinic)
-        patients = Patient.objects.filter(clinic=clinic)
-        appointments = Appointment.objects.filter(clinic=clinic)
+        today = now().date()
+        latest_doctors = Doctor.objects.filter(clinic=clinic).order_by("-created_at")[:5]
+        latest_patients = Patient.objects.filter(clinic=clinic).order_by("-created_at")[:5]
+        upcoming_appointments = (
+            Appointment.objects.filter(clinic=clinic, appointment_date__gte=today)
+            .select_related("doctor", "patient")
+            .order_by("appointment_date", "appointment_time")[:5]
+        )
 
         data = {
             "user": {
@@ -79,20 +80,10 @@ class ClinicDashboardAPIView(APIView):
                 "last_name": user.last_name,
             },
             "clinic": clinic.name,
-            "stats": {
-                "total_doctors": doctors.count(),
-                "total_patients": patients.count(),
-                "total_appointments": appointments.count(),
-                "upcoming_appointments": appointments.filter(appointment_date__gte=now().date()).count(),
-                "completed_appointments": appointments.filter(status="COMPLETED").count(),
-                "cancelled_appointments": appointments.filter(status="CANCELLED").count(),
-            },
-            "latest_doctors": DoctorSerializer(doctors.order_by("-created_at")[:5], many=True).data,
-            "latest_patients": PatientSerializer(patients.order_by("-created_at")[:5], many=True).data,
-            "upcoming_appointments": AppointmentSerializer(
-                appointments.filter(appointment_date__gte=now().date()).order_by("appointment_date")[:5],
-                many=True
-            ).data,
+            "stats": get_clinic_dashboard_stats(clinic),
+            "latest_doctors": DashboardDoctorSerializer(latest_doctors, many=True).data,
+            "latest_patients": DashboardPatientSerializer(latest_patients, many=True).data,
+            "upcoming_appointments": DashboardAppointmentSerializer(upcoming_appointments, many=True).data,
         }
 
         return Response(data)
@@ -157,25 +148,21 @@ class ClinicDashboardAPIView(APIView):
 
 class DoctorListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_clinic(self, request):
         """✅ Determine clinic for this request."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")  # superadmin acting as clinic
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get(self, request):
         clinic = self.get_clinic(request)
         if not clinic:
             return Response({"error": "Clinic not found or not authorized"}, status=403)
 
-        doctors = Doctor.objects.filter(clinic=clinic).order_by("-created_at")
-        serializer = DoctorSerializer(doctors, many=True)
-        return Response(serializer.data)
+        doctors, serializer_class = list_serializer(
+            request, Doctor.objects.filter(clinic=clinic).order_by("-created_at"), DoctorSerializer, CompactDoctorSerializer
+        )
+        return paginated_response(self, request, doctors, serializer_class)
 
     def post(self, request):
         clinic = self.get_clinic(request)
@@ -196,13 +183,7 @@ class DoctorRetrieveUpdateDeleteAPIView(APIView):
 
     def get_clinic(self, request):
         """✅ Determine clinic for this request."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-        return getattr(user, "clinic_profile", None)
+        return request.tenant.get_clinic()
 
     def get_object(self, pk, clinic):
         return get_object_or_404(Doctor, pk=pk, clinic=clinic)
@@ -488,29 +469,14 @@ class DoctorRetrieveUpdateDeleteAPIView(APIView):
 class PatientListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = CreatedAtCursorPagination
 
     def get_clinic(self, request):
         """
         Determine clinic for this request.
         Superadmin must pass clinic_id as query param.
         """
-        user = request.user
-
-        if getattr(user, "role", "").lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        # Clinic admin / staff
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        # Doctor
-        if hasattr(user, "doctor_profile"):
-            return getattr(user.doctor_profile, "clinic", None)
-
-        return None
+        return request.tenant.get_clinic(doctors=True)
 
     def get(self, request):
         clinic = self.get_clinic(request)
@@ -520,10 +486,11 @@ class PatientListCreateAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        patients = Patient.objects.filter(clinic=clinic).order_by("-created_at")
+        patients, serializer_class = list_serializer(
+            request, Patient.objects.filter(clinic=clinic).order_by("-created_at"), PatientSerializer, CompactPatientSerializer
+        )
 
-        serializer = PatientSerializer(patients, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, request, patients, serializer_class)
 
     def post(self, request):
         serializer = PatientSerializer(
@@ -554,21 +521,7 @@ class PatientRetrieveUpdateDeleteAPIView(APIView):
         Determine the clinic for this request.
         Superadmin must pass clinic_id as query param.
         """
-        user = request.user
-
-        if getattr(user, "role", "").lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return None
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-
-        if hasattr(user, "doctor_profile"):
-            return getattr(user.doctor_profile, "clinic", None)
-
-        return None
+        return request.tenant.get_clinic(doctors=True)
 
     def get_object(self, pk, clinic):
         return get_object_or_404(
@@ -681,11 +634,11 @@ class PatientAttachmentDeleteAPIView(APIView):
         attachment = get_object_or_404(PatientAttachment, pk=pk)
 
         # Optional: permission check
-        user = request.user
+        clinic = request.tenant.clinic
         patient = attachment.patient
 
-        if hasattr(user, "clinic_profile"):
-            if patient.clinic != user.clinic_profile:
+        if clinic:
+            if patient.clinic_id != clinic.id:
                 return Response(
                     {"detail": "Not authorized"},
                     status=status.HTTP_403_FORBIDDEN
@@ -836,27 +789,20 @@ class PatientAttachmentDeleteAPIView(APIView):
 
 class AppointmentListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AppointmentCursorPagination
 
     def get_serializer_class(self):
-        user = self.request.user
-        if hasattr(user, "clinic_profile"):
+        if self.request.tenant.clinic:
             return ClinicAppointmentSerializer
         return AppointmentSerializer
 
     def get_clinic(self, request):
         """✅ Get clinic for clinic user or superadmin (via query param)."""
-        user = request.user
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-        elif user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if clinic_id:
-                return get_object_or_404(Clinic, id=clinic_id)
-        return None
+        return request.tenant.get_clinic()
 
     def get_queryset(self, request):
         """✅ Return filtered queryset based on role."""
-        user = request.user
+        doctor = request.tenant.doctor
         patient_id = request.query_params.get("patient_id")
         clinic = self.get_clinic(request)
 
@@ -865,8 +811,8 @@ class AppointmentListCreateAPIView(APIView):
 
         queryset = Appointment.objects.filter(clinic=clinic)
 
-        if hasattr(user, "doctor_profile"):
-            queryset = queryset.filter(doctor=user.doctor_profile)
+        if doctor:
+            queryset = queryset.filter(doctor=doctor)
 
         if patient_id:
             queryset = queryset.filter(patient_id=patient_id)
@@ -878,10 +824,10 @@ class AppointmentListCreateAPIView(APIView):
         if not clinic:
             return Response({"error": "Clinic not found or not authorized"}, status=403)
 
-        appointments = self.get_queryset(request)
-        serializer_class = self.get_serializer_class()
-        serializer = serializer_class(appointments, many=True)
-        return Response(serializer.data)
+        appointments, serializer_class = list_serializer(
+            request, self.get_queryset(request), self.get_serializer_class(), CompactAppointmentSerializer
+        )
+        return paginated_response(self, request, appointments, serializer_class)
 
     def post(self, request):
         user = request.user
@@ -907,21 +853,13 @@ class AppointmentRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_serializer_class(self):
-        user = self.request.user
-        if hasattr(user, "clinic_profile"):
+        if self.request.tenant.clinic:
             return ClinicAppointmentSerializer
         return AppointmentSerializer
 
     def get_clinic(self, request):
         """✅ Determine clinic for both superadmin and clinic user."""
-        user = request.user
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
-        elif user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if clinic_id:
-                return get_object_or_404(Clinic, id=clinic_id)
-        return None
+        return request.tenant.get_clinic()
 
     def get_object(self, pk, clinic):
         """✅ Get appointment restricted to that clinic."""
@@ -1005,27 +943,20 @@ class ClinicPrescriptionListAPIView(APIView):
     ✅ Superadmin: when switched to a clinic (via ?clinic_id=XYZ), can view that clinic’s prescriptions.
     """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get(self, request):
-        user = request.user
+        tenant = request.tenant
 
         # --- Determine which clinic to fetch prescriptions for ---
-        clinic = None
-
-        # Case 1: Clinic user → use their own clinic profile
-        if hasattr(user, "clinic_profile"):
-            clinic = user.clinic_profile
-
-        # Case 2: Superadmin → use ?clinic_id=XYZ param
-        elif hasattr(user, "role") and user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return Response(
-                    {"detail": "clinic_id query parameter is required for superadmin."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            clinic = get_object_or_404(Clinic, id=clinic_id)
+        # Clinic user → their own clinic profile;
+        # Superadmin → ?clinic_id=XYZ param (or the clinic switched to)
+        clinic = tenant.get_clinic()
+        if not clinic and tenant.is_superadmin:
+            return Response(
+                {"detail": "clinic_id query parameter is required for superadmin."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # --- If still no clinic found ---
         if not clinic:
@@ -1035,14 +966,13 @@ class ClinicPrescriptionListAPIView(APIView):
             )
 
         # --- Fetch prescriptions for the clinic ---
-        prescriptions = (
-            Prescription.objects.filter(consultation__doctor__clinic=clinic)
-            .select_related("consultation", "consultation__patient")
-            .order_by("-created_at")
+        prescriptions, serializer_class = list_serializer(
+            request,
+            Prescription.objects.filter(consultation__doctor__clinic=clinic).order_by("-created_at"),
+            ClinicPrescriptionListSerializer,
         )
 
-        serializer = ClinicPrescriptionListSerializer(prescriptions, many=True)
-        return Response(serializer.data)
+        return paginated_response(self, request, prescriptions, serializer_class)
 
 class ClinicPrescriptionDetailAPIView(APIView):
     """
@@ -1052,22 +982,15 @@ class ClinicPrescriptionDetailAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        user = request.user
-        clinic = None
-
-        # --- Case 1: Clinic user ---
-        if hasattr(user, "clinic_profile"):
-            clinic = user.clinic_profile
+        tenant = request.tenant
 
-        # --- Case 2: Superadmin (use clinic_id param) ---
-        elif hasattr(user, "role") and user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                return Response(
-                    {"detail": "clinic_id query parameter is required for superadmin."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            clinic = get_object_or_404(Clinic, id=clinic_id)
+        # --- Clinic user, or superadmin (clinic_id param / clinic switched to) ---
+        clinic = tenant.get_clinic()
+        if not clinic and tenant.is_superadmin:
+            return Response(
+                {"detail": "clinic_id query parameter is required for superadmin."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # --- If no valid clinic found ---
         if not clinic:
@@ -1091,20 +1014,17 @@ class ClinicPrescriptionDetailAPIView(APIView):
 class ClinicConsultationListAPIView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_clinic(self, request):
-        user = request.user
+        tenant = request.tenant
+        clinic = tenant.get_clinic()
+        if clinic:
+            return clinic
 
         # 🔹 Superadmin can view any clinic’s consultations using clinic_id
-        if user.role.lower() == "superadmin":
-            clinic_id = request.query_params.get("clinic_id")
-            if not clinic_id:
-                raise PermissionDenied("clinic_id is required for superadmin.")
-            return get_object_or_404(Clinic, id=clinic_id)
-
-        # 🔹 Clinic user can only view their own clinic’s consultations
-        if hasattr(user, "clinic_profile"):
-            return user.clinic_profile
+        if tenant.is_superadmin:
+            raise PermissionDenied("clinic_id is required for superadmin.")
 
         raise PermissionDenied("Only clinic users or superadmins can access this endpoint.")
 
@@ -1112,17 +1032,15 @@ class ClinicConsultationListAPIView(APIView):
         clinic = self.get_clinic(request)
 
         # 🔹 Fetch all consultations under this clinic
-        consultations = Consultation.objects.filter(
-            doctor__clinic=clinic
-        ).select_related("doctor", "patient").order_by("-created_at")
+        consultations = Consultation.objects.filter(doctor__clinic=clinic).order_by("-created_at")
 
         # 🔹 Optional filter by patient_id
         patient_id = request.query_params.get("patient_id")
         if patient_id:
             consultations = consultations.filter(patient_id=patient_id)
 
-        serializer = ConsultationSerializer(consultations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        consultations, serializer_class = list_serializer(request, consultations, ConsultationSerializer)
+        return paginated_response(self, request, consultations, serializer_class)
    
 class PatientHistoryView(RetrieveAPIView):
     queryset = Patient.objects.prefetch_related(
@@ -1131,4 +1049,71 @@ class PatientHistoryView(RetrieveAPIView):
     serializer_class = PatientHistorySerializer
     permission_classes = [IsAuthenticated]
 
-    lookup_field = "id"
\ No newline at end of file
+    lookup_field = "id"
+
+
+class ClinicSyncAPIView(APIView):
+    """
+    Delta sync for clients that keep a local copy of the clinic's patients,
+    appointments, medicines and procedures:
+
+        GET /api/clinic/sync/?updated_since=<watermark>[&models=patients,medicines]
+
+    returns the rows changed since the watermark (as their list endpoints
+    render them, ?view=compact and ?fields= included), the ids deleted since
+    then, and the watermark to send next time. Without a watermark, or with
+    one older than the tombstones kept, every row comes back with
+    "reset": true and the client should replace its copy. Apply "deleted"
+    before "changes"; rows can be sent more than once, so upsert by id.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_classes(self, request):
+        """(serializer, ?view=compact serializer) of each synced model."""
+        return {
+            "patients": (PatientSerializer, CompactPatientSerializer),
+            "appointments": (
+                ClinicAppointmentSerializer if request.tenant.clinic else AppointmentSerializer,
+                CompactAppointmentSerializer,
+            ),
+            "medicines": (MedicineSerializer, None),
+            "procedures": (ProcedureSerializer, None),
+        }
+
+    def get(self, request):
+        clinic = request.tenant.get_clinic()
+        if not clinic:
+            return Response({"error": "Clinic not found or not authorized"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            since = parse_since(request.query_params.get("updated_since"))
+        except ValueError:
+            return Response(
+                {"updated_since": ["Expected an ISO 8601 date-time, e.g. a previous watermark."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        names = [name for name in request.query_params.get("models", "").split(",") if name] or list(SYNCED)
+        unknown = set(names) - set(SYNCED)
+        if unknown:
+            return Response(
+                {"models": [f"Unknown: {', '.join(sorted(unknown))}. Choose from {', '.join(SYNCED)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        watermark = sync_watermark()
+        reset = needs_reset(since)
+        if reset:
+            since = None
+        serializer_classes = self.get_serializer_classes(request)
+        changes = {}
+        for name in names:
+            rows, serializer_class = list_serializer(
+                request, changed_since(clinic, name, since), *serializer_classes[name]
+            )
+            changes[name] = list_data(request, rows, serializer_class)
+        return Response({
+            "watermark": watermark,
+            "reset": reset,
+            "changes": changes,
+            "deleted": {} if reset else deleted_since(clinic, names, since),
+        })
@@ -0,0 +1,123 @@
+import inspect
+import logging
+from urllib.parse import urlsplit
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import resolve
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .tenant import request_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    # Only reads: a batch is for loading a screen, writes keep their own
+    # requests (and transactions).
+    method = serializers.ChoiceField(choices=["GET"], default="GET")
+    path = serializers.CharField()
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith("/api/") or path.rstrip("/") == "/api/batch":
+            raise serializers.ValidationError("Must be an /api/ path other than the batch endpoint.")
+        return value
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests per batch.")
+        return value
+
+
+def sub_request(request, method, path):
+    """
+    Django request for `path` on behalf of the (already authenticated) batch
+    `request`: same headers and user, a tenant that reuses the batch's
+    profiles, and the batch's request cache.
+    """
+    url = urlsplit(path)
+    parent = request._request
+    sub = HttpRequest()
+    sub.method = method
+    sub.path = sub.path_info = url.path
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = parent.COOKIES
+    sub.META = {**parent.META, "REQUEST_METHOD": method, "PATH_INFO": url.path, "QUERY_STRING": url.query}
+    sub.META.pop("CONTENT_LENGTH", None)
+    sub.user = request.user
+    # DRF takes these instead of authenticating the request again.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    sub.tenant = request.tenant.for_request(sub)
+    sub.memo = request_cache(request)
+    return sub
+
+
+async def _awaited(awaitable):
+    return await awaitable
+
+
+def run(sub):
+    """(status, body) of the view `sub` resolves to."""
+    match = resolve(sub.path_info)
+    sub.resolver_match = match
+    response = match.func(sub, *match.args, **match.kwargs)
+    if inspect.isawaitable(response):  # async views (adrf, Django)
+        response = async_to_sync(_awaited)(response)
+    if response.streaming:
+        # Streams are for bodies too large to build in memory at once.
+        response.close()
+        return 400, {"detail": "Streaming responses can't be batched, request it on its own."}
+    if hasattr(response, "data"):
+        return response.status_code, response.data
+    return response.status_code, response.content.decode(response.charset) or None
+
+
+def dispatch(request, method, path):
+    """
+    (status, body) of one sub-request. Whatever goes wrong in it, it only
+    fails that sub-request.
+    """
+    try:
+        return run(sub_request(request, method, path))
+    except Http404:
+        return 404, {"detail": "Not found."}
+    except PermissionDenied:
+        return 403, {"detail": "You do not have permission to perform this action."}
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", method, path)
+        return 500, {"detail": "A server error occurred."}
+
+
+class BatchAPIView(APIView):
+    """
+    Runs several GET requests in one round trip, e.g. everything the
+    patient screen loads:
+
+        {"requests": [{"path": "/api/clinic/patients/5/"},
+                      {"path": "/api/clinic/patients/5/history/"}, ...]}
+
+    The JWT is validated and the tenant resolved once for the whole batch,
+    and the sub-requests share one request cache. Each one goes through its
+    own view (permissions, filters, pagination), and comes back in order as
+    {"status": ..., "body": ...}; a failing sub-request doesn't fail the
+    others.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = []
+        for item in serializer.validated_data["requests"]:
+            status, body = dispatch(request, item["method"], item["path"])
+            responses.append({"path": item["path"], "status": status, "body": body})
+        return Response({"responses": responses})
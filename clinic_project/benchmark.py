@@ -0,0 +1,290 @@
+import re
+import statistics
+import subprocess
+import time
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from admin_panel.models import Clinic
+from billing.models import (
+    ClinicBill, LabBill, MaterialPurchaseBill, Medicine, PharmacyBill, Procedure, ProcedurePayment,
+)
+from clinic_panel.models import Appointment, Doctor, Patient, PatientAttachment
+from doctor_panel.models import Consultation, Prescription
+from .perf import percentile
+
+
+# Django admin and the API docs are not part of the product's hot paths.
+EXCLUDED_PREFIXES = ("/admin/", "/swagger", "/redoc")
+
+# Which login each part of the API is benchmarked as (first match wins).
+ROLE_PREFIXES = [
+    ("/api/billing/clinic/", "CLINIC"),
+    ("/api/billing/medicines/", "CLINIC"),
+    ("/api/billing/procedures/", "CLINIC"),
+    ("/api/clinic/", "CLINIC"),
+    ("/api/doctor/", "DOCTOR"),
+]
+DEFAULT_ROLE = "SUPERADMIN"
+
+# Model behind a `pk` / `id` URL parameter, by the path segment before it.
+SEGMENT_MODELS = {
+    "clinics": Clinic,
+    "doctors": Doctor,
+    "patients": Patient,
+    "patient": Patient,
+    "attachments": PatientAttachment,
+    "appointments": Appointment,
+    "consultations": Consultation,
+    "prescriptions": Prescription,
+    "medicines": Medicine,
+    "procedures": Procedure,
+    "material-purchase": MaterialPurchaseBill,
+    "clinic-bill": ClinicBill,
+    "lab-bill": LabBill,
+    "pharmacy-bill": PharmacyBill,
+    "procedure-payments": ProcedurePayment,
+    "dashboard": None,  # resolved by the kwarg name instead
+}
+KWARG_MODELS = {
+    "clinic_id": Clinic,
+    "doctor_id": Doctor,
+    "patient_id": Patient,
+    "consultation_id": Consultation,
+}
+
+# How to pick a sample row that the benchmark clinic (and its doctor) can see.
+CLINIC_LOOKUPS = {
+    Clinic: "pk",
+    Doctor: "clinic",
+    Patient: "clinic",
+    PatientAttachment: "patient__clinic",
+    Appointment: "clinic",
+    Consultation: "doctor__clinic",
+    Prescription: "consultation__doctor__clinic",
+    Medicine: "clinic",
+    Procedure: "clinic",
+    MaterialPurchaseBill: "clinic",
+    ClinicBill: "clinic",
+    LabBill: "clinic",
+    PharmacyBill: "clinic",
+    ProcedurePayment: "bill_item__bill__clinic",
+}
+DOCTOR_LOOKUPS = {
+    Doctor: "pk",
+    Appointment: "doctor",
+    Consultation: "doctor",
+    Prescription: "consultation__doctor",
+    Patient: "appointments__doctor",
+}
+
+PARAMETER = re.compile(r"<(?:(?P<converter>[^>:]+):)?(?P<name>\w+)>")
+
+# Serializer time as reported by PerformanceMiddleware.
+SERIALIZER_TIMING = re.compile(r"serializer;dur=([\d.]+)")
+
+
+def iter_routes(patterns=None, prefix="/", namespace=None):
+    """
+    (route, name, view) for every concrete URL pattern, e.g.
+    ("/api/clinic/patients/<int:pk>/", "clinic_panel:clinic-patient-detail", <view>).
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern).lstrip("^").rstrip("$")
+        if isinstance(pattern, URLResolver):
+            child_namespace = pattern.namespace or namespace
+            yield from iter_routes(pattern.url_patterns, route, child_namespace)
+        elif isinstance(pattern, URLPattern):
+            name = f"{namespace}:{pattern.name}" if namespace and pattern.name else pattern.name
+            yield route, name, pattern.callback
+
+
+def handles_get(view):
+    # as_view() exposes the class as view_class, @api_view functions as cls
+    view_class = getattr(view, "view_class", None) or getattr(view, "cls", None)
+    return view_class is None or hasattr(view_class, "get")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class EndpointBenchmark:
+    """
+    GETs every route in the URLconf with the Django test client and records
+    latency percentiles and query counts per endpoint. Each route is called
+    as the role that owns it (superadmin, the busiest clinic, or that
+    clinic's busiest doctor), with URL parameters filled from rows that
+    login can see. Routes whose parameters cannot be filled are reported
+    as skipped.
+    """
+
+    def __init__(self, iterations=10, warmup=1, clinic=None, query=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.query = query
+        self.clinic = clinic or self._busiest_clinic()
+        self.doctor = self._busiest_doctor()
+        self.users = {
+            "SUPERADMIN": self._superadmin(),
+            "CLINIC": self.clinic.user if self.clinic else None,
+            "DOCTOR": self.doctor.user if self.doctor else None,
+        }
+
+    def _busiest_clinic(self):
+        return (
+            Clinic.objects.filter(user__isnull=False)
+            .annotate(patient_total=Count("patient"))
+            .order_by("-patient_total", "pk").first()
+        )
+
+    def _busiest_doctor(self):
+        if self.clinic is None:
+            return None
+        return (
+            Doctor.objects.filter(clinic=self.clinic)
+            .annotate(appointment_total=Count("appointments"))
+            .order_by("-appointment_total", "pk").first()
+        )
+
+    def _superadmin(self):
+        user = User.objects.filter(role="SUPERADMIN").first()
+        if user is None:
+            user = User.objects.create_user(username="benchmark_superadmin", role="SUPERADMIN")
+        return user
+
+    # -------------------- URL building --------------------
+    def role_for(self, route):
+        for prefix, role in ROLE_PREFIXES:
+            if route.startswith(prefix):
+                return role
+        return DEFAULT_ROLE
+
+    def sample_id(self, model, role):
+        queryset = model.objects.all()
+        if role == "DOCTOR" and model in DOCTOR_LOOKUPS and self.doctor:
+            queryset = queryset.filter(**{DOCTOR_LOOKUPS[model]: self.doctor.pk})
+        elif model in CLINIC_LOOKUPS and self.clinic:
+            queryset = queryset.filter(**{CLINIC_LOOKUPS[model]: self.clinic.pk})
+        return queryset.order_by("-pk").values_list("pk", flat=True).first()
+
+    def build_url(self, route, role):
+        """The route with its parameters filled in, or None if they cannot be."""
+        url = route
+        for match in PARAMETER.finditer(route):
+            name = match.group("name")
+            model = KWARG_MODELS.get(name)
+            if model is None and name in ("pk", "id"):
+                segments = [s for s in route[:match.start()].split("/") if s]
+                model = SEGMENT_MODELS.get(segments[-1]) if segments else None
+            value = self.sample_id(model, role) if model is not None else None
+            if value is None:
+                return None
+            url = url.replace(match.group(0), str(value), 1)
+        return url
+
+    # -------------------- Running --------------------
+    def client_for(self, role):
+        user = self.users.get(role)
+        if user is None:
+            return None
+        token = RefreshToken.for_user(user).access_token
+        return Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def measure(self, client, url):
+        timings, serializer_ms, queries, status, size = [], [], None, None, None
+        for attempt in range(self.warmup + self.iterations):
+            # Count with an execute wrapper rather than connection.queries,
+            # whose log is capped and would undercount the worst endpoints.
+            executed = []
+            with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = (time.perf_counter() - started) * 1000
+            if attempt >= self.warmup:
+                timings.append(elapsed)
+                queries = len(executed)
+                status = response.status_code
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                size = len(body)
+                timing = SERIALIZER_TIMING.search(response.get("Server-Timing", ""))
+                if timing:
+                    serializer_ms.append(float(timing.group(1)))
+        return {
+            "status": status,
+            "p50_ms": round(percentile(timings, 0.50), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "serializer_ms": round(statistics.fmean(serializer_ms), 2) if serializer_ms else None,
+            "queries": queries,
+            "bytes": size,
+        }
+
+    def run(self, include=None, progress=None):
+        """
+        Benchmark every route (or those matching the `include` regex).
+        `progress`, if given, is called with each endpoint's result as it
+        finishes.
+        """
+        clients = {}
+        endpoints, skipped = [], []
+        for route, name, view in iter_routes():
+            if route.startswith(EXCLUDED_PREFIXES) or (include and not re.search(include, route)):
+                continue
+            if not handles_get(view):
+                skipped.append({"route": route, "name": name, "reason": "no GET handler"})
+                continue
+            role = self.role_for(route)
+            if role not in clients:
+                clients[role] = self.client_for(role)
+            url = self.build_url(route, role)
+            if url is None or clients[role] is None:
+                skipped.append({"route": route, "name": name, "reason": "no sample data for URL parameters"})
+                continue
+            if self.query:
+                url = f"{url}?{self.query}"
+            result = {"route": route, "name": name, "url": url, "role": role, **self.measure(clients[role], url)}
+            endpoints.append(result)
+            if progress:
+                progress(result)
+
+        return {
+            "revision": git_revision(),
+            "database": connection.vendor,
+            "generated_at": timezone.now().isoformat(),
+            "iterations": self.iterations,
+            "query": self.query,
+            "clinic_id": self.clinic.pk if self.clinic else None,
+            "doctor_id": self.doctor.pk if self.doctor else None,
+            "endpoints": endpoints,
+            "skipped": skipped,
+        }
+
+
+def compare(baseline, current):
+    """Per-route changes between two `EndpointBenchmark.run()` reports."""
+    before = {endpoint["route"]: endpoint for endpoint in baseline["endpoints"]}
+    rows = []
+    for endpoint in current["endpoints"]:
+        old = before.get(endpoint["route"])
+        if old is None:
+            continue
+        rows.append({
+            "route": endpoint["route"],
+            "p50_ms": [old["p50_ms"], endpoint["p50_ms"]],
+            "p95_ms": [old["p95_ms"], endpoint["p95_ms"]],
+            "serializer_ms": [old.get("serializer_ms"), endpoint.get("serializer_ms")],
+            "queries": [old["queries"], endpoint["queries"]],
+            "bytes": [old.get("bytes"), endpoint.get("bytes")],
+            "bytes_ratio": round(endpoint["bytes"] / old["bytes"], 3) if old.get("bytes") else None,
+        })
+    return rows
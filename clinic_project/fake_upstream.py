@@ -0,0 +1,40 @@
+"""
+Stand-in for the chat completions API used by `benchmark_serving`. Kept free
+of Django imports so uvicorn can load it without settings.
+"""
+import asyncio
+import json
+import os
+import time
+
+
+async def application(scope, receive, send):
+    """
+    ASGI app standing in for the chat completions API: answers every POST
+    after FAKE_UPSTREAM_DELAY seconds with a fixed Perplexity-style reply.
+    Serve it with `python -m uvicorn clinic_project.fake_upstream:application --lifespan off`.
+    """
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await asyncio.sleep(float(os.environ.get("FAKE_UPSTREAM_DELAY", "0.25")))
+
+    model = json.loads(body or b"{}").get("model", "sonar")
+    reply = {"role": "assistant", "content": "This is a benchmark reply."}
+    payload = json.dumps({
+        "id": "benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": reply, "delta": reply}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 5, "total_tokens": 6},
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+    })
+    await send({"type": "http.response.body", "body": payload})
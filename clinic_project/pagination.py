@@ -0,0 +1,149 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .serialization import list_data
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite, unique ordering.
+
+    The cursor carries the ordering values of the boundary row, so every page
+    is a `WHERE (a, b, id) < (...) ORDER BY a, b, id LIMIT n` and costs the
+    same no matter how deep the client has paged.
+
+    `?paginate=false` returns the old unpaginated list for clients that have
+    not moved over yet.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    legacy_query_param = "paginate"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.legacy_query_param, "").lower() in ("false", "0", "no"):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self._reversed_ordering() if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # -------------------- Cursor encoding --------------------
+    def encode_cursor(self, obj, reverse):
+        payload = {"p": [field.value_to_string(obj) for field in self.fields]}
+        if reverse:
+            payload["r"] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            raw = payload["p"]
+            if len(raw) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get("r"))
+
+    # -------------------- Query building --------------------
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering)
+
+    def _seek(self, ordering, position):
+        """
+        Rows strictly after `position` in `ordering`:
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        with `<` for descending columns.
+        """
+        condition = Q()
+        equal_prefix = Q()
+        for name, value in zip(ordering, position):
+            lookup = "lt" if name.startswith("-") else "gt"
+            column = name.lstrip("-")
+            condition |= equal_prefix & Q(**{f"{column}__{lookup}": value})
+            equal_prefix &= Q(**{column: value})
+        return condition
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    ordering = ("-created_at", "-id")
+
+
+class AppointmentCursorPagination(KeysetCursorPagination):
+    ordering = ("-appointment_date", "-appointment_time", "-id")
+
+
+def paginated_response(view, request, queryset, serializer_class, **serializer_kwargs):
+    """
+    Serialize one page of `queryset` with the view's `pagination_class`,
+    or the whole queryset when the client asked for the legacy format.
+    Normalized responses carry their `included` map next to the page.
+    """
+    paginator = view.pagination_class()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    if page is None:
+        return Response(list_data(request, queryset, serializer_class, **serializer_kwargs))
+    data = list_data(request, page, serializer_class, **serializer_kwargs)
+    if isinstance(data, dict):
+        response = paginator.get_paginated_response(data["results"])
+        response.data["included"] = data["included"]
+        return response
+    return paginator.get_paginated_response(data)
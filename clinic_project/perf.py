@@ -0,0 +1,220 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_perf", default=None)
+
+# Collapse what varies between executions of the "same" query so repeated
+# statements (the N in N+1) share one fingerprint.
+_IN_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql):
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _STRING.sub("?", sql)
+    return _NUMBER.sub("?", sql)
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class RequestPerf:
+    """Counters for one request; filled in by the DB wrapper and serializer timer."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated_queries(self, limit=5):
+        return [(sql, count) for sql, count in self.fingerprints.most_common(limit) if count > 1]
+
+
+# -------------------- Rolling stats --------------------
+class PerfStats:
+    """
+    In-process ring buffer of recent requests per URL name. Each worker
+    process keeps its own; figures are for the process that answers.
+    """
+    METRICS = ("total_ms", "db_ms", "serializer_ms", "queries")
+
+    def __init__(self, size=500):
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.size))
+
+    def record(self, name, **sample):
+        with self._lock:
+            self._samples[name].append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+
+        endpoints = {}
+        for name, samples in sorted(snapshot.items()):
+            row = {"count": len(samples)}
+            for metric in self.METRICS:
+                values = [sample[metric] for sample in samples]
+                row[metric] = {
+                    "p50": round(percentile(values, 0.50), 2),
+                    "p95": round(percentile(values, 0.95), 2),
+                    "p99": round(percentile(values, 0.99), 2),
+                    "max": round(max(values), 2),
+                }
+            endpoints[name] = row
+        return {"buffer_size": self.size, "endpoints": endpoints}
+
+
+stats = PerfStats(getattr(settings, "PERF_BUFFER_SIZE", 500))
+
+
+# -------------------- Query and serializer timing --------------------
+def _record_query(execute, sql, params, many, context):
+    perf = _current.get()
+    if perf is None:
+        return execute(sql, params, many, context)
+    return perf(execute, sql, params, many, context)
+
+
+def instrument_connections():
+    """
+    Route this thread's queries through whichever request is being measured
+    (found through a context variable, so it works for async views too).
+    """
+    for connection in connections.all():
+        if _record_query not in connection.execute_wrappers:
+            # First in line, so execute_wrapper() blocks still pop their own.
+            connection.execute_wrappers.insert(0, _record_query)
+
+
+
+def _timed_data(prop):
+    def data(serializer):
+        perf = _current.get()
+        if perf is None:
+            return prop.fget(serializer)
+        # Only the outermost .data counts; ListSerializer.data goes through it too.
+        perf.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return prop.fget(serializer)
+        finally:
+            perf.serializer_depth -= 1
+            if not perf.serializer_depth:
+                perf.serializer_ms += (time.perf_counter() - started) * 1000
+
+    data.__wrapped__ = prop
+    return property(data)
+
+
+def instrument_serializers():
+    """Time every `serializer.data` access made while a request is being measured."""
+    from rest_framework.serializers import BaseSerializer
+
+    if not hasattr(BaseSerializer.data.fget, "__wrapped__"):
+        BaseSerializer.data = _timed_data(BaseSerializer.data)
+
+
+# -------------------- Middleware --------------------
+class PerformanceMiddleware:
+    """
+    Measures each request: query count and time, time spent producing
+    serializer data (including the queries it triggers), and total latency.
+    Results go out as a Server-Timing header, into `stats` under the
+    resolved URL name, and to the log when the request was slow, together
+    with its most repeated SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 500)
+        instrument_serializers()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        instrument_connections()
+        perf, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf, started)
+
+    async def __acall__(self, request):
+        # Async views run their queries in the request's worker thread, whose
+        # connections are not the event loop thread's.
+        await sync_to_async(instrument_connections)()
+        perf, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf, started)
+
+    def start(self):
+        perf = RequestPerf()
+        return perf, _current.set(perf), time.perf_counter()
+
+    def finish(self, request, response, perf, started):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        name = (match.view_name if match else None) or "unresolved"
+        stats.record(
+            name,
+            total_ms=total_ms,
+            db_ms=perf.db_ms,
+            serializer_ms=perf.serializer_ms,
+            queries=perf.queries,
+        )
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={perf.db_ms:.1f};desc="{perf.queries} queries"',
+            f"serializer;dur={perf.serializer_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+        if total_ms >= self.slow_ms:
+            repeated = "".join(f"\n  {count}x {sql}" for sql, count in perf.repeated_queries())
+            logger.warning(
+                "Slow request %s %s (%s): %.0fms total, %d queries in %.0fms, serializers %.0fms%s",
+                request.method, request.path, name, total_ms, perf.queries, perf.db_ms, perf.serializer_ms,
+                f"\nMost repeated SQL:{repeated}" if repeated else "",
+            )
+        return response
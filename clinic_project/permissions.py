@@ -1,5 +1,4 @@
 from rest_framework.permissions import BasePermission
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
@@ -13,6 +12,10 @@ class IsDoctor(BasePermission):
     def has_permission(self, request, view):
         return bool(request.user and request.user.is_authenticated and request.user.role == "DOCTOR")
 
+class IsSuperAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.role == "SUPERADMIN")
+
 # Example object-level: ensure resource belongs to user's clinic
 class IsClinicOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -40,18 +43,8 @@ class RoleBasedPanelAccess(BasePermission):
         if not user or not user.is_authenticated:
             return False
 
-        # Extract "acting_as_role" from JWT (if available)
-        jwt_auth = JWTAuthentication()
-        header = jwt_auth.get_header(request)
-        if header:
-            raw_token = jwt_auth.get_raw_token(header)
-            validated_token = jwt_auth.get_validated_token(raw_token)
-            acting_as_role = validated_token.get("acting_as_role", None)
-        else:
-            acting_as_role = None
-
-        # Determine current role
-        current_role = acting_as_role or user.role.lower()
+        # Determine current role ("acting_as_role" from the validated token wins)
+        current_role = request.tenant.panel_role
 
         # Superadmin can access everything
         if current_role == "superadmin":
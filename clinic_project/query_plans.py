@@ -0,0 +1,68 @@
+import json
+import re
+from contextlib import contextmanager
+from django.db import connection, transaction
+
+
+# SQLite reports a full table walk as "SCAN <table>", optionally
+# "USING [COVERING] INDEX" when it walks an index to get the ordering.
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+@contextmanager
+def record_queries(using=connection):
+    """
+    Collect the raw (sql, params) of every SELECT run inside the block, so the
+    statements can be explained afterwards with their real parameters.
+    """
+    queries = []
+
+    def recorder(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(recorder):
+        yield queries
+
+
+def explain(sql, params=(), using=connection):
+    """
+    Plan lines for one statement. On PostgreSQL sequential scans are
+    disabled for the duration, so a Seq Scan in the plan means no index
+    could serve the query at all, not that the table was too small to bother.
+    """
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        if using.vendor == "postgresql":
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            return list(_postgres_nodes(_json(cursor.fetchone()[0])[0]["Plan"]))
+        if using.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return [" ".join(str(value) for value in row) for row in cursor.fetchall()]
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _postgres_nodes(node):
+    relation = node.get("Relation Name")
+    yield f"{node['Node Type']} {relation}" if relation else node["Node Type"]
+    for child in node.get("Plans", []):
+        yield from _postgres_nodes(child)
+
+
+def sequential_scans(plan, tables):
+    """The tables from `tables` that `plan` (from `explain`) reads end to end."""
+    scanned = set()
+    for line in plan:
+        if line.startswith("Seq Scan "):
+            scanned.add(line.split(" ", 2)[2])
+        else:
+            match = SQLITE_SCAN.match(line)
+            if match:
+                scanned.add(match.group(1))
+    return scanned & set(tables)
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+# -------------------- Providers --------------------
+class SecretProvider:
+    """One place secrets can come from. `get` returns None when it has no value."""
+
+    def get(self, name):
+        raise NotImplementedError
+
+
+class EnvSecretProvider(SecretProvider):
+    """Process environment, including anything load_dotenv() read from .env."""
+
+    def get(self, name):
+        return os.environ.get(name) or None
+
+
+class FileSecretProvider(SecretProvider):
+    """
+    One file per secret in SECRETS_DIR (Docker / Kubernetes secret mounts),
+    e.g. $SECRETS_DIR/PERPLEXITY_API_KEY.
+    """
+
+    def __init__(self):
+        directory = getattr(settings, "SECRETS_DIR", None)
+        self.directory = Path(directory) if directory else None
+
+    def get(self, name):
+        if self.directory is None:
+            return None
+        try:
+            return (self.directory / name).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+
+class SSMSecretProvider(SecretProvider):
+    """AWS SSM Parameter Store, as SSM_PARAMETER_PREFIX + name (decrypted)."""
+
+    def __init__(self):
+        self.prefix = getattr(settings, "SSM_PARAMETER_PREFIX", "/clinic/")
+        self.region = getattr(settings, "AWS_REGION", None)
+
+    def get(self, name):
+        client = _ssm_client(self.region)
+        try:
+            response = client.get_parameter(Name=f"{self.prefix}{name}", WithDecryption=True)
+        except client.exceptions.ParameterNotFound:
+            return None
+        return response["Parameter"]["Value"]
+
+
+@lru_cache(maxsize=None)
+def _ssm_client(region):
+    # boto3 is only imported (and a client built) once an SSM lookup happens.
+    import boto3
+
+    return boto3.client("ssm", region_name=region)
+
+
+@lru_cache(maxsize=1)
+def get_providers():
+    return [import_string(path)() for path in settings.SECRET_PROVIDERS]
+
+
+# -------------------- Lookup --------------------
+class SecretCache:
+    """In-process cache of resolved secrets; each value expires after `ttl` seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, name):
+        with self._lock:
+            value, expires_at = self._values.get(name, (_MISSING, 0))
+        return value if time.monotonic() < expires_at else _MISSING
+
+    def set(self, name, value, ttl):
+        with self._lock:
+            self._values[name] = (value, time.monotonic() + ttl)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+cache = SecretCache()
+
+
+def get_secret(name, default=_MISSING):
+    """
+    Resolve `name` from the first SECRET_PROVIDERS entry that has it, on first
+    use rather than at import. Values are cached for SECRET_CACHE_TTL seconds
+    so rotated secrets are picked up without a restart. Raises
+    ImproperlyConfigured when no provider has it and no default is given.
+    """
+    value = cache.get(name)
+    if value is not _MISSING:
+        return value
+
+    for provider in get_providers():
+        value = provider.get(name)
+        if value is not None:
+            cache.set(name, value, getattr(settings, "SECRET_CACHE_TTL", 300))
+            return value
+
+    if default is _MISSING:
+        raise ImproperlyConfigured(f"{name} is missing")
+    return default
+
+
+def clear_secret_cache():
+    cache.clear()
+    get_providers.cache_clear()
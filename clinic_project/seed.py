@@ -0,0 +1,379 @@
+import random
+import secrets
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from admin_panel.models import Clinic
+from billing.models import (
+    ClinicBill, ClinicBillItem, LabBill, MaterialPurchaseBill, MaterialPurchaseItem, Medicine,
+    PharmacyBill, PharmacyBillItem, Procedure, StockMovement,
+)
+from clinic_panel.models import Appointment, Doctor, DocumentSequence, Patient
+from clinic_panel.stats import rebuild_clinic_stats
+from doctor_panel.clinical import rebuild_clinical_snapshots
+from doctor_panel.models import Consultation, Prescription
+
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Akhil", "Anjali", "Arjun", "Deepa", "Farhan", "Gayathri", "Hari", "Isha",
+    "Jithin", "Kavya", "Lakshmi", "Manu", "Meera", "Nikhil", "Nisha", "Pranav", "Priya", "Rahul",
+    "Reshma", "Sanjay", "Sneha", "Suresh", "Tara", "Vikram", "Vishnu", "Zara",
+]
+LAST_NAMES = [
+    "Menon", "Nair", "Pillai", "Kurian", "Thomas", "Joseph", "Varghese", "Iyer", "Rao", "Khan",
+    "Sharma", "Das", "Reddy", "George", "Mathew", "Krishnan",
+]
+SPECIALIZATIONS = ["General Medicine", "Pediatrics", "Dermatology", "Orthopedics", "ENT", "Dentistry"]
+COMPLAINTS = [
+    "Fever for 3 days", "Dry cough", "Headache", "Lower back pain", "Sore throat", "Skin rash",
+    "Toothache", "Joint pain", "Fatigue", "Abdominal pain",
+]
+DIAGNOSES = [
+    "Viral fever", "Upper respiratory tract infection", "Migraine", "Lumbar strain", "Pharyngitis",
+    "Contact dermatitis", "Dental caries", "Osteoarthritis", "Iron deficiency anaemia", "Gastritis",
+]
+ADVICES = [
+    "Plenty of fluids and rest", "Avoid cold food", "Hot fomentation twice daily",
+    "Review after one week", "Soft diet", "Regular exercise",
+]
+INVESTIGATIONS = ['["CBC"]', '["CBC", "ESR"]', '["X-ray"]', '["Blood sugar"]', '["Lipid profile"]']
+ALLERGIES = ["Penicillin", "Sulfa drugs", "Peanuts", "Dust"]
+MEDICINES = [
+    ("Paracetamol", "500mg", "2.00"), ("Amoxicillin", "250mg", "6.50"), ("Cetirizine", "10mg", "1.50"),
+    ("Ibuprofen", "400mg", "3.00"), ("Pantoprazole", "40mg", "4.50"), ("Azithromycin", "500mg", "12.00"),
+    ("Metformin", "500mg", "2.50"), ("Vitamin D3", "60000IU", "25.00"),
+]
+PROCEDURES = [
+    ("Dressing", "150.00"), ("Nebulisation", "200.00"), ("Scaling", "800.00"), ("Suturing", "500.00"),
+    ("ECG", "300.00"), ("Injection", "50.00"),
+]
+LABS = ["City Diagnostics", "MedLab", "Precision Labs"]
+SUPPLIERS = ["Medico Distributors", "HealthCare Supplies", "Prime Pharma"]
+VENDORS = ["Power utility", "Cleaning services", "Office supplies", "Equipment service"]
+
+VISITS_PER_PATIENT_YEAR = 3
+BATCH_SIZE = 1000
+
+
+def _insert(model, objs):
+    """
+    bulk_create that keeps the historical `created_at` given to each row,
+    even on models where the field is auto_now_add.
+    """
+    if not objs:
+        return objs
+    field = next((f for f in model._meta.concrete_fields if f.name == "created_at"), None)
+    stamps = [obj.created_at for obj in objs] if field is not None and field.auto_now_add else None
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    if stamps and None not in stamps:
+        for obj, stamp in zip(objs, stamps):
+            obj.created_at = stamp
+        model.objects.bulk_update(objs, ["created_at"], batch_size=BATCH_SIZE)
+    return objs
+
+
+def _numbers(document_type, count, clinic_id=None, start=1):
+    """Claim `count` consecutive document numbers in one UPDATE."""
+    if not count:
+        return []
+    last = DocumentSequence.next_value(document_type, clinic_id=clinic_id, start=start, count=count)
+    return range(last - count + 1, last + 1)
+
+
+class ClinicSeeder:
+    """
+    Generates realistic multi-year data for load testing: clinics with
+    doctors, patients, appointment history, consultations, prescriptions and
+    all four bill types. Everything is bulk inserted; document numbers come
+    from DocumentSequence blocks, and ClinicStats / PatientClinicalSnapshot
+    are rebuilt at the end since bulk inserts skip their receivers.
+    """
+
+    def __init__(self, patients_per_clinic=200, years=2, doctors_per_clinic=5, seed=None, password="password"):
+        self.patients_per_clinic = patients_per_clinic
+        self.years = years
+        self.doctors_per_clinic = doctors_per_clinic
+        self.rng = random.Random(seed)
+        self.password = make_password(password)
+        self.tag = secrets.token_hex(3)
+        self.now = timezone.now()
+        self.counts = Counter()
+
+    def seed(self, clinics):
+        clinic_ids, patient_ids = [], []
+        for index in range(clinics):
+            with transaction.atomic():
+                clinic, patients = self.seed_clinic(index)
+            clinic_ids.append(clinic.pk)
+            patient_ids.extend(patient.pk for patient in patients)
+
+        rebuild_clinic_stats(clinic_ids)
+        rebuild_clinical_snapshots(patient_ids)
+        return dict(self.counts)
+
+    # -------------------- Helpers --------------------
+    def moment(self, day):
+        slot = time(9 + self.rng.randrange(9), self.rng.choice([0, 15, 30, 45]))
+        return timezone.make_aware(datetime.combine(day, slot))
+
+    def past_day(self):
+        return (self.now - timedelta(days=self.rng.randrange(365 * self.years))).date()
+
+    def name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def add(self, model, objs):
+        _insert(model, objs)
+        self.counts[model.__name__] += len(objs)
+        return objs
+
+    # -------------------- Per clinic --------------------
+    def seed_clinic(self, index):
+        rng = self.rng
+        username = f"seed_{self.tag}_clinic{index}"
+        user = self.add(User, [User(username=username, password=self.password, role="CLINIC")])[0]
+        clinic = self.add(Clinic, [Clinic(
+            user=user,
+            name=f"{rng.choice(LAST_NAMES)} Family Clinic {index + 1}",
+            email=f"{username}@example.com",
+            phone_number=f"+91{rng.randrange(10 ** 9, 10 ** 10)}",
+            address=f"{rng.randrange(1, 200)} Main Road",
+            created_at=self.now - timedelta(days=365 * self.years),
+        )])[0]
+
+        doctor_users = self.add(User, [
+            User(username=f"{username}_doc{i}", password=self.password, role="DOCTOR")
+            for i in range(self.doctors_per_clinic)
+        ])
+        doctors = self.add(Doctor, [
+            Doctor(
+                clinic=clinic, user=doctor_user, name="Dr {} {}".format(*self.name()),
+                username=doctor_user.username, specialization=rng.choice(SPECIALIZATIONS),
+                years_of_experience=rng.randrange(1, 30),
+            )
+            for doctor_user in doctor_users
+        ])
+        medicines = self.add(Medicine, [
+            Medicine(clinic=clinic, name=name, dosage=dosage, unit_price=Decimal(price), stock=100000)
+            for name, dosage, price in MEDICINES
+        ])
+        procedures = self.add(Procedure, [
+            Procedure(clinic=clinic, name=name, price=Decimal(price)) for name, price in PROCEDURES
+        ])
+
+        patients = self.seed_patients(clinic)
+        self.seed_visits(clinic, doctors, patients, medicines, procedures)
+        self.seed_clinic_bills(clinic)
+        return clinic, patients
+
+    def seed_patients(self, clinic):
+        rng = self.rng
+        numbers = _numbers(
+            DocumentSequence.PATIENT_FILE, self.patients_per_clinic,
+            clinic_id=clinic.pk, start=clinic.file_number_start,
+        )
+        patients = []
+        for number in numbers:
+            first_name, last_name = self.name()
+            patients.append(Patient(
+                clinic=clinic,
+                first_name=first_name,
+                last_name=last_name,
+                phone_number=f"+91{rng.randrange(10 ** 9, 10 ** 10)}",
+                address=f"{rng.randrange(1, 500)} {rng.choice(LAST_NAMES)} Street",
+                gender=rng.choice("MF"),
+                dob=(self.now - timedelta(days=rng.randrange(365, 365 * 80))).date(),
+                blood_group=rng.choice(Patient.BLOOD_GROUP_CHOICES)[0],
+                file_number=f"CL{clinic.pk}-P-{number:05d}",
+                created_at=self.moment(self.past_day()),
+            ))
+        return self.add(Patient, patients)
+
+    def seed_visits(self, clinic, doctors, patients, medicines, procedures):
+        rng = self.rng
+        appointments = []
+        for patient in patients:
+            visits = max(1, round(rng.gauss(VISITS_PER_PATIENT_YEAR * self.years, 2)))
+            for _ in range(visits):
+                day = self.past_day()
+                status = "CANCELLED" if rng.random() < 0.15 else "COMPLETED"
+                appointments.append(Appointment(
+                    clinic=clinic, patient=patient, doctor=rng.choice(doctors),
+                    appointment_date=day, appointment_time=self.moment(day).time(), status=status,
+                    reason=rng.choice(COMPLAINTS), created_at=self.moment(day) - timedelta(days=2),
+                ))
+            if rng.random() < 0.2:
+                day = (self.now + timedelta(days=rng.randrange(1, 30))).date()
+                appointments.append(Appointment(
+                    clinic=clinic, patient=patient, doctor=rng.choice(doctors),
+                    appointment_date=day, appointment_time=self.moment(day).time(),
+                    reason=rng.choice(COMPLAINTS), created_at=self.now,
+                ))
+
+        for appointment, number in zip(appointments, _numbers(DocumentSequence.APPOINTMENT, len(appointments))):
+            appointment.appointment_id = f"APT-{number:06d}"
+        self.add(Appointment, appointments)
+
+        consultations = [
+            Consultation(
+                doctor=appointment.doctor,
+                patient=appointment.patient,
+                appointment=appointment,
+                created_at=timezone.make_aware(datetime.combine(appointment.appointment_date, appointment.appointment_time)),
+                complaints=rng.choice(COMPLAINTS),
+                diagnosis=rng.choice(DIAGNOSES),
+                advices=rng.choice(ADVICES),
+                investigations=rng.choice(INVESTIGATIONS) if rng.random() < 0.4 else None,
+                allergies=rng.choice(ALLERGIES) if rng.random() < 0.1 else None,
+                temperature=f"{rng.uniform(97, 102):.1f}",
+                pulse=str(rng.randrange(60, 110)),
+                spo2=str(rng.randrange(94, 100)),
+                weight=str(rng.randrange(10, 95)),
+                blood_pressure=f"{rng.randrange(100, 150)}/{rng.randrange(60, 95)}",
+            )
+            for appointment in appointments if appointment.status == "COMPLETED"
+        ]
+        self.add(Consultation, consultations)
+
+        prescriptions = []
+        for consultation in consultations:
+            for _ in range(rng.randrange(4)):
+                prescriptions.append(Prescription(
+                    consultation=consultation,
+                    medicine_name=rng.choice(MEDICINES)[0],
+                    dosage="1 tablet",
+                    frequency=rng.choice(Prescription.FREQUENCY_CHOICES)[0],
+                    duration=f"{rng.randrange(3, 15)} days",
+                    timings=rng.choice(Prescription.TIMING_CHOICES)[0],
+                    created_at=consultation.created_at,
+                ))
+        self.add(Prescription, prescriptions)
+
+        self.seed_patient_bills(clinic, consultations, medicines, procedures)
+
+    def seed_patient_bills(self, clinic, consultations, medicines, procedures):
+        rng = self.rng
+        billed = [c for c in consultations if rng.random() < 0.6]
+        bills = [
+            PharmacyBill(
+                clinic=clinic, patient=c.patient, bill_date=c.created_at.date(),
+                status=rng.choice(["PAID", "PAID", "PAID", "PENDING"]), created_at=c.created_at,
+            )
+            for c in billed
+        ]
+        for bill, number in zip(bills, _numbers(DocumentSequence.PHARMACY_BILL, len(bills))):
+            bill.bill_number = f"PB-{number:05d}"
+        self.add(PharmacyBill, bills)
+
+        items = []
+        for bill in bills:
+            rows = [
+                PharmacyBillItem(
+                    bill=bill, item_type="MEDICINE", medicine=rng.choice(medicines), quantity=rng.randrange(1, 15),
+                )
+                if rng.random() < 0.8 else
+                PharmacyBillItem(bill=bill, item_type="PROCEDURE", procedure=rng.choice(procedures))
+                for _ in range(rng.randrange(1, 4))
+            ]
+            for row in rows:
+                row.prepare()
+            bill.total_amount = sum(row.subtotal for row in rows)
+            items.extend(rows)
+        self.add(PharmacyBillItem, items)
+        PharmacyBill.objects.bulk_update(bills, ["total_amount"], batch_size=BATCH_SIZE)
+
+        # Record the sales in the stock ledger and take them off the shelf
+        sales = [
+            StockMovement(
+                medicine=item.medicine, bill_item=item, quantity=-item.quantity,
+                reason=StockMovement.SALE, reference=item.bill.bill_number,
+            )
+            for item in items if item.item_type == "MEDICINE"
+        ]
+        self.add(StockMovement, sales)
+        sold = Counter()
+        for movement in sales:
+            sold[movement.medicine] -= movement.quantity
+        for medicine, quantity in sold.items():
+            medicine.stock -= quantity
+        Medicine.objects.bulk_update(list(sold), ["stock"], batch_size=BATCH_SIZE)
+
+        lab_bills = []
+        for c in consultations:
+            if rng.random() >= 0.1:
+                continue
+            lab_cost = Decimal(rng.randrange(200, 2000))
+            lab_bills.append(LabBill(
+                clinic=clinic, patient=c.patient, doctor=c.doctor,
+                file_number=c.patient.file_number, patient_name=f"{c.patient.first_name} {c.patient.last_name}",
+                lab_name=rng.choice(LABS), work_description=rng.choice(INVESTIGATIONS),
+                lab_cost=lab_cost, clinic_cost=lab_cost / 4, total_amount=lab_cost + lab_cost / 4,
+                date=c.created_at.date(), bill_date=c.created_at.date(), created_at=c.created_at,
+                status=rng.choice(["PAID", "PENDING"]),
+            ))
+        for bill, number in zip(lab_bills, _numbers(DocumentSequence.LAB_BILL, len(lab_bills))):
+            bill.bill_number = f"LB-{number:05d}"
+            bill.invoice_number = f"INV-{self.tag}-{bill.bill_number}"
+        self.add(LabBill, lab_bills)
+
+    def seed_clinic_bills(self, clinic):
+        """Supplier purchases (about two a month) and running costs (one a month)."""
+        rng = self.rng
+        months = 12 * self.years
+
+        purchases = [
+            MaterialPurchaseBill(
+                clinic=clinic, supplier_name=rng.choice(SUPPLIERS), invoice_number=f"SUP-{rng.randrange(10 ** 6)}",
+                created_at=self.moment(self.past_day()), status="PAID",
+            )
+            for _ in range(2 * months)
+        ]
+        for bill, number in zip(purchases, _numbers(DocumentSequence.MATERIAL_PURCHASE_BILL, len(purchases))):
+            bill.bill_number = f"MPB-{number:05d}"
+            bill.bill_date = bill.created_at.date()
+        self.add(MaterialPurchaseBill, purchases)
+
+        running_costs = [
+            ClinicBill(clinic=clinic, vendor_name=rng.choice(VENDORS), created_at=self.moment(self.past_day()), status="PAID")
+            for _ in range(months)
+        ]
+        for bill, number in zip(running_costs, _numbers(DocumentSequence.CLINIC_BILL, len(running_costs))):
+            bill.bill_number = f"CB-{number:05d}"
+            bill.bill_date = bill.created_at.date()
+        self.add(ClinicBill, running_costs)
+
+        purchase_items = []
+        for bill in purchases:
+            rows = [
+                MaterialPurchaseItem(
+                    bill=bill, item_name=rng.choice(MEDICINES)[0], quantity=rng.randrange(10, 200),
+                    unit_price=Decimal(rng.choice(MEDICINES)[2]),
+                )
+                for _ in range(rng.randrange(1, 5))
+            ]
+            for row in rows:
+                row.prepare()
+            bill.total_amount = sum(row.subtotal for row in rows)
+            purchase_items.extend(rows)
+        self.add(MaterialPurchaseItem, purchase_items)
+
+        cost_items = []
+        for bill in running_costs:
+            rows = [
+                ClinicBillItem(
+                    bill=bill, item_name=bill.vendor_name, quantity=1, unit_price=Decimal(rng.randrange(500, 20000)),
+                )
+                for _ in range(rng.randrange(1, 3))
+            ]
+            for row in rows:
+                row.prepare()
+            bill.total_amount = sum(row.subtotal for row in rows)
+            cost_items.extend(rows)
+        self.add(ClinicBillItem, cost_items)
+
+        MaterialPurchaseBill.objects.bulk_update(purchases, ["total_amount"], batch_size=BATCH_SIZE)
+        ClinicBill.objects.bulk_update(running_costs, ["total_amount"], batch_size=BATCH_SIZE)
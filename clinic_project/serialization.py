@@ -0,0 +1,289 @@
+import functools
+from collections import defaultdict
+from typing import NamedTuple
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from .tenant import request_cache
+
+VIEW_QUERY_PARAM = "view"
+COMPACT_VIEW = "compact"
+FIELDS_QUERY_PARAM = "fields"
+OMIT_QUERY_PARAM = "omit"
+NORMALIZED_FORMAT = "normalized"
+IDENTITY_MAP = "identity_map"
+
+
+def _is_top_level(serializer):
+    """The serializer renders the response's rows (or its one object)."""
+    parent = serializer.parent
+    return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+
+@functools.cache
+def field_reads(serializer_class):
+    """
+    {readable field: model attributes its output reads}, None for fields
+    that may read anything (method fields not listed in `field_requires`).
+    """
+    requires = getattr(serializer_class, "field_requires", {})
+    reads = {}
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if name in requires:
+            reads[name] = set(requires[name])
+        elif field.source == "*":
+            reads[name] = None
+        else:
+            reads[name] = {field.source.split(".")[0]}
+    return reads
+
+
+class EagerLoadingMixin:
+    """
+    Serializer that declares the relations its output reads, so list views
+    can load them up front (`setup_queryset`) instead of once per row.
+    Method fields list what they read in `field_requires`, which lets a
+    sparse fieldset skip whatever only the dropped fields needed.
+    """
+    select_related = ()
+    prefetch_related = ()
+    field_requires = {}
+
+    @classmethod
+    def setup_queryset(cls, queryset, normalized=False, fields=None):
+        skipped, deferred, through = set(), set(), []
+        if normalized:
+            # Side-loaded relations are fetched by id afterwards (see
+            # `normalize`), not joined to every row; only the relations an
+            # id is read through (the doctor of "doctor.clinic_id") are.
+            side_loaded = getattr(cls, "side_loaded", {})
+            skipped |= set(side_loaded)
+            through = [
+                "__".join(ref.source.split(".")[:-1]) for name, ref in side_loaded.items()
+                if ref.source and "." in ref.source and (fields is None or name in fields)
+            ]
+        if fields is not None:
+            unread = cls.unread_by(fields)
+            skipped |= unread
+            deferred = unread & {
+                field.name for field in cls.Meta.model._meta.concrete_fields
+                if not field.primary_key and not field.is_relation
+            }
+        select_related = [name for name in cls.select_related if name.split("__")[0] not in skipped]
+        select_related += [name for name in dict.fromkeys(through) if name not in select_related]
+        prefetch_related = [name for name in cls.prefetch_related if name.split("__")[0] not in skipped]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    @classmethod
+    def unread_by(cls, fields):
+        """
+        Model attributes (columns and relations) only fields outside
+        `fields` read; nothing when a kept field might read anything.
+        """
+        reads = field_reads(cls)
+        kept = [reads[name] for name in reads if name in fields]
+        if any(read is None for read in kept):
+            return set()
+        needed = set().union(*kept)
+        dropped = [read for name, read in reads.items() if name not in fields and read]
+        return set().union(*dropped) - needed
+
+
+# -------------------- Sparse fieldsets (?fields= / ?omit=) --------------------
+def _names(value):
+    return {name.strip() for name in value.split(",") if name.strip()} if value else set()
+
+
+def sparse_fieldset(request, names):
+    """
+    Which of `names` a read asked for with ?fields=a,b and/or ?omit=c, or
+    None when it used neither. Unknown names are ignored.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = _names(request.query_params.get(FIELDS_QUERY_PARAM))
+    omit = _names(request.query_params.get(OMIT_QUERY_PARAM))
+    if not fields and not omit:
+        return None
+    return {name for name in names if (not fields or name in fields) and name not in omit}
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer whose top-level output the client can cut down with
+    ?fields= / ?omit= (comma-separated field names); nested serializers
+    still render in full. Needs the request in its context, which
+    `list_data` / `paginated_response` pass.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if _is_top_level(self):
+            readable = [name for name, field in fields.items() if not field.write_only]
+            keep = sparse_fieldset(self.context.get("request"), readable)
+            if keep is not None:
+                fields = {name: field for name, field in fields.items() if name in keep or field.write_only}
+        return fields
+
+
+def requested_fields(request, serializer_class):
+    """The sparse fieldset of a SparseFieldsetMixin serializer, or None."""
+    if not issubclass(serializer_class, SparseFieldsetMixin):
+        return None
+    return sparse_fieldset(request, field_reads(serializer_class))
+
+
+def nested_loading(prefix, serializer_class):
+    """
+    (select_related, prefetch_related) of an EagerLoadingMixin serializer
+    used as a nested field at `prefix`, for the parent serializer to declare.
+    """
+    return (
+        tuple(f"{prefix}__{name}" for name in serializer_class.select_related),
+        tuple(f"{prefix}__{name}" for name in serializer_class.prefetch_related),
+    )
+
+
+def is_compact(request):
+    return request.query_params.get(VIEW_QUERY_PARAM) == COMPACT_VIEW
+
+
+def is_normalized(request):
+    renderer = getattr(request, "accepted_renderer", None)
+    return getattr(renderer, "format", None) == NORMALIZED_FORMAT
+
+
+def list_serializer(request, queryset, serializer_class, compact_class=None):
+    """
+    (queryset, serializer class) for a list endpoint: `compact_class` when
+    the client asked for `?view=compact` (id/name references instead of
+    nested objects), `serializer_class` otherwise, with the queryset set up
+    for the relations the chosen serializer reads (only those of the
+    requested fields, for a sparse fieldset).
+    """
+    chosen = compact_class if compact_class and is_compact(request) else serializer_class
+    if hasattr(chosen, "setup_queryset"):
+        queryset = chosen.setup_queryset(
+            queryset, normalized=is_normalized(request), fields=requested_fields(request, chosen),
+        )
+    return queryset, chosen
+
+
+def list_data(request, instances, serializer_class, **serializer_kwargs):
+    """
+    Response data for a list of `instances`, normalized if the client
+    asked; the serializer gets the request in its context, and the
+    request's identity map (shared by the sub-requests of a batch).
+    """
+    serializer_kwargs["context"] = {
+        "request": request,
+        IDENTITY_MAP: request_cache(request).setdefault(IDENTITY_MAP, {}),
+        **serializer_kwargs.get("context", {}),
+    }
+    if is_normalized(request):
+        return normalize(instances, serializer_class, **serializer_kwargs)
+    return serializer_class(instances, many=True, **serializer_kwargs).data
+
+
+# -------------------- Normalized format (?format=normalized) --------------------
+class NormalizedJSONRenderer(JSONRenderer):
+    """
+    Plain JSON, registered under its own format so content negotiation
+    accepts ?format=normalized; list views then shape the data with
+    `normalize`.
+    """
+    format = NORMALIZED_FORMAT
+
+
+class SideLoaded(NamedTuple):
+    """
+    Related entity a serializer moves out of its rows in the normalized
+    format: rows keep its id, read from `source` (`<field>_id` by default),
+    and the entity itself is rendered once with `serializer_class` under
+    included[key].
+    """
+    key: str
+    serializer_class: type
+    source: str = None
+
+
+def _resolve(instance, source):
+    for attr in source.split("."):
+        if instance is None:
+            return None
+        instance = getattr(instance, attr)
+    return instance
+
+
+def normalize(instances, serializer_class, **serializer_kwargs):
+    """
+    {"results": rows, "included": {key: {id: entity}}}: the fields the
+    serializer declares in `side_loaded` are ids in the rows, and every
+    entity they reference is loaded with one query per key and rendered
+    once.
+    """
+    instances = list(instances)
+    serializer = serializer_class(instances, many=True, **serializer_kwargs)
+    fields = serializer.child.fields
+    side_loaded = {
+        name: ref for name, ref in getattr(serializer_class, "side_loaded", {}).items() if name in fields
+    }
+    for name in side_loaded:
+        fields.pop(name)
+    rows = serializer.data
+
+    ids = defaultdict(set)
+    for row, instance in zip(rows, instances):
+        for name, ref in side_loaded.items():
+            pk = _resolve(instance, ref.source or f"{name}_id")
+            row[name] = pk
+            if pk is not None:
+                ids[ref.key].add(pk)
+
+    included = {}
+    for ref in {ref.key: ref for ref in side_loaded.values()}.values():
+        entity_class = ref.serializer_class
+        queryset = entity_class.Meta.model.objects.filter(pk__in=ids[ref.key])
+        if hasattr(entity_class, "setup_queryset"):
+            queryset = entity_class.setup_queryset(queryset)
+        entities = entity_class(queryset, many=True, context=serializer.context).data
+        included[ref.key] = {str(entity["id"]): entity for entity in entities}
+    return {"results": rows, "included": included}
+
+
+# -------------------- Identity map --------------------
+def render_once(context, kind, instance, render):
+    """
+    `render()` for the first reference to `instance` as `kind` in a
+    response, the same output for every later one. The memo lives in the
+    serializer context, which is created per response (per batch, for
+    list_data), so nothing outlives the response it was rendered for.
+    """
+    memo = context.setdefault(IDENTITY_MAP, {})
+    key = (kind, instance.pk)
+    if key not in memo:
+        memo[key] = render()
+    return memo[key]
+
+
+class IdentityMapMixin:
+    """
+    Serializer that, when nested, renders each instance once per response:
+    the clinic shared by 500 appointments (or reached again through a
+    doctor) is serialized the first time and reused after that. Top-level
+    rows and unsaved instances are rendered as usual.
+    """
+
+    def to_representation(self, instance):
+        if _is_top_level(self) or instance.pk is None:
+            return super().to_representation(instance)
+        render = super().to_representation
+        return render_once(self.context, type(self), instance, lambda: render(instance))
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from .benchmark import git_revision
+from .perf import percentile
+
+
+# How each deployment is started (see Hosting.md for the production units).
+SERVERS = {
+    "wsgi": ["-m", "gunicorn", "clinic_project.wsgi:application"],
+    "asgi": ["-m", "gunicorn", "clinic_project.asgi:application", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+# -------------------- Processes --------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def start(args, port, env):
+    process = subprocess.Popen(
+        [sys.executable, *args], cwd=settings.BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, process)
+    except Exception:
+        stop(process)
+        raise
+    return process
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# -------------------- Load --------------------
+async def fire(url, token, requests, concurrency):
+    """POST `requests` distinct chat prompts, at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, statuses = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=120) as client:
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    # Distinct prompts so the reply cache never answers.
+                    response = await client.post(url, json={"message": f"Benchmark question {i}"})
+                    statuses.append(response.status_code)
+                except httpx.HTTPError:
+                    statuses.append(None)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    ok = statuses.count(200)
+    return {
+        "ok": ok,
+        "errors": len(statuses) - ok,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(ok / elapsed, 2),
+        "p50_ms": round(percentile(timings, 0.50), 1),
+        "p95_ms": round(percentile(timings, 0.95), 1),
+        "mean_ms": round(statistics.fmean(timings), 1),
+    }
+
+
+class ServingBenchmark:
+    """
+    Compares the sync (gunicorn) and async (gunicorn + uvicorn workers)
+    deployments on the chat endpoint, with the same number of worker
+    processes and a local fake upstream that takes `upstream_delay` seconds
+    per completion. Sync workers hold a process per request for that whole
+    wait; async workers keep accepting requests meanwhile.
+    """
+
+    def __init__(self, workers=2, concurrency=20, requests=100, upstream_delay=0.25):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.requests = requests
+        self.upstream_delay = upstream_delay
+
+    def token(self):
+        user, _ = User.objects.get_or_create(username="benchmark_chat", defaults={"role": "DOCTOR"})
+        return str(RefreshToken.for_user(user).access_token)
+
+    def run(self, modes=("wsgi", "asgi"), progress=None):
+        token = self.token()
+        upstream_port = free_port()
+        env = {
+            **os.environ,
+            "FAKE_UPSTREAM_DELAY": str(self.upstream_delay),
+            "CHAT_API_BASE_URL": f"http://127.0.0.1:{upstream_port}",
+            "PERPLEXITY_API_KEY": "benchmark",
+        }
+        upstream = start(
+            ["-m", "uvicorn", "clinic_project.fake_upstream:application",
+             "--port", str(upstream_port), "--lifespan", "off", "--log-level", "warning"],
+            upstream_port, env,
+        )
+        results = {}
+        try:
+            for mode in modes:
+                port = free_port()
+                server = start(
+                    [*SERVERS[mode], "--workers", str(self.workers), "--bind", f"127.0.0.1:{port}"],
+                    port, env,
+                )
+                try:
+                    results[mode] = asyncio.run(
+                        fire(f"http://127.0.0.1:{port}/api/chat/", token, self.requests, self.concurrency)
+                    )
+                finally:
+                    stop(server)
+                if progress:
+                    progress(mode, results[mode])
+        finally:
+            stop(upstream)
+
+        report = {
+            "revision": git_revision(),
+            "generated_at": timezone.now().isoformat(),
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "upstream_delay_ms": round(self.upstream_delay * 1000),
+            "results": results,
+        }
+        if results.get("wsgi", {}).get("requests_per_second") and "asgi" in results:
+            report["asgi_speedup"] = round(
+                results["asgi"]["requests_per_second"] / results["wsgi"]["requests_per_second"], 2
+            )
+        return report
@@ -10,7 +10,6 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
-import boto3
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -50,6 +49,7 @@ INSTALLED_APPS = [
 
     "corsheaders",
     "rest_framework",
+    "adrf",
     "drf_yasg",
     "rest_framework.authtoken",
     "rest_framework_simplejwt.token_blacklist",
@@ -64,15 +64,22 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'clinic_project.perf.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'clinic_project.tenant.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request instrumentation (clinic_project.perf): samples kept per URL name
+# for /api/admin-panel/perf/, and the latency above which a request is logged.
+PERF_BUFFER_SIZE = 500
+PERF_SLOW_REQUEST_MS = 500
+
 ROOT_URLCONF = 'clinic_project.urls'
 
 AUTH_USER_MODEL = "accounts.User"
@@ -106,16 +113,57 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    # ?format=normalized: list endpoints side-load related entities (see
+    # clinic_project/serialization.py); everything else renders plain JSON.
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "clinic_project.serialization.NormalizedJSONRenderer",
+    ],
 }
 
+# /api/batch/ (clinic_project.batch): most sub-requests one batch may carry.
+BATCH_MAX_REQUESTS = 20
+
 
 # Cache (dev: locmem, prod: redis)
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
-    }
+    },
+    # Chat reply cache for a single process (dev, tests): least recently used
+    # replies are culled past MAX_ENTRIES.
+    "chat": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "chat-replies",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
 }
+# Redis shared by every worker process, for what must stay consistent across
+# them (set REDIS_URL in production).
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES["shared"] = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# request.tenant (clinic_project.tenant): users' clinic / doctor profiles are
+# cached here for TENANT_CACHE_TTL seconds, or until a clinic or doctor
+# changes. Invalidation only reaches the workers sharing the cache, so this
+# must not be a per-process (locmem) cache; None resolves profiles once per
+# request instead.
+TENANT_CACHE_ALIAS = "shared" if REDIS_URL else None
+TENANT_CACHE_TTL = 300
+
+# Delta sync (clinic_panel.sync): seconds the ?updated_since= watermark trails
+# the clock, so rows saved by transactions still open during a sync are sent
+# again next time, and days deletions are remembered (clients whose watermark
+# is older get a full reset).
+SYNC_WATERMARK_LAG = 10
+SYNC_TOMBSTONE_DAYS = 30
 
 # Simple JWT settings (optional tweaks)
 from datetime import timedelta
@@ -206,25 +254,46 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
-from django.core.exceptions import ImproperlyConfigured
-# ENVIRONMENT = os.environ.get("ENV", "local")   # local | production
-
-# if ENVIRONMENT == "production":
-#     ssm = boto3.client('ssm', region_name='ap-south-1')
-#     PERPLEXITY_API_KEY = ssm.get_parameter(
-#         Name='/clinic/PERPLEXITY_API_KEY',
-#         WithDecryption=True
-#     )['Parameter']['Value']
-# else:
-#     # Load from .env for local development
-#     PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-
-# if not PERPLEXITY_API_KEY:
-#     raise ImproperlyConfigured("PERPLEXITY_API_KEY is missing")
-
-ssm = boto3.client('ssm', region_name='ap-south-1')
+# Notification outbox delivery backends, one per channel
+# (see admin_panel.notifications; run `manage.py run_notification_worker`).
+# Point both at admin_panel.notifications.FakeProvider for local development.
+NOTIFICATION_PROVIDERS = {
+    "WHATSAPP": "admin_panel.notifications.TwilioWhatsAppProvider",
+    "EMAIL": "admin_panel.notifications.EmailProvider",
+}
 
-PERPLEXITY_API_KEY = ssm.get_parameter(
-    Name='/clinic/PERPLEXITY_API_KEY',
-    WithDecryption=True
-)['Parameter']['Value']
\ No newline at end of file
+# Chat assistant (chat.assistant). Point CHAT_LLM_CLIENT at
+# chat.assistant.StubLLMClient to work offline. History sent upstream is
+# capped at CHAT_CONTEXT_TOKENS; older messages are folded into a rolling
+# summary of about CHAT_SUMMARY_TOKENS, in batches once CHAT_SUMMARY_BATCH_TOKENS
+# worth have dropped out of the window (one summary call per batch, not per turn).
+CHAT_LLM_CLIENT = "chat.assistant.PerplexityClient"
+CHAT_MODEL = "sonar"
+CHAT_API_BASE_URL = os.getenv('CHAT_API_BASE_URL')  # None: Perplexity's own API
+CHAT_CONTEXT_TOKENS = 3000
+CHAT_SUMMARY_TOKENS = 400
+CHAT_SUMMARY_BATCH_TOKENS = 600
+# Replies to an identical (normalized) prompt with the same recent context are
+# served from the "chat" cache for CHAT_CACHE_TTL seconds; the context part of
+# the key covers the last CHAT_CACHE_CONTEXT_MESSAGES messages before the prompt.
+# With REDIS_URL the replies and hit/miss counts go to the shared redis, so all
+# workers answer from (and report) one cache; that redis must evict on its own
+# (maxmemory set, maxmemory-policy allkeys-lru), as replies are never deleted.
+CHAT_CACHE_ALIAS = "shared" if REDIS_URL else "chat"
+CHAT_CACHE_TTL = 60 * 60 * 24
+CHAT_CACHE_CONTEXT_MESSAGES = 4
+
+# Secrets such as PERPLEXITY_API_KEY are resolved on first use through
+# clinic_project.secret_store.get_secret(), not at import: the first provider
+# that has a value wins and the value is cached for SECRET_CACHE_TTL seconds.
+# Locally a .env entry (environment) is enough; in production they come from
+# SSM Parameter Store under SSM_PARAMETER_PREFIX.
+SECRET_PROVIDERS = [
+    "clinic_project.secret_store.EnvSecretProvider",
+    "clinic_project.secret_store.FileSecretProvider",
+    "clinic_project.secret_store.SSMSecretProvider",
+]
+SECRET_CACHE_TTL = 300
+SECRETS_DIR = os.getenv('SECRETS_DIR')
+SSM_PARAMETER_PREFIX = '/clinic/'
+AWS_REGION = 'ap-south-1'
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.utils import timezone
+from .benchmark import git_revision
+
+
+# Third-party SDK modules that should only be imported once their feature is
+# used (drf_yasg itself is an installed app; its views are the heavy part).
+VENDOR_PACKAGES = ("boto3", "twilio.rest", "perplexity", "drf_yasg.views")
+
+# What a worker does before it can answer its first request: build the WSGI
+# application (django.setup(), app registry) and load the URLconf, which
+# imports every view module.
+BOOT_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+boot_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({
+    "boot_ms": boot_ms,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "vendor_loaded": sorted(name for name in %r if name in sys.modules),
+}))
+"""
+
+# `-X importtime` lines: "import time:  self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each `-X importtime` line."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def boot_once():
+    """Boot the project once in a fresh interpreter and return its measurements."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT % (VENDOR_PACKAGES,)],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    measurements["imports"] = parse_importtime(result.stderr)
+    return measurements
+
+
+def profile_startup(runs=5, top=15):
+    """
+    Boot the project `runs` times and report the median boot time, peak RSS,
+    which vendor SDKs got imported, and the slowest top-level imports
+    (cumulative, from the last run).
+    """
+    boots = [boot_once() for _ in range(runs)]
+    last = boots[-1]
+    top_level = sorted(
+        (row for row in last["imports"] if row[3] == 0),
+        key=lambda row: row[2],
+        reverse=True,
+    )
+    return {
+        "revision": git_revision(),
+        "generated_at": timezone.now().isoformat(),
+        "runs": runs,
+        "boot_ms": round(statistics.median(boot["boot_ms"] for boot in boots), 1),
+        "max_rss_mb": round(statistics.median(boot["max_rss_kb"] for boot in boots) / 1024, 1),
+        "modules": last["modules"],
+        "vendor_loaded": last["vendor_loaded"],
+        "slowest_imports": [
+            {"module": module, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+            for module, self_us, cumulative, _ in top_level[:top]
+        ],
+    }
+
+
+def compare(baseline, current):
+    """Before/after pairs for the headline figures of two reports."""
+    return {
+        key: [baseline.get(key), current.get(key)]
+        for key in ("boot_ms", "max_rss_mb", "modules", "vendor_loaded")
+    }
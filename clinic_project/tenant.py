@@ -0,0 +1,217 @@
+import copy
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.shortcuts import get_object_or_404
+from django.utils.functional import SimpleLazyObject, cached_property
+from admin_panel.models import Clinic
+from clinic_panel.models import Doctor
+
+User = get_user_model()
+
+GENERATION_KEY = "tenant:generation"
+
+
+# -------------------- Profile cache --------------------
+def _generation(cache):
+    # Starting from the clock rather than 0 means an evicted counter can't
+    # come back at a value whose entries are still cached.
+    cache.add(GENERATION_KEY, time.time_ns(), None)
+    return cache.get(GENERATION_KEY)
+
+
+def _load_profiles(user_id):
+    user = (
+        User.objects.select_related("clinic_profile", "doctor_profile__clinic")
+        .filter(pk=user_id).first()
+    )
+    return getattr(user, "clinic_profile", None), getattr(user, "doctor_profile", None)
+
+
+def get_profiles(user_id):
+    """
+    (clinic, doctor) profiles of a user, either of them None; the doctor
+    comes with its clinic loaded. Cached in TENANT_CACHE_ALIAS (if set)
+    until any clinic or doctor changes.
+    """
+    if not settings.TENANT_CACHE_ALIAS:
+        return _load_profiles(user_id)
+    cache = caches[settings.TENANT_CACHE_ALIAS]
+    key = f"tenant:{_generation(cache)}:{user_id}"
+    profiles = cache.get(key)
+    if profiles is None:
+        profiles = _load_profiles(user_id)
+        for profile in profiles:
+            if profile:
+                # Only the profile is cached, not the user it was reached through.
+                profile._state.fields_cache.pop("user", None)
+        cache.set(key, profiles, settings.TENANT_CACHE_TTL)
+    return profiles
+
+
+def invalidate_profiles():
+    """Drop every cached profile (they are all keyed on the generation)."""
+    if not settings.TENANT_CACHE_ALIAS:
+        return
+    cache = caches[settings.TENANT_CACHE_ALIAS]
+    _generation(cache)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:  # evicted between add() and incr()
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+@receiver(post_save, sender=Clinic)
+@receiver(post_delete, sender=Clinic)
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def _profile_changed(sender, **kwargs):
+    # A doctor's cached profile carries its clinic, so any change to either
+    # can affect other users' entries; profile edits are rare enough to
+    # simply start over.
+    invalidate_profiles()
+
+
+@receiver(post_save, sender=User)
+def _user_created(sender, instance, created, **kwargs):
+    # A new user may reuse the id of a deleted one (SQLite, restored dumps).
+    if created:
+        invalidate_profiles()
+
+
+# -------------------- Request context --------------------
+def request_cache(request):
+    """
+    Dict for memoizing work done while serving `request` (a DRF or Django
+    request); the sub-requests of a batch (see clinic_project.batch) share
+    the batch request's, so they also share what it holds.
+    """
+    request = getattr(request, "_request", request)
+    if not hasattr(request, "memo"):
+        request.memo = {}
+    return request.memo
+
+
+class Tenant:
+    """
+    Who a request acts for: the authenticated user and role, the panel a
+    superadmin switched to (`acting_as`, from the token switch_panel
+    issued) and the clinic / doctor profiles behind them. Built from the
+    user and token DRF authentication already validated, so it must not be
+    read before authentication has run.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        token = getattr(request, "auth", None)
+        claims = token if hasattr(token, "get") else {}
+        self.role = (getattr(self.user, "role", None) or "").lower() or None
+        self.acting_as = claims.get("acting_as_role")
+        self.acting_as_user_id = claims.get("acting_as_user_id")
+
+    def for_request(self, request):
+        """
+        The same tenant for a sub-request of this one: query parameters are
+        read from `request`, the user and profiles are the ones already
+        resolved here.
+        """
+        self.profiles  # resolved once, shared by every copy
+        tenant = copy.copy(self)
+        tenant.request = request
+        return tenant
+
+    def _get(self, model, pk):
+        # Several sub-requests of a batch usually name the same clinic/doctor.
+        key = ("tenant", model, str(pk))
+        memo = request_cache(self.request)
+        if key not in memo:
+            memo[key] = get_object_or_404(model, id=pk)
+        return memo[key]
+
+    @property
+    def is_superadmin(self):
+        return self.role == "superadmin"
+
+    @property
+    def panel_role(self):
+        """The role whose panel the request is for."""
+        return self.acting_as or self.role
+
+    @cached_property
+    def profiles(self):
+        if not self.user or not self.user.is_authenticated:
+            return None, None
+        if self.is_superadmin:
+            if not self.acting_as_user_id:
+                return None, None
+            return get_profiles(self.acting_as_user_id)
+        return get_profiles(self.user.pk)
+
+    @property
+    def clinic(self):
+        """The clinic user's clinic (for superadmins, the one switched to)."""
+        return self.profiles[0]
+
+    @property
+    def doctor(self):
+        """The doctor user's profile (for superadmins, the one switched to)."""
+        return self.profiles[1]
+
+    def get_clinic(self, doctors=False):
+        """
+        Clinic a clinic-scoped request works on: for superadmins the one
+        named by ?clinic_id (404 if unknown) or else the one switched to;
+        for clinic users their own; for doctors their clinic, when `doctors`
+        is set. None when there isn't one.
+        """
+        if self.is_superadmin:
+            clinic_id = self.request.GET.get("clinic_id")
+            if clinic_id:
+                return self._get(Clinic, clinic_id)
+        if self.clinic:
+            return self.clinic
+        if doctors and self.doctor:
+            return self.doctor.clinic
+        return None
+
+    def get_doctor(self, doctor_id=None):
+        """
+        Doctor a doctor-scoped request works on: for superadmins the one
+        named by `doctor_id` or ?doctor_id (404 if unknown) or else the one
+        switched to; for doctors their own profile. None otherwise.
+        """
+        if self.is_superadmin:
+            doctor_id = doctor_id or self.request.GET.get("doctor_id")
+            if doctor_id:
+                return self._get(Doctor, doctor_id)
+        return self.doctor
+
+
+class TenantMiddleware:
+    """
+    Sets `request.tenant`, resolved on first use (DRF authenticates inside
+    the view, after middleware has run) and then kept for the request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.tenant = SimpleLazyObject(lambda: Tenant(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.tenant = SimpleLazyObject(lambda: Tenant(request))
+        return await self.get_response(request)
@@ -1,40 +1,23 @@
-from twilio.rest import Client
+from functools import lru_cache
 from django.conf import settings
-import logging
 
-logger = logging.getLogger(__name__)
 
-def send_patient_whatsapp(phone_number, message, media_urls=None):
-    """
-    Sends a WhatsApp message to a patient using Twilio.
-    """
-    try:
-        # Ensure credentials are present
-        if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_WHATSAPP_NUMBER]):
-            logger.error("Twilio credentials missing in settings.")
-            return False
+@lru_cache(maxsize=None)
+def _client(account_sid, auth_token):
+    # Imported here so only the notification worker loads the Twilio SDK.
+    from twilio.rest import Client
 
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return Client(account_sid, auth_token)
 
-        # Format phone number if needed (assuming incoming is +...)
-        to_number = f"whatsapp:{phone_number}" if not phone_number.startswith("whatsapp:") else phone_number
 
-        kwargs = {
-            "from_": settings.TWILIO_WHATSAPP_NUMBER,
-            "body": message,
-            "to": to_number
-        }
-        if media_urls:
-            kwargs["media_url"] = media_urls
+def get_twilio_client():
+    """
+    Shared Twilio client for the configured account. Its HTTP session keeps
+    connections open, so repeated sends reuse them instead of reconnecting.
+    """
+    return _client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
 
-        message_obj = client.messages.create(**kwargs)
 
-        logger.info(f"WhatsApp message sent successfully: {message_obj.sid}")
-        return True
-    except Exception as e:
-        # Log the exact Twilio error (includes error code and message)
-        error_msg = getattr(e, 'msg', None) or str(e)
-        error_code = getattr(e, 'code', None)
-        logger.error(f"Failed to send WhatsApp message. Code={error_code}, Reason={error_msg}")
-        print(f"[TWILIO ERROR] Code={error_code} | Reason={error_msg}")
-        return False
+def whatsapp_address(phone_number):
+    # Format phone number if needed (assuming incoming is +...)
+    return f"whatsapp:{phone_number}" if not phone_number.startswith("whatsapp:") else phone_number
@@ -1,31 +1,47 @@
+from functools import lru_cache
 from django.contrib import admin
 from rest_framework import permissions
 from django.urls import path, include, re_path
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
+from .batch import BatchAPIView
 
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Clinic API",
-        default_version="v1",
-        description="API documentation for Clinic Panel (Doctors, Patients, Appointments, Dashboard)",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="support@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],  # change later if needed
-)
+@lru_cache(maxsize=None)
+def get_docs_view(renderer=None):
+    # drf_yasg and the schema view are only built when the docs are first requested.
+    from drf_yasg.views import get_schema_view
+    from drf_yasg import openapi
+
+    schema_view = get_schema_view(
+        openapi.Info(
+            title="Clinic API",
+            default_version="v1",
+            description="API documentation for Clinic Panel (Doctors, Patients, Appointments, Dashboard)",
+            terms_of_service="https://www.example.com/terms/",
+            contact=openapi.Contact(email="support@example.com"),
+            license=openapi.License(name="BSD License"),
+        ),
+        public=True,
+        permission_classes=[permissions.AllowAny],  # change later if needed
+    )
+    if renderer is None:
+        return schema_view.without_ui(cache_timeout=0)
+    return schema_view.with_ui(renderer, cache_timeout=0)
+
+
+def docs_view(renderer=None):
+    def view(request, *args, **kwargs):
+        return get_docs_view(renderer)(request, *args, **kwargs)
+    return view
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/batch/", BatchAPIView.as_view(), name="batch"),
 
     path("api/accounts/", include("accounts.urls")),
     path("api/admin-panel/", include("admin_panel.urls")),
@@ -35,9 +51,9 @@ urlpatterns = [
     path('api/', include('chat.urls')),
 
     # Swagger & Redoc
-    re_path(r"^swagger(?P<format>\.json|\.yaml)$", schema_view.without_ui(cache_timeout=0), name="schema-json"),
-    path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    re_path(r"^swagger(?P<format>\.json|\.yaml)$", docs_view(), name="schema-json"),
+    path("swagger/", docs_view("swagger"), name="schema-swagger-ui"),
+    path("redoc/", docs_view("redoc"), name="schema-redoc"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Consultation, Prescription
+from .models import Consultation, Prescription, PatientClinicalSnapshot
 
 
 @admin.register(Consultation)
@@ -13,4 +13,10 @@ class PrescriptionAdmin(admin.ModelAdmin):
     list_display = ("medicine_name", "dosage", "frequency", "duration", "timings", "consultation")
     list_filter = ("frequency", "timings")
     search_fields = ("medicine_name", "dosage", "duration")
-    autocomplete_fields = ("consultation",) 
+    autocomplete_fields = ("consultation",)
+
+@admin.register(PatientClinicalSnapshot)
+class PatientClinicalSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("patient", "last_consultation_at", "updated_at")
+    search_fields = ("patient__first_name", "patient__last_name", "patient__file_number")
+    readonly_fields = ("last_consultation_at",)
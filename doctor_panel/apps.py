@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DoctorPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'doctor_panel'
+
+    def ready(self):
+        # Connect the PatientClinicalSnapshot maintenance receivers
+        from . import clinical  # noqa: F401
@@ -0,0 +1,207 @@
+import json
+from itertools import groupby
+from operator import attrgetter
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+from clinic_panel.models import Patient
+from .models import Consultation, PatientClinicalSnapshot
+
+
+# Consultation fields that carry forward from older visits when the latest
+# one left them blank.
+CARRY_FORWARD_FIELDS = ["complaints", "diagnosis", "advices", "investigations", "notes", "allergies"]
+
+SNAPSHOT_FIELDS = CARRY_FORWARD_FIELDS + ["last_consultation_at"]
+
+
+def _parse_investigations(value):
+    # Make sure investigations is always a list
+    try:
+        return json.loads(value)
+    except Exception:
+        return [value]
+
+
+def summary_from_snapshot(snapshot):
+    """The serializer's `consultation` payload, or None if the patient has no visits."""
+    if snapshot is None or snapshot.last_consultation_at is None:
+        return None
+    return {
+        "complaints": snapshot.complaints or "",
+        "diagnosis": snapshot.diagnosis or "",
+        "advices": snapshot.advices or "",
+        "investigations": _parse_investigations(snapshot.investigations) if snapshot.investigations else [],
+        "notes": snapshot.notes or "",
+        "allergies": snapshot.allergies or "",
+        "created_at": snapshot.last_consultation_at,
+    }
+
+
+# -------------------- Rebuild --------------------
+def _history(consultations):
+    return consultations.only("patient_id", "created_at", *CARRY_FORWARD_FIELDS)
+
+
+def _fill_snapshot(snapshot, consultations):
+    """
+    Reset `snapshot` from a patient's consultations (newest first): each field
+    takes its first non-empty value. Stops reading once every field is set.
+    """
+    for field in SNAPSHOT_FIELDS:
+        setattr(snapshot, field, None)
+
+    missing = set(CARRY_FORWARD_FIELDS)
+    for consultation in consultations:
+        if snapshot.last_consultation_at is None:
+            snapshot.last_consultation_at = consultation.created_at
+        for field in list(missing):
+            value = getattr(consultation, field)
+            if value:
+                setattr(snapshot, field, value)
+                missing.discard(field)
+        if not missing:
+            break
+    return snapshot
+
+
+def rebuild_clinical_snapshots(patient_ids=None):
+    """
+    Recompute PatientClinicalSnapshot rows from consultation history
+    (backfill / drift repair). One ordered pass over consultations, then
+    batched upserts. Returns the number of patients rebuilt.
+    """
+    patients = Patient.objects.all()
+    consultations = Consultation.objects.all()
+    if patient_ids is not None:
+        patients = patients.filter(pk__in=patient_ids)
+        consultations = consultations.filter(patient_id__in=patient_ids)
+
+    snapshots = {
+        pk: PatientClinicalSnapshot(patient_id=pk)
+        for pk in patients.values_list("pk", flat=True).iterator()
+    }
+    history = _history(consultations).order_by("patient_id", "-created_at", "-id")
+    for patient_id, rows in groupby(history.iterator(chunk_size=2000), key=attrgetter("patient_id")):
+        if patient_id in snapshots:
+            _fill_snapshot(snapshots[patient_id], rows)
+
+    PatientClinicalSnapshot.objects.bulk_create(
+        snapshots.values(),
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["patient"],
+        update_fields=SNAPSHOT_FIELDS + ["updated_at"],
+    )
+    return len(snapshots)
+
+
+def refresh_patient_snapshot(patient_id, create=True):
+    """
+    Recompute one patient's snapshot. With create=False a missing row is left
+    alone, which is what delete paths need while the patient may be going too.
+    """
+    if not patient_id:
+        return
+    history = _history(Consultation.objects.filter(patient_id=patient_id)).order_by("-created_at", "-id")
+    snapshot = _fill_snapshot(PatientClinicalSnapshot(patient_id=patient_id), history.iterator())
+    values = {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+
+    if create:
+        PatientClinicalSnapshot.objects.update_or_create(patient_id=patient_id, defaults=values)
+    else:
+        PatientClinicalSnapshot.objects.filter(patient_id=patient_id).update(updated_at=now(), **values)
+
+
+# -------------------- Incremental maintenance --------------------
+def _snapshot_state(instance):
+    # Read straight from __dict__ so deferred fields are never loaded here.
+    return tuple(instance.__dict__.get(field) for field in ["patient_id", *CARRY_FORWARD_FIELDS])
+
+
+@receiver(post_save, sender=Patient)
+def create_clinical_snapshot(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        PatientClinicalSnapshot.objects.get_or_create(patient=instance)
+
+
+@receiver(post_init, sender=Consultation)
+def remember_consultation_state(sender, instance, **kwargs):
+    instance._snapshot_state = _snapshot_state(instance)
+
+
+@receiver(post_save, sender=Consultation)
+def consultation_saved_snapshot(sender, instance, created, **kwargs):
+    if kwargs.get("raw"):
+        return
+
+    if created:
+        # A new latest visit only overrides the fields it actually filled in.
+        values = {field: getattr(instance, field) for field in CARRY_FORWARD_FIELDS if getattr(instance, field)}
+        merged = (
+            PatientClinicalSnapshot.objects.filter(patient_id=instance.patient_id)
+            .filter(Q(last_consultation_at__isnull=True) | Q(last_consultation_at__lte=instance.created_at))
+            .update(last_consultation_at=instance.created_at, updated_at=now(), **values)
+        )
+        if not merged:
+            refresh_patient_snapshot(instance.patient_id)
+    elif instance._snapshot_state != _snapshot_state(instance):
+        old_patient_id = instance._snapshot_state[0]
+        refresh_patient_snapshot(instance.patient_id)
+        if old_patient_id != instance.patient_id:
+            refresh_patient_snapshot(old_patient_id)
+
+    instance._snapshot_state = _snapshot_state(instance)
+
+
+@receiver(post_delete, sender=Consultation)
+def consultation_deleted_snapshot(sender, instance, **kwargs):
+    refresh_patient_snapshot(instance.patient_id, create=False)
+
+
+# -------------------- Serializer loader --------------------
+class PatientClinicalSummaries:
+    """
+    Clinical summaries for every patient in a batch of appointments, read
+    from PatientClinicalSnapshot in one query (plus one for which
+    appointments already have a consultation). Patients without a snapshot
+    row yet are rebuilt on the way.
+    """
+
+    def __init__(self, appointments):
+        appointments = list(appointments)
+        self.patient_ids = {a.patient_id for a in appointments if a.patient_id}
+        self.appointment_ids = {a.pk for a in appointments}
+        self._summaries = None
+        self._consulted_appointments = None
+
+    def _load(self):
+        if self._summaries is not None:
+            return
+
+        snapshots = PatientClinicalSnapshot.objects.filter(patient_id__in=self.patient_ids)
+        snapshots = {snapshot.patient_id: snapshot for snapshot in snapshots}
+        missing = self.patient_ids - snapshots.keys()
+        if missing:
+            rebuild_clinical_snapshots(missing)
+            snapshots.update(
+                (snapshot.patient_id, snapshot)
+                for snapshot in PatientClinicalSnapshot.objects.filter(patient_id__in=missing)
+            )
+
+        self._summaries = {
+            patient_id: summary_from_snapshot(snapshot) for patient_id, snapshot in snapshots.items()
+        }
+        self._consulted_appointments = set(
+            Consultation.objects.filter(appointment_id__in=self.appointment_ids)
+            .values_list("appointment_id", flat=True)
+        )
+
+    def for_patient(self, patient_id):
+        self._load()
+        return self._summaries.get(patient_id)
+
+    def has_consultation(self, appointment_id):
+        self._load()
+        return appointment_id in self._consulted_appointments
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from doctor_panel.clinical import rebuild_clinical_snapshots
+
+
+class Command(BaseCommand):
+    help = "Recompute PatientClinicalSnapshot carry-forward fields from consultation history (backfill / drift repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patient",
+            type=int,
+            action="append",
+            dest="patient_ids",
+            help="Patient id to rebuild (repeatable). Defaults to all patients.",
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_clinical_snapshots(options["patient_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt clinical snapshots for {rebuilt} patient(s)."))
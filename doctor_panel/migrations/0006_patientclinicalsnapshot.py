@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_panel', '0008_clinicstats'),
+        ('doctor_panel', '0005_consultation_findings_consultation_referral_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientClinicalSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('complaints', models.TextField(blank=True, null=True)),
+                ('diagnosis', models.TextField(blank=True, null=True)),
+                ('advices', models.TextField(blank=True, null=True)),
+                ('investigations', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('allergies', models.TextField(blank=True, null=True)),
+                ('last_consultation_at', models.DateTimeField(blank=True, null=True)),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='clinical_snapshot', to='clinic_panel.patient')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
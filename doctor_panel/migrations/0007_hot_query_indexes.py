@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_panel', '0011_hot_query_indexes'),
+        ('doctor_panel', '0006_patientclinicalsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['patient', '-created_at'], name='consult_patient_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['doctor', '-created_at'], name='consult_doctor_created_idx'),
+        ),
+    ]
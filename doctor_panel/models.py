@@ -101,6 +101,14 @@ class Consultation(BaseModel):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Patient history and the latest-consultation lookups
+            models.Index(fields=["patient", "-created_at"], name="consult_patient_created_idx"),
+            # Doctor consultation lists, newest first
+            models.Index(fields=["doctor", "-created_at"], name="consult_doctor_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.doctor} → {self.patient} ({self.created_at.date()})"
 
@@ -137,3 +145,23 @@ class Prescription(BaseModel):
             return f"{self.procedure.name}"
         return f"{self.medicine_name} - {self.frequency}, {self.get_timings_display() if self.timings else ''}"
 
+
+
+class PatientClinicalSnapshot(BaseModel):
+    """
+    Latest carry-forward clinical fields for a patient: each holds the most
+    recent non-empty value across the patient's consultations.
+    Kept in sync by the receivers in doctor_panel.clinical; repair with
+    `manage.py rebuild_clinical_snapshots`.
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, related_name="clinical_snapshot")
+    complaints = models.TextField(blank=True, null=True)
+    diagnosis = models.TextField(blank=True, null=True)
+    advices = models.TextField(blank=True, null=True)
+    investigations = models.TextField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    allergies = models.TextField(blank=True, null=True)
+    last_consultation_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Clinical snapshot for {self.patient}"
@@ -1,10 +1,15 @@
 from rest_framework import serializers
 from .models import Consultation, Prescription
+from .clinical import PatientClinicalSummaries
 from clinic_panel.models import Doctor, Patient
 from admin_panel.serializers import PatientSerializer, DoctorSerializer, ClinicSerializer, Appointment, PatientAttachmentSerializer
+from admin_panel.serializers import ClinicRefSerializer, DoctorRefSerializer
 from datetime import date
+from clinic_project.serialization import (
+    EagerLoadingMixin, SideLoaded, SparseFieldsetMixin, nested_loading, render_once,
+)
 
-class DoctorAppointmentSerializer(serializers.ModelSerializer):
+class DoctorAppointmentSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     patient = PatientSerializer(read_only=True)
     clinic = ClinicSerializer(read_only=True)
     has_consultation = serializers.SerializerMethodField()
@@ -32,49 +37,49 @@ class DoctorAppointmentSerializer(serializers.ModelSerializer):
             "last_visited",
         ]
 
+    select_related = ("patient__clinic", "clinic", "doctor__clinic")
+    # Nested PatientSerializer / ClinicSerializer relations rendered per row
+    prefetch_related = (
+        "patient__attachments",
+        "clinic__doctors__user",
+        "clinic__doctors__clinic",
+        "clinic__doctors__educations",
+        "clinic__doctors__certifications",
+    )
+    # The clinical fields come from the batched summaries, not the row.
+    field_requires = {
+        "appointment_id": ("appointment_id",),
+        "has_consultation": (),
+        "consultation": (),
+        "allergies": (),
+        "last_visited": (),
+    }
+    side_loaded = {
+        "patient": SideLoaded("patients", PatientSerializer),
+        "clinic": SideLoaded("clinics", ClinicSerializer),
+    }
+
     def get_appointment_id(self, obj):
         return obj.appointment_id or f"APT-{obj.id}"
 
+    def _clinical_summaries(self, obj):
+        """
+        Batched loader passed in by list views. Appointments it doesn't cover
+        (detail views, callers without context) get one of their own.
+        """
+        summaries = self.context.get("clinical_summaries")
+        if summaries is None or obj.pk not in summaries.appointment_ids:
+            summaries = PatientClinicalSummaries([obj])
+            self.context["clinical_summaries"] = summaries
+        return summaries
+
     def get_has_consultation(self, obj):
-        return Consultation.objects.filter(appointment=obj).exists()
+        return self._clinical_summaries(obj).has_consultation(obj.pk)
 
     def get_consultation(self, obj):
-        if not obj.patient:
-            return None
-
-        # Get all consultations for the patient ordered by creation date descending
-        consultations = Consultation.objects.filter(patient=obj.patient).order_by("-created_at")
-        if not consultations.exists():
-            return None
-
-        # Start with the latest consultation
-        latest = consultations.first()
-
-        # Prepare fields with "carry forward" logic
-        def get_field(field_name):
-            # Return first non-empty value from latest to oldest consultation
-            for c in consultations:
-                value = getattr(c, field_name, None)
-                if value:
-                    if field_name == "investigations":
-                        # Make sure investigations is always a list
-                        import json
-                        try:
-                            return json.loads(value)
-                        except Exception:
-                            return [value]
-                    return value
+        if not obj.patient_id:
             return None
-
-        return {
-            "complaints": get_field("complaints") or "",
-            "diagnosis": get_field("diagnosis") or "",
-            "advices": get_field("advices") or "",
-            "investigations": get_field("investigations") or [],
-            "notes": get_field("notes") or "",
-            "allergies": get_field("allergies") or "",
-            "created_at": latest.created_at,
-        }
+        return self._clinical_summaries(obj).for_patient(obj.patient_id)
 
     def get_allergies(self, obj):
         # Reuse the consultation logic for consistency
@@ -84,23 +89,32 @@ class DoctorAppointmentSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_visited(self, obj):
-        if not obj.patient:
-            return None
-
-        latest_consultation = Consultation.objects.filter(patient=obj.patient).order_by("-created_at").first()
-        if latest_consultation:
-            return latest_consultation.created_at.date().isoformat()
+        consultation_data = self.get_consultation(obj)
+        if consultation_data:
+            return consultation_data["created_at"].date().isoformat()
         return None
 
 
 
+def clinic_ref(context, consultation):
+    """{id, name} of the clinic a consultation belongs to, once per response."""
+    # Try doctor.clinic first
+    clinic = getattr(consultation.doctor, "clinic", None)
+    # Optional: fallback to appointment.clinic
+    if not clinic and consultation.appointment and hasattr(consultation.appointment, "clinic"):
+        clinic = consultation.appointment.clinic
+    if not clinic:
+        return None
+    return render_once(context, "clinic_ref", clinic, lambda: {"id": clinic.id, "name": clinic.name})
+
+
 class PrescriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Prescription
         fields = ["medicine_name", "procedure", "dosage", "frequency", "timings", "duration"]
         read_only_fields = ["consultation"]
 
-class PrescriptionListSerializer(serializers.ModelSerializer):
+class PrescriptionListSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     procedure = serializers.SerializerMethodField()
     patient = serializers.SerializerMethodField()
     doctor = serializers.SerializerMethodField()
@@ -123,6 +137,19 @@ class PrescriptionListSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
+    select_related = ("consultation__patient", "consultation__doctor__clinic", "procedure")
+    field_requires = {
+        "procedure": ("procedure",),
+        "patient": ("consultation",),
+        "doctor": ("consultation",),
+        "clinic": ("consultation",),
+    }
+    side_loaded = {
+        "patient": SideLoaded("patients", PatientSerializer, "consultation.patient_id"),
+        "doctor": SideLoaded("doctors", DoctorRefSerializer, "consultation.doctor_id"),
+        "clinic": SideLoaded("clinics", ClinicRefSerializer, "consultation.doctor.clinic_id"),
+    }
+
     def _calculate_age(self, dob):
         if not dob:
             return None
@@ -134,7 +161,7 @@ class PrescriptionListSerializer(serializers.ModelSerializer):
 
     def get_patient(self, obj):
         patient = obj.consultation.patient
-        return {
+        return render_once(self.context, "prescription_patient_id", patient, lambda: {
             "patient_id": patient.id,
             "full_name": f"{patient.first_name} {patient.last_name}",
             "phone_number": patient.phone_number,
@@ -142,25 +169,21 @@ class PrescriptionListSerializer(serializers.ModelSerializer):
             "age": self._calculate_age(patient.dob),
             "gender": patient.gender,
             "blood_group": patient.blood_group,
-        }
+        })
 
     def get_doctor(self, obj):
         doctor = obj.consultation.doctor
-        return {"id": doctor.id, "name": doctor.name}
+        return render_once(self.context, "doctor_ref", doctor, lambda: {"id": doctor.id, "name": doctor.name})
 
     def get_clinic(self, obj):
-        # Try doctor.clinic first
-        doctor_clinic = getattr(obj.consultation.doctor, "clinic", None)
-        if doctor_clinic:
-            return {"id": doctor_clinic.id, "name": doctor_clinic.name}
-        # Optional: fallback to appointment.clinic if Appointment has a clinic
-        if obj.consultation.appointment and hasattr(obj.consultation.appointment, "clinic"):
-            appt_clinic = obj.consultation.appointment.clinic
-            if appt_clinic:
-                return {"id": appt_clinic.id, "name": appt_clinic.name}
-        return None
+        return clinic_ref(self.context, obj.consultation)
+
+_doctor_select, _doctor_prefetch = nested_loading("doctor", DoctorSerializer)
+_referred_select, _referred_prefetch = nested_loading("referred_to", DoctorSerializer)
+_patient_select, _patient_prefetch = nested_loading("patient", PatientSerializer)
+
 
-class ConsultationSerializer(serializers.ModelSerializer):
+class ConsultationSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     prescriptions = PrescriptionListSerializer(many=True, read_only=True)
     patient = PatientSerializer(read_only=True)
     doctor = DoctorSerializer(read_only=True)
@@ -237,17 +260,18 @@ class ConsultationSerializer(serializers.ModelSerializer):
             "prescriptions",
         ]
 
+    select_related = ("doctor", "patient", "referred_to") + _doctor_select + _referred_select + _patient_select
+    prefetch_related = _doctor_prefetch + _referred_prefetch + _patient_prefetch + ("prescriptions__procedure",)
+    field_requires = {"clinic": ("doctor",)}
+    side_loaded = {
+        "doctor": SideLoaded("doctors", DoctorSerializer),
+        "patient": SideLoaded("patients", PatientSerializer),
+        "referred_to": SideLoaded("doctors", DoctorSerializer),
+        "clinic": SideLoaded("clinics", ClinicRefSerializer, "doctor.clinic_id"),
+    }
+
     def get_clinic(self, obj):
-        # Try doctor.clinic first
-        doctor_clinic = getattr(obj.doctor, "clinic", None)
-        if doctor_clinic:
-            return {"id": doctor_clinic.id, "name": doctor_clinic.name}
-        # Optional: fallback to appointment.clinic
-        if obj.appointment and hasattr(obj.appointment, "clinic"):
-            appt_clinic = obj.appointment.clinic
-            if appt_clinic:
-                return {"id": appt_clinic.id, "name": appt_clinic.name}
-        return None
+        return clinic_ref(self.context, obj)
 
 
 class DoctorMiniSerializer(serializers.ModelSerializer):
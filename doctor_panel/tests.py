@@ -1,3 +1,165 @@
+from io import StringIO
+from datetime import time, timedelta
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from admin_panel.models import Clinic
+from clinic_panel.models import Doctor, Patient, Appointment
+from .clinical import PatientClinicalSummaries, refresh_patient_snapshot
+from .models import Consultation, PatientClinicalSnapshot
+from .serializers import DoctorAppointmentSerializer
 
-# Create your tests here.
+
+class DoctorAppointmentSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        clinic_user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        cls.clinic = Clinic.objects.create(user=clinic_user, name="Alpha Clinic")
+        cls.user = User.objects.create_user(username="doc", password="x", role="DOCTOR")
+        cls.doctor = Doctor.objects.create(clinic=cls.clinic, user=cls.user, name="Dr Doc")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_patient(self, name):
+        return Patient.objects.create(
+            clinic=self.clinic, first_name=name, last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+
+    def book(self, patient, days=1):
+        return Appointment.objects.create(
+            clinic=self.clinic, doctor=self.doctor, patient=patient,
+            appointment_date=timezone.now().date() + timedelta(days=days),
+            appointment_time=time(10),
+        )
+
+    def consult(self, patient, age_days, **fields):
+        consultation = Consultation.objects.create(doctor=self.doctor, patient=patient, **fields)
+        created_at = timezone.now() - timedelta(days=age_days)
+        Consultation.objects.filter(pk=consultation.pk).update(created_at=created_at)
+        refresh_patient_snapshot(patient.pk)  # update() skips the snapshot receivers
+        return consultation
+
+    def test_summary_carries_forward_older_values(self):
+        patient = self.make_patient("carry")
+        appointment = self.book(patient)
+        self.consult(patient, 10, diagnosis="Flu", allergies="Penicillin", investigations='["CBC"]')
+        self.consult(patient, 2, complaints="Cough", investigations="X-ray")
+        latest = self.consult(patient, 1, notes="Rest")
+
+        data = DoctorAppointmentSerializer(appointment).data
+
+        latest.refresh_from_db()
+        self.assertEqual(data["consultation"], {
+            "complaints": "Cough",
+            "diagnosis": "Flu",
+            "advices": "",
+            "investigations": ["X-ray"],
+            "notes": "Rest",
+            "allergies": "Penicillin",
+            "created_at": latest.created_at,
+        })
+        self.assertEqual(data["allergies"], "Penicillin")
+        self.assertEqual(data["last_visited"], latest.created_at.date().isoformat())
+        self.assertFalse(data["has_consultation"])
+
+        unseen = DoctorAppointmentSerializer(self.book(self.make_patient("new"))).data
+        self.assertIsNone(unseen["consultation"])
+        self.assertIsNone(unseen["last_visited"])
+
+    def test_scheduled_list_query_count_does_not_grow_with_rows(self):
+        def scheduled_queries():
+            url = reverse("doctor_panel:doctor-scheduled-appointments")
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries), response.data
+
+        for i in range(2):
+            patient = self.make_patient(f"p{i}")
+            self.book(patient)
+            self.consult(patient, 1, diagnosis="Flu")
+        scheduled_queries()  # caches the doctor profile
+        baseline, _ = scheduled_queries()
+
+        for i in range(2, 12):
+            patient = self.make_patient(f"p{i}")
+            self.book(patient)
+            self.consult(patient, 1, diagnosis="Flu")
+        queries, data = scheduled_queries()
+
+        self.assertEqual(queries, baseline)
+        self.assertEqual(len(data), 12)
+        self.assertTrue(all(row["consultation"]["diagnosis"] == "Flu" for row in data))
+
+
+class PatientClinicalSnapshotTests(TestCase):
+    def setUp(self):
+        clinic_user = User.objects.create_user(username="clinic", password="x", role="CLINIC")
+        clinic = Clinic.objects.create(user=clinic_user, name="Alpha Clinic")
+        user = User.objects.create_user(username="doc", password="x", role="DOCTOR")
+        self.doctor = Doctor.objects.create(clinic=clinic, user=user, name="Dr Doc")
+        self.patient = Patient.objects.create(
+            clinic=clinic, first_name="Pat", last_name="Test",
+            phone_number="+910000000000", address="Street",
+        )
+
+    def snapshot(self):
+        return PatientClinicalSnapshot.objects.get(patient=self.patient)
+
+    def consult(self, **fields):
+        return Consultation.objects.create(doctor=self.doctor, patient=self.patient, **fields)
+
+    def test_snapshot_follows_consultation_writes(self):
+        self.assertIsNone(self.snapshot().last_consultation_at)
+
+        first = self.consult(diagnosis="Flu", allergies="Penicillin")
+        latest = self.consult(diagnosis="Cold", complaints="Cough")
+        snapshot = self.snapshot()
+        self.assertEqual((snapshot.diagnosis, snapshot.allergies, snapshot.complaints), ("Cold", "Penicillin", "Cough"))
+        self.assertEqual(snapshot.last_consultation_at, latest.created_at)
+
+        latest.diagnosis = ""
+        latest.save()
+        self.assertEqual(self.snapshot().diagnosis, "Flu")
+
+        first.delete()
+        snapshot = self.snapshot()
+        self.assertIsNone(snapshot.diagnosis)
+        self.assertIsNone(snapshot.allergies)
+
+        latest.delete()
+        self.assertIsNone(self.snapshot().last_consultation_at)
+
+    def test_patient_delete_cascades(self):
+        self.consult(diagnosis="Flu")
+        self.patient.delete()
+        self.assertFalse(PatientClinicalSnapshot.objects.exists())
+
+    def test_rebuild_command_backfills(self):
+        self.consult(diagnosis="Flu")
+        PatientClinicalSnapshot.objects.all().delete()
+
+        call_command("rebuild_clinical_snapshots", stdout=StringIO())
+
+        self.assertEqual(self.snapshot().diagnosis, "Flu")
+
+    def test_summaries_read_snapshots_not_history(self):
+        for i in range(5):
+            self.consult(diagnosis=f"Visit {i}")
+        appointment = Appointment.objects.create(
+            clinic=self.patient.clinic, doctor=self.doctor, patient=self.patient,
+            appointment_time=time(10),
+        )
+
+        # snapshot rows + has_consultation lookup, regardless of history length
+        with self.assertNumQueries(2):
+            summary = PatientClinicalSummaries([appointment]).for_patient(self.patient.pk)
+        self.assertEqual(summary["diagnosis"], "Visit 4")
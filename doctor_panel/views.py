@@ -2,7 +2,6 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.generics import RetrieveAPIView
-from rest_framework_simplejwt.backends import TokenBackend
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from django.utils import timezone
@@ -13,11 +12,14 @@ from clinic_panel.serializers import PatientHistorySerializer
 from .models import Consultation, Prescription, Doctor
 from .serializers import ConsultationSerializer, PrescriptionSerializer, PrescriptionListSerializer, DoctorPatientHistorySerializer
 from .serializers import DoctorAppointmentSerializer
+from .clinical import PatientClinicalSummaries
 from admin_panel.serializers import AppointmentSerializer
 from django.db import transaction
 from clinic_project.permissions import RoleBasedPanelAccess
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Count, Q
+from clinic_panel.stats import bump_clinic_stats
+from clinic_project.serialization import list_data, list_serializer
 
 User = get_user_model()
 
@@ -28,6 +30,7 @@ class DoctorDashboardAPIView(APIView):
 
     def get(self, request, doctor_id=None):
         user = request.user
+        tenant = request.tenant
         doctor = None
 
         # --- Case 1: Superadmin (switching between doctors) ---
@@ -40,18 +43,8 @@ class DoctorDashboardAPIView(APIView):
                 except (User.DoesNotExist, Doctor.DoesNotExist):
                     return Response({"error": "Doctor not found."}, status=404)
             else:
-                # fallback: token may have 'acting_as' info
-                auth_header = request.headers.get("Authorization", "")
-                token = auth_header.split(" ")[1] if " " in auth_header else None
-                if token:
-                    try:
-                        payload = TokenBackend(algorithm='HS256').decode(token, verify=False)
-                        acting_as_id = payload.get("target_id")
-                        if acting_as_id:
-                            acting_user = User.objects.get(id=acting_as_id)
-                            doctor = acting_user.doctor_profile
-                    except Exception:
-                        pass
+                # fallback: the doctor switched to (token acting_as info)
+                doctor = tenant.doctor
 
             # fallback if no doctor found
             if not doctor:
@@ -61,9 +54,8 @@ class DoctorDashboardAPIView(APIView):
 
         # --- Case 2: Normal doctor user ---
         elif user.role == "DOCTOR":
-            try:
-                doctor = user.doctor_profile
-            except Doctor.DoesNotExist:
+            doctor = tenant.doctor
+            if not doctor:
                 return Response({"error": "Doctor profile not found."}, status=404)
 
         # --- Case 3: Unauthorized roles ---
@@ -122,14 +114,12 @@ class ConsultationListCreateAPIView(APIView):
         - If Superadmin, use ?doctor_id=<id>
         - If Doctor, use their profile
         """
-        user = request.user
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-        elif hasattr(user, "doctor_profile"):
-            return user.doctor_profile
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access consultations.")
 
     def get(self, request):
@@ -210,14 +200,12 @@ class ConsultationRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_doctor(self, request):
-        user = request.user
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id") or request.data.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-        elif hasattr(user, "doctor_profile"):
-            return user.doctor_profile
+        tenant = request.tenant
+        doctor = tenant.get_doctor(request.query_params.get("doctor_id") or request.data.get("doctor_id"))
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access consultations.")
 
     def get_object(self, pk, doctor):
@@ -259,41 +247,36 @@ class DoctorAllAppointmentsAPIView(APIView):
 
     def get_doctor(self, request):
         """Get the doctor profile based on role."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-        elif hasattr(user, "doctor_profile"):
-            return user.doctor_profile
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access this endpoint.")
 
     def get(self, request):
         doctor = self.get_doctor(request)
-        appointments = (
-            Appointment.objects.filter(doctor=doctor)
-            .select_related("patient", "doctor__clinic")
-            .order_by("-created_at")
+        appointments, serializer_class = list_serializer(
+            request, Appointment.objects.filter(doctor=doctor).order_by("-created_at"), DoctorAppointmentSerializer
         )
-        serializer = DoctorAppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        appointments = list(appointments)
+        return Response(list_data(
+            request, appointments, serializer_class,
+            context={"clinical_summaries": PatientClinicalSummaries(appointments)},
+        ))
 
 
 class DoctorScheduledAppointmentsAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_doctor(self, request):
-        user = request.user
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile
-
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access this endpoint.")
 
     def cancel_expired_appointments(self, doctor):
@@ -305,7 +288,7 @@ class DoctorScheduledAppointmentsAPIView(APIView):
         today = now.date()
         current_time = now.time()
 
-        Appointment.objects.filter(
+        expired = Appointment.objects.filter(
             doctor=doctor,
             status="SCHEDULED",
             consultation__isnull=True
@@ -315,7 +298,18 @@ class DoctorScheduledAppointmentsAPIView(APIView):
                 appointment_date=today,
                 appointment_time__lt=current_time
             )
-        ).update(status="CANCELLED")
+        )
+
+        # queryset.update() skips signals, so adjust ClinicStats by hand
+        with transaction.atomic():
+            expired_per_clinic = dict(
+                expired.order_by().values_list("clinic_id").annotate(total=Count("pk"))
+            )
+            if not expired_per_clinic:
+                return
+            expired.update(status="CANCELLED", updated_at=timezone.now())
+            for clinic_id, total in expired_per_clinic.items():
+                bump_clinic_stats(clinic_id, scheduled_appointments=-total, cancelled_appointments=total)
 
     def get(self, request):
         doctor = self.get_doctor(request)
@@ -329,12 +323,15 @@ class DoctorScheduledAppointmentsAPIView(APIView):
                 status="SCHEDULED",
                 consultation__isnull=True
             )
-            .select_related("patient", "doctor__clinic")
             .order_by("appointment_date", "appointment_time")
         )
+        appointments, serializer_class = list_serializer(request, appointments, DoctorAppointmentSerializer)
+        appointments = list(appointments)
 
-        serializer = DoctorAppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        return Response(list_data(
+            request, appointments, serializer_class,
+            context={"clinical_summaries": PatientClinicalSummaries(appointments)},
+        ))
 
 
 class DoctorAppointmentDetailAPIView(APIView):
@@ -342,14 +339,12 @@ class DoctorAppointmentDetailAPIView(APIView):
 
     def get_doctor(self, request):
         """Get doctor for current user or superadmin."""
-        user = request.user
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-        elif hasattr(user, "doctor_profile"):
-            return user.doctor_profile
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access this endpoint.")
 
     def get(self, request, pk):
@@ -363,13 +358,13 @@ class PrescriptionListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, consultation_id):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         serializer = ConsultationSerializer(consultation)
         return Response(serializer.data)
 
     def post(self, request, consultation_id):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         serializer = PrescriptionSerializer(data=request.data)
         if serializer.is_valid():
@@ -382,14 +377,14 @@ class PrescriptionRetrieveUpdateDeleteAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, consultation_id, pk):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         prescription = get_object_or_404(Prescription, id=pk, consultation=consultation)
         serializer = PrescriptionSerializer(prescription)
         return Response(serializer.data)
 
     def put(self, request, consultation_id, pk):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         prescription = get_object_or_404(Prescription, id=pk, consultation=consultation)
         serializer = PrescriptionSerializer(prescription, data=request.data)
@@ -399,7 +394,7 @@ class PrescriptionRetrieveUpdateDeleteAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def patch(self, request, consultation_id, pk):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         prescription = get_object_or_404(Prescription, id=pk, consultation=consultation)
         serializer = PrescriptionSerializer(prescription, data=request.data, partial=True)
@@ -409,7 +404,7 @@ class PrescriptionRetrieveUpdateDeleteAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, consultation_id, pk):
-        doctor = request.user.doctor_profile
+        doctor = request.tenant.doctor
         consultation = get_object_or_404(Consultation, id=consultation_id, doctor=doctor)
         prescription = get_object_or_404(Prescription, id=pk, consultation=consultation)
         prescription.delete()
@@ -421,49 +416,35 @@ class DoctorPrescriptionListAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_doctor(self, request):
-        user = request.user
-
-        # Superadmin can view any doctor's prescriptions
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-
-        # Doctor user can only view their own
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile
-
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access this endpoint.")
 
     def get(self, request):
         doctor = self.get_doctor(request)
 
-        prescriptions = (
-            Prescription.objects.filter(consultation__doctor=doctor)
-            .select_related("consultation", "consultation__patient")
-            .order_by("-created_at")
+        prescriptions, serializer_class = list_serializer(
+            request,
+            Prescription.objects.filter(consultation__doctor=doctor).order_by("-created_at"),
+            PrescriptionListSerializer,
         )
-
-        serializer = PrescriptionListSerializer(prescriptions, many=True)
-        return Response(serializer.data)
+        return Response(list_data(request, prescriptions, serializer_class))
 
 
 class DoctorPrescriptionDetailAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_doctor(self, request):
-        user = request.user
-
-        if user.role.lower() == "superadmin":
-            doctor_id = request.query_params.get("doctor_id")
-            if not doctor_id:
-                raise PermissionDenied("doctor_id is required for superadmin.")
-            return get_object_or_404(Doctor, id=doctor_id)
-
-        if hasattr(user, "doctor_profile"):
-            return user.doctor_profile
-
+        tenant = request.tenant
+        doctor = tenant.get_doctor()
+        if doctor:
+            return doctor
+        if tenant.is_superadmin:
+            raise PermissionDenied("doctor_id is required for superadmin.")
         raise PermissionDenied("Only doctors or superadmins can access this endpoint.")
 
     def get(self, request, pk):
@@ -483,13 +464,10 @@ class DoctorPatientHistoryView(RetrieveAPIView):
     lookup_field = "id"
 
     def get_queryset(self):
-        user = self.request.user
-
-        if not hasattr(user, "doctor_profile"):
+        doctor = self.request.tenant.doctor
+        if not doctor:
             return Patient.objects.none()
 
-        doctor = user.doctor_profile
-
         return (
             Patient.objects
             .filter(appointments__consultation__doctor=doctor)
@@ -502,5 +480,5 @@ class DoctorPatientHistoryView(RetrieveAPIView):
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context["doctor"] = self.request.user.doctor_profile
+        context["doctor"] = self.request.tenant.doctor
         return context